@@ -0,0 +1,209 @@
+"""
+PBIR tool benchmark suite.
+
+    python benchmarks/bench_pbir.py [--pages 20] [--visuals 50] [--refs 4] [--repeat 5] [--json OUT]
+
+Generates a synthetic report, points the server at it (SARA_REPORT_PATH) and
+times every pbir_* tool in sara_powerbi/tools/pbir.py. For each tool it reports
+the first call on a cold index, the median/p95 of warm calls (after background
+index loading finished), and, from one extra instrumented call, files read,
+bytes read/parsed and peak Python memory.
+Runs on Linux with no Power BI installed.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import inspect
+import argparse
+import builtins
+import tempfile
+import threading
+import statistics
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+from synthetic import generate_report, RARE_MEASURE
+
+class IOCounter:
+    """Counts files opened for reading, bytes read and bytes handed to JSON parsers."""
+    def __init__(self):
+        self.files = 0
+        self.bytes_read = 0
+        self.bytes_parsed = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._patches = []
+
+    def _count_parse(self, raw):
+        with self._lock:
+            self.bytes_parsed += len(raw) if isinstance(raw, (bytes, bytearray, str)) else 0
+
+    def _wrap_parser(self, fn, takes_file=False):
+        counter = self
+        def wrapper(arg, *a, **kw):
+            # Parsers calling other parsers (orjson fallback -> json.loads) are counted once
+            if getattr(counter._local, "inside", False): return fn(arg, *a, **kw)
+            counter._local.inside = True
+            try:
+                if takes_file:
+                    text = arg.read()
+                    counter._count_parse(text)
+                    return json.loads(text, *a, **kw)
+                counter._count_parse(arg)
+                return fn(arg, *a, **kw)
+            finally:
+                counter._local.inside = False
+        return wrapper
+
+    def _patch(self, owner, name, value):
+        self._patches.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, value)
+
+    def __enter__(self):
+        from sara_powerbi import scan, report_index
+        real_open = builtins.open
+        counter = self
+        def counting_open(file, mode='r', *a, **kw):
+            f = real_open(file, mode, *a, **kw)
+            if isinstance(file, (str, bytes, os.PathLike)) and not any(c in mode for c in "wax+"):
+                try: size = os.fstat(f.fileno()).st_size
+                except OSError: size = 0
+                with counter._lock:
+                    counter.files += 1; counter.bytes_read += size
+            return f
+        self._patch(builtins, "open", counting_open)
+        self._patch(json, "loads", self._wrap_parser(json.loads))
+        self._patch(json, "load", self._wrap_parser(json.load, takes_file=True))
+        self._patch(scan, "loads", self._wrap_parser(scan.loads))
+        self._patch(report_index, "loads", scan.loads)
+        return self
+
+    def __exit__(self, *exc):
+        for owner, name, value in reversed(self._patches): setattr(owner, name, value)
+        self._patches = []
+
+def scenarios(report: str):
+    """Arguments for each pbir_* tool, per repetition i. Order matters (creates before deletes)."""
+    toggle = lambda i, a, b: (a, b) if i % 2 == 0 else (b, a)
+    return [
+        ("pbir_set_project", lambda i: ((report,), {})),
+        ("pbir_get_info", lambda i: ((), {})),
+        ("pbir_inspect_structure", lambda i: ((), {})),
+        ("pbir_list_visuals", lambda i: (("Page 0",), {})),
+        ("pbir_audit_usage", lambda i: ((RARE_MEASURE,), {})),
+        ("pbir_bind_measure", lambda i: (("Page 1", "Visual 1-3", "Sales", f"Measure {i % 40}"), {})),
+        ("pbir_format_visual", lambda i: (("Page 1", *toggle(i, "Visual 1-4", "Visual 1-4 (b)")), {"rename_fields": '{"Month": "Month Name"}'})),
+        ("pbir_update_visual_layout", lambda i: (("Page 2", "Visual 2-5"), {"x": 20 + i, "y": 40})),
+        ("pbir_create_page", lambda i: ((f"Bench Page {i}",), {})),
+        ("pbir_create_visual", lambda i: (("Page 3", "card", f"Bench Card {i}"), {})),
+        ("pbir_create_bar_chart", lambda i: (("Page 3", f"Bench Bar {i}", "Date", "Month", "Sales", "Measure 1"), {})),
+        ("pbir_apply_batch", lambda i: ((json.dumps(
+            [{"op": "create_visual", "page_name": "Page 4", "visual_type": "card", "title": f"Batch {i}-{k}", "x": 20 + k * 100, "y": 600} for k in range(5)] +
+            [{"op": "bind_measure", "page_name": "Page 4", "visual_title": f"Batch {i}-{k}", "measure_table": "Sales", "measure_name": "Measure 3"} for k in range(5)]),), {})),
+        ("pbir_auto_layout", lambda i: (("Page 0",), {"mode": "grid" if i % 2 else "flow"})),
+        ("pbir_scaffold_report", lambda i: ((json.dumps({"pages": [{"name": f"Scaffold {i}", "visuals":
+            [{"type": "card", "title": f"KPI {k}", "measure": f"Sales[Measure {k}]"} for k in range(4)] +
+            [{"type": "bar_chart", "title": f"Chart {k}", "category": "Date[Month]", "value": f"Sales[Measure {k}]"} for k in range(4)]}]}),), {})),
+        ("pbir_refactor_field", lambda i: (("Sales", *toggle(i, "Measure 2", "Measure 2 (renamed)")), {})),
+        ("pbir_refactor_fields", lambda i: ((json.dumps([
+            {"table": "Sales", "old": toggle(i, "Measure 5", "Revenue")[0], "new": toggle(i, "Measure 5", "Revenue")[1]},
+            {"table": "Date", "old": toggle(i, "Month", "Month Key")[0], "new": toggle(i, "Month", "Month Key")[1], "kind": "Column"}]),), {})),
+        ("pbir_delete_object", lambda i: (("Page 3",), {"visual_title": f"Bench Card {i}"})),
+    ]
+
+def reset_state():
+    """Drops resident indexes and detection cache (cold start)."""
+    from sara_powerbi import report_index
+    from sara_powerbi.tools import pbir
+    for idx in report_index._INDEXES.values(): idx.close()
+    report_index._INDEXES.clear()
+    pbir.DETECT_CONTEXT.update({"override": None, "srv_pid": None, "desktop_pid": None, "path": None})
+
+def settle():
+    """Waits for background index warm-up started by a cold call."""
+    from sara_powerbi import report_index
+    for idx in list(report_index._INDEXES.values()):
+        if idx._warming is not None: idx._warming.join()
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def run(report: str, repeat: int):
+    from sara_powerbi.tools import pbir
+    tools = {name: fn for name, fn in inspect.getmembers(pbir, inspect.isfunction) if name.startswith("pbir_") and fn.__module__ == pbir.__name__}
+    results = []
+    calls = 0
+    for name, args_for in scenarios(report):
+        fn = tools.pop(name, None)
+        if not fn: continue
+        # Cold: fresh index
+        reset_state()
+        a, kw = args_for(calls); calls += 1
+        t = time.perf_counter(); out = fn(*a, **kw); cold = time.perf_counter() - t
+        settle()
+        # Warm: agent calls are seconds apart, so background index loading has finished
+        times = []
+        for _ in range(repeat):
+            a, kw = args_for(calls); calls += 1
+            t = time.perf_counter(); fn(*a, **kw); times.append(time.perf_counter() - t)
+        # Instrumented (warm)
+        a, kw = args_for(calls); calls += 1
+        tracemalloc.start()
+        with IOCounter() as io:
+            fn(*a, **kw)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results.append({
+            "tool": name,
+            "cold_ms": round(cold * 1000, 2),
+            "warm_median_ms": round(statistics.median(times) * 1000, 3) if times else None,
+            "warm_p95_ms": round(percentile(times, 95) * 1000, 3) if times else None,
+            "files_read": io.files,
+            "bytes_read": io.bytes_read,
+            "bytes_parsed": io.bytes_parsed,
+            "peak_kb": round(peak / 1024, 1),
+            "result": str(out)[:60].replace("\n", " ")
+        })
+    for name in sorted(tools):
+        results.append({"tool": name, "skipped": "no benchmark scenario"})
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark every pbir_* tool on a synthetic report.")
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--visuals", type=int, default=50)
+    ap.add_argument("--refs", type=int, default=4)
+    ap.add_argument("--objects", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--keep", action="store_true", help="keep the generated report")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp(prefix="sara-bench-")
+    try:
+        t = time.perf_counter()
+        report = generate_report(root, args.pages, args.visuals, args.refs, args.objects)
+        print(f"Generated {args.pages * args.visuals} visuals ({args.pages} pages x {args.visuals}, {args.refs} refs) in {time.perf_counter() - t:.1f}s: {report}")
+        os.environ["SARA_REPORT_PATH"] = report
+        results = run(report, args.repeat)
+
+        print(f"{'tool':28s} {'cold ms':>9s} {'warm ms':>9s} {'p95 ms':>9s} {'files':>7s} {'KB read':>9s} {'KB parsed':>10s} {'peak KB':>9s}")
+        for r in results:
+            if "skipped" in r:
+                print(f"{r['tool']:28s} skipped: {r['skipped']}")
+                continue
+            print(f"{r['tool']:28s} {r['cold_ms']:9.1f} {r['warm_median_ms']:9.2f} {r['warm_p95_ms']:9.2f} {r['files_read']:7d} "
+                  f"{r['bytes_read'] / 1024:9.1f} {r['bytes_parsed'] / 1024:10.1f} {r['peak_kb']:9.1f}")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({"pages": args.pages, "visuals": args.visuals, "refs": args.refs, "results": results}, f, indent=2)
+    finally:
+        reset_state()
+        if not args.keep: shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Byte-prefilter benchmark: full json.load scan vs prefiltered scan on a synthetic report.
+
+    python benchmarks/bench_prefilter.py [--pages 50] [--visuals 100]
+
+Runs without Power BI installed.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from synthetic import generate_report, RARE_MEASURE
+from sara_powerbi import scan
+from sara_powerbi.report_index import visual_title
+
+def has_property(obj, name) -> bool:
+    if isinstance(obj, dict):
+        if obj.get("Property") == name: return True
+        return any(has_property(v, name) for v in obj.values())
+    if isinstance(obj, list):
+        return any(has_property(v, name) for v in obj)
+    return False
+
+def full_scan(report: str, match) -> int:
+    """Baseline: json.load every visual.json and test it."""
+    hits = 0
+    for pid, vid, v_file in scan.visual_files(report):
+        with open(v_file, 'r', encoding='utf-8') as f: data = json.load(f)
+        if match(data): hits += 1
+    return hits
+
+def prefiltered_scan(report: str, needle: str, match, stats: dict) -> int:
+    return sum(1 for *_, data in scan.scan_visuals(report, [needle], stats=stats) if match(data))
+
+def best_of(fn, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--visuals", type=int, default=100)
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp(prefix="sara-bench-")
+    try:
+        report = generate_report(root, args.pages, args.visuals)
+        total = args.pages * args.visuals
+        print(f"Synthetic report: {total} visuals, parser: {'orjson' if scan.orjson else 'json'}")
+
+        cases = (
+            ("audit (rare measure)", RARE_MEASURE, lambda d: has_property(d.get("visual"), RARE_MEASURE)),
+            ("audit (common column)", "Month", lambda d: has_property(d.get("visual"), "Month")),
+            ("title lookup", "Visual 7-42", lambda d: visual_title(d) == "Visual 7-42"),
+        )
+        for label, needle, match in cases:
+            hits = full_scan(report, match)
+            base = best_of(lambda: full_scan(report, match))
+            fast = best_of(lambda: prefiltered_scan(report, needle, match, {}))
+            stats = {}
+            prefiltered_scan(report, needle, match, stats)
+            print(f"{label:24s} hits={hits:5d}  full={base*1000:8.1f} ms  prefilter={fast*1000:8.1f} ms  "
+                  f"speedup={base/fast:5.1f}x  parsed={stats.get('parsed', 0)}/{stats.get('files', 0)}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Synthetic PBIR report generator.
+
+    python benchmarks/synthetic.py OUT_DIR [--pages 60] [--visuals 150] [--refs 4] [--objects 8]
+
+Writes OUT_DIR/<name>.Report/definition/pages/*/visuals/*/visual.json with
+pages x visuals visuals, each referencing `refs` fields. Every 500th visual uses
+"Rare Measure" so audits have a selective target. Needs no Power BI install.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+TABLES = {
+    "Sales": [f"Measure {i}" for i in range(40)],
+    "Date": ["Year", "Quarter", "Month", "Day"],
+    "Product": ["Category", "Subcategory", "Brand", "Product"],
+    "Customer": ["Segment", "Region", "City", "Customer"],
+}
+VISUAL_TYPES = ["card", "clusteredBarChart", "lineChart", "tableEx", "slicer", "pieChart"]
+RARE_MEASURE = "Rare Measure"
+
+def _projection(kind: str, table: str, name: str) -> dict:
+    return {
+        "field": {kind: {"Expression": {"SourceRef": {"Entity": table}}, "Property": name}},
+        "queryRef": f"{table}.{name}",
+        "nativeQueryRef": name,
+        "displayName": name
+    }
+
+def visual_doc(vid: str, title: str, n: int, refs: int, objects: int, rng: random.Random) -> dict:
+    """One visual.json with `refs` field references (1 measure per 2 refs) and `objects` dataPoint selectors."""
+    measures = TABLES["Sales"]
+    columns = [(t, c) for t in ("Date", "Product", "Customer") for c in TABLES[t]]
+    category, values = [], []
+    for r in range(refs):
+        if r % 2 == 0:
+            name = RARE_MEASURE if n % 500 == 0 and r == 0 else measures[rng.randrange(len(measures))]
+            values.append(_projection("Measure", "Sales", name))
+        else:
+            category.append(_projection("Column", *columns[rng.randrange(len(columns))]))
+    query_state = {}
+    if category: query_state["Category"] = {"projections": category}
+    if values: query_state["Y"] = {"projections": values}
+    data_points = [{
+        "properties": {"fill": {"solid": {"color": {"expr": {"Literal": {"Value": f"'#{rng.randrange(0xFFFFFF):06X}'"}}}}}},
+        "selector": {"data": [{"scopeId": {"Comparison": {"ComparisonKind": 0,
+            "Left": {"Column": {"Expression": {"SourceRef": {"Entity": "Product"}}, "Property": "Category"}},
+            "Right": {"Literal": {"Value": f"'Category {i}'"}}}}}]}
+    } for i in range(objects)]
+    col, row = n % 4, (n // 4) % 6
+    return {
+        "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.4.0/schema.json",
+        "name": vid,
+        "position": {"x": 20 + col * 310, "y": 20 + row * 115, "z": n, "width": 300, "height": 110, "tabOrder": n},
+        "visual": {
+            "visualType": VISUAL_TYPES[n % len(VISUAL_TYPES)],
+            "query": {"queryState": query_state},
+            "objects": {
+                "general": [{"properties": {"title": {"expr": {"Literal": {"Value": f"'{title}'"}}}}}],
+                "dataPoint": data_points
+            },
+            "drillFilterOtherVisuals": True
+        }
+    }
+
+def generate_report(root: str, pages: int = 10, visuals: int = 50, refs: int = 4, objects: int = 8, name: str = "Synthetic", seed: int = 0) -> str:
+    """Generates a .Report tree under root and returns its path. Titles are 'Visual {page}-{visual}', pages 'Page {n}'."""
+    rng = random.Random(seed)
+    report = os.path.join(root, f"{name}.Report")
+    pages_dir = os.path.join(report, "definition", "pages")
+    os.makedirs(pages_dir, exist_ok=True)
+    order = []
+    n = 0
+    for p in range(pages):
+        pid = f"page{p:04d}"
+        order.append(pid)
+        os.makedirs(os.path.join(pages_dir, pid, "visuals"), exist_ok=True)
+        with open(os.path.join(pages_dir, pid, "page.json"), 'w', encoding='utf-8') as f:
+            json.dump({"$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/page/2.0.0/schema.json",
+                       "name": pid, "displayName": f"Page {p}", "width": 1280, "height": 720, "displayOption": "FitToPage"}, f, indent=2)
+        for v in range(visuals):
+            vid = f"v{p:04d}{v:05d}"
+            os.makedirs(os.path.join(pages_dir, pid, "visuals", vid), exist_ok=True)
+            with open(os.path.join(pages_dir, pid, "visuals", vid, "visual.json"), 'w', encoding='utf-8') as f:
+                json.dump(visual_doc(vid, f"Visual {p}-{v}", n, refs, objects, rng), f, indent=2)
+            n += 1
+    with open(os.path.join(pages_dir, "pages.json"), 'w', encoding='utf-8') as f:
+        json.dump({"$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/pagesMetadata/1.0.0/schema.json",
+                   "pageOrder": order, "activePageName": order[0] if order else None}, f, indent=2)
+    return report
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("out_dir")
+    ap.add_argument("--pages", type=int, default=60)
+    ap.add_argument("--visuals", type=int, default=150)
+    ap.add_argument("--refs", type=int, default=4)
+    ap.add_argument("--objects", type=int, default=8)
+    ap.add_argument("--name", default="Synthetic")
+    args = ap.parse_args()
+    path = generate_report(args.out_dir, args.pages, args.visuals, args.refs, args.objects, args.name)
+    print(path, file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
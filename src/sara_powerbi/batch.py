@@ -0,0 +1,188 @@
+import os
+import json
+from typing import List, Dict
+
+from .report_index import file_sig, get_index, load_json, visual_title
+from .refactor import StagedFiles
+from . import visuals, layout
+
+class BatchSession:
+    """
+    Applies PBIR edit operations to in-memory documents.
+    Targets are resolved once against the report index (or against documents
+    created earlier in the batch); nothing touches the disk until commit(),
+    which stages each touched file once and replaces them all together.
+    """
+    def __init__(self, report_path: str):
+        self.report_path = report_path
+        self.index = get_index(report_path)
+        self.pages = {p["name"]: {"id": p["id"], "name": p["name"], "width": p["width"], "height": p["height"]} for p in self.index.pages()}
+        self.new_pages: List[Dict] = []
+        self.docs: Dict[tuple, Dict] = {}
+        self.deleted = set()
+
+    # --- Resolution ---
+
+    def page(self, op: Dict) -> Dict:
+        name = op.get("page_name")
+        page = self.pages.get(name)
+        if not page: raise ValueError(f"Page '{name}' not found.")
+        return page
+
+    def visual(self, op: Dict) -> Dict:
+        """Returns the working document of the targeted visual (loaded once per batch)."""
+        page = self.page(op)
+        title, visual_id = op.get("visual_title"), op.get("visual_id")
+        if visual_id:
+            key = (page["id"], visual_id)
+            if key in self.docs: return self.docs[key]
+            if key in self.deleted: raise ValueError(f"Visual '{visual_id}' was deleted in this batch.")
+            vis = self.index.find_visual(page["id"], visual_id=visual_id)
+        else:
+            # Documents already in the batch carry the current (possibly renamed) title
+            for key, doc in self.docs.items():
+                if key[0] == page["id"] and visual_title(doc["data"]) == title: return doc
+            vis = next((v for v in self.index.visuals(page["id"])
+                        if v["title"] == title and (page["id"], v["id"]) not in self.docs and (page["id"], v["id"]) not in self.deleted), None)
+        if not vis: raise ValueError(f"Visual '{title or visual_id}' not found on '{page['name']}'.")
+        sig = file_sig(vis["path"])
+        data = load_json(vis["path"])
+        if data is None: raise ValueError(f"Could not read '{vis['path']}'.")
+        doc = self.docs[(page["id"], vis["id"])] = {"page_id": page["id"], "id": vis["id"], "data": data, "new": False, "dirty": False, "sig": sig}
+        return doc
+
+    # --- Operations ---
+
+    def op_create_page(self, op: Dict) -> str:
+        name = op.get("name") or op.get("page_name")
+        if not name: raise ValueError("'name' is required.")
+        if name in self.pages: raise ValueError(f"Page '{name}' already exists.")
+        page_id = visuals.new_id()
+        width, height = op.get("width", 1280), op.get("height", 720)
+        self.new_pages.append(visuals.page_doc(page_id, name, width, height))
+        self.pages[name] = {"id": page_id, "name": name, "width": width, "height": height}
+        return page_id
+
+    def occupied(self, page_id: str) -> List[tuple]:
+        """Rects of the visuals on a page as the batch currently sees them (pending edits included)."""
+        rects = [layout.rect_of(doc["data"].get("position", {})) for (pid, _), doc in self.docs.items() if pid == page_id and doc["data"]]
+        if any(p["name"] == page_id for p in self.new_pages): return rects
+        rects += [layout.rect_of(v["position"]) for v in self.index.visuals(page_id)
+                  if (page_id, v["id"]) not in self.docs and (page_id, v["id"]) not in self.deleted]
+        return rects
+
+    def _add_visual(self, op: Dict, data: Dict, vis_id: str) -> str:
+        page = self.page(op)
+        if any(op.get(k) is not None for k in ("x", "y", "width", "height", "z")):
+            visuals.set_position(data, op.get("x"), op.get("y"), op.get("width"), op.get("height"), op.get("z"))
+        if data and op.get("x") is None and op.get("y") is None:
+            # No explicit position: first free spot instead of the template's fixed coordinates
+            _, _, w, h = layout.rect_of(data.get("position", {}))
+            x, y = layout.free_spot(self.occupied(page["id"]), w, h, page["width"], page["height"])
+            visuals.set_position(data, x=x, y=y)
+        self.docs[(page["id"], vis_id)] = {"page_id": page["id"], "id": vis_id, "data": data, "new": True, "dirty": True}
+        return vis_id
+
+    def op_create_visual(self, op: Dict) -> str:
+        vis_id = visuals.new_id()
+        return self._add_visual(op, visuals.visual_doc(vis_id, op.get("visual_type"), op.get("title", "New Visual")), vis_id)
+
+    def op_create_bar_chart(self, op: Dict) -> str:
+        vis_id = visuals.new_id()
+        data = visuals.bar_chart_doc(vis_id, op["visual_title"], op["category_table"], op["category_col"], op["value_table"], op["value_measure"])
+        return self._add_visual(op, data, vis_id)
+
+    def op_create_chart(self, op: Dict) -> str:
+        vis_id = visuals.new_id()
+        roles = {role: [tuple(f) for f in fields] for role, fields in op["fields"].items()}
+        data = visuals.query_visual_doc(vis_id, op["visual_type"], op.get("title", "New Visual"), roles,
+                                        op.get("width") or 400, op.get("height") or 300)
+        return self._add_visual(op, data, vis_id)
+
+    def op_bind_measure(self, op: Dict) -> str:
+        doc = self.visual(op)
+        visuals.bind_measure(doc["data"], op["measure_table"], op["measure_name"])
+        doc["dirty"] = True
+        return doc["id"]
+
+    def op_format_visual(self, op: Dict) -> str:
+        doc = self.visual(op)
+        if op.get("new_title"): visuals.set_title(doc["data"], op["new_title"])
+        if op.get("rename_fields"): visuals.rename_fields(doc["data"], op["rename_fields"])
+        doc["dirty"] = True
+        return doc["id"]
+
+    def op_update_layout(self, op: Dict) -> str:
+        doc = self.visual(op)
+        visuals.set_position(doc["data"], op.get("x"), op.get("y"), op.get("width"), op.get("height"), op.get("z"))
+        doc["dirty"] = True
+        return doc["id"]
+
+    def op_delete_visual(self, op: Dict) -> str:
+        doc = self.visual(op)
+        key = (doc["page_id"], doc["id"])
+        del self.docs[key]
+        if not doc["new"]: self.deleted.add(key)
+        return doc["id"]
+
+    def apply(self, op: Dict) -> str:
+        handler = getattr(self, f"op_{op.get('op')}", None)
+        if not handler: raise ValueError(f"Unknown op '{op.get('op')}'.")
+        return handler(op)
+
+    # --- Commit ---
+
+    def commit(self) -> Dict:
+        """
+        Stages new pages, one pages.json update and each touched visual as temp files, then
+        replaces them and removes deleted visual folders; a failure restores every file.
+        """
+        pages_dir = os.path.join(self.report_path, "definition", "pages")
+        tx = StagedFiles()
+        for page in self.new_pages: tx.write_json(os.path.join(pages_dir, page["name"], "page.json"), page)
+        if self.new_pages:
+            pages_reg = os.path.join(pages_dir, "pages.json")
+            reg = load_json(pages_reg) or {}
+            reg["pageOrder"] = list(reg.get("pageOrder", [])) + [p["name"] for p in self.new_pages]
+            reg.pop("pages", None)
+            tx.write_json(pages_reg, reg)
+
+        written = []
+        for doc in self.docs.values():
+            if not doc["dirty"]: continue
+            path = os.path.join(pages_dir, doc["page_id"], "visuals", doc["id"], "visual.json")
+            # Visuals read at the start of the batch must not have changed on disk since
+            if tx.write_json(path, doc["data"], doc.get("sig", False)): written.append((doc, path))
+        for page_id, vis_id in self.deleted: tx.remove_dir(os.path.join(pages_dir, page_id, "visuals", vis_id))
+        tx.commit()
+
+        if self.new_pages: self.index.invalidate("")
+        for doc, path in written: self.index.record(doc["page_id"], doc["id"], path, doc["data"])
+        for page_id, vis_id in self.deleted: self.index.forget(page_id, vis_id)
+        return {"pages_created": len(self.new_pages), "visuals_written": len(written), "visuals_deleted": len(self.deleted)}
+
+def apply_batch(report_path: str, operations, dry_run: bool = False) -> Dict:
+    """
+    Runs a list of operations as one transaction: every op is applied in memory
+    first; if any fails nothing is written, and a failure while writing rolls back
+    the files already replaced. Returns per-op results.
+    """
+    if isinstance(operations, str): operations = json.loads(operations)
+    session = BatchSession(report_path)
+    results = []
+    for i, op in enumerate(operations):
+        try:
+            target = session.apply(op)
+            results.append({"index": i, "op": op.get("op"), "status": "ok", "id": target})
+        except Exception as e:
+            results.append({"index": i, "op": op.get("op"), "status": "error", "error": str(e) or repr(e)})
+
+    failed = [r for r in results if r["status"] == "error"]
+    res = {"committed": False, "operations": len(results), "errors": len(failed), "results": results}
+    if failed or dry_run: return res
+    try: res.update(session.commit())
+    except Exception as e:
+        res["error"] = str(e)
+        return res
+    res["committed"] = True
+    return res
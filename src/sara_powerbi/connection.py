@@ -1,101 +1,431 @@
 import sys
 import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
 import psutil
+from .executors import LOCKS
 try:
     import clr
 except ImportError:
     clr = None # Handle non-windows or missing pythonnet gracefully
 
 # Global State for caching port/connection info if needed
-GLOBAL_CONTEXT = {"port": None}
+GLOBAL_CONTEXT = {"port": None, "pid": None, "libs": False}
+
+# Seconds a pooled session is trusted before it is health-checked (and the model re-synced if it changed)
+CHECK_SECONDS = 2.0
+# Pooled sessions unused for this long are closed
+IDLE_SECONDS = 300.0
+# Max open ADOMD connections per instance
+POOL_SIZE = 4
 
 def load_libs() -> bool:
     """
     Loads the necessary Analysis Services (TOM/ADOMD) DLLs from Power BI Desktop installation.
-    Returns True if loaded, False otherwise.
+    Returns True if loaded, False otherwise. A successful load is remembered for the process.
     """
     if not clr:
         return False
-        
+    if GLOBAL_CONTEXT["libs"]:
+        return True
+
     search_paths = [
-        r"C:\Program Files\Microsoft Power BI Desktop\bin", 
+        r"C:\Program Files\Microsoft Power BI Desktop\bin",
         r"C:\Program Files (x86)\Microsoft Power BI Desktop\bin"
     ]
-    
+
     # Try dynamic detection from running process
     for proc in psutil.process_iter(['pid', 'name', 'exe']):
         if proc.info['name'] and 'msmdsrv.exe' in proc.info['name'].lower():
             try:
                 exe_path = proc.info['exe']
-                if exe_path: 
+                if exe_path:
                     search_paths.insert(0, os.path.dirname(exe_path))
             except: pass
-    
+
     loaded = False
     for path in search_paths:
         if not os.path.exists(path): continue
         try:
             sys.path.append(path)
-            try: 
+            try:
                 clr.AddReference("Microsoft.AnalysisServices.AdomdClient")
-            except: 
+            except:
                 clr.AddReference("Microsoft.PowerBI.AdomdClient")
-                
-            try: 
+
+            try:
                 clr.AddReference("Microsoft.AnalysisServices.Tabular")
                 loaded = True
-            except: 
-                try: 
+            except:
+                try:
                     clr.AddReference("Microsoft.PowerBI.Tabular")
                     loaded = True
                 except: pass
         except: pass
-        
+
         if loaded: break
-        
+
+    GLOBAL_CONTEXT["libs"] = loaded
     return loaded
 
 def find_port() -> int | None:
-    """Finds the local TCP port of the running Power BI Analysis Services instance."""
+    """
+    Finds the local TCP port of the running Power BI Analysis Services instance.
+    The result is reused while the same msmdsrv.exe process is alive.
+    """
+    pid, port = GLOBAL_CONTEXT.get("pid"), GLOBAL_CONTEXT.get("port")
+    if pid and port and psutil.pid_exists(pid):
+        return port
     for proc in psutil.process_iter(['pid', 'name']):
         if proc.info['name'] and 'msmdsrv.exe' in proc.info['name'].lower():
             try:
                 for conn in proc.connections(kind='tcp'):
                     if conn.status == 'LISTEN' and conn.laddr.ip == '127.0.0.1':
+                        GLOBAL_CONTEXT["pid"] = proc.info['pid']
                         return conn.laddr.port
             except: pass
+    GLOBAL_CONTEXT["pid"] = None
     return None
 
+def _adomd_connection_class():
+    try:
+        from Microsoft.AnalysisServices.AdomdClient import AdomdConnection
+    except:
+        from Microsoft.PowerBI.AdomdClient import AdomdConnection
+    return AdomdConnection
+
+class ClrBackend:
+    """
+    Live Analysis Services sessions through pythonnet (TOM Server + ADOMD.NET).
+    SessionManager only talks to this interface, so tests can pass a fake backend.
+    """
+    def data_source(self) -> str:
+        """Connection string of the current instance (explicit XMLA connection, else local Desktop port)."""
+        if not load_libs():
+            raise Exception("Failed to load Power BI DLLs. Is Power BI Desktop installed?")
+        cs = GLOBAL_CONTEXT.get("connection_string")
+        if cs: return cs
+        port = find_port()
+        if not port:
+            raise Exception("Power BI Desktop is not running or no model is open.")
+        GLOBAL_CONTEXT["port"] = port
+        return f"Data Source=localhost:{port};"
+
+    def forget(self):
+        """Drops cached instance detection (e.g. Desktop was restarted on another port)."""
+        GLOBAL_CONTEXT["pid"] = None
+
+    def open_server(self, data_source: str):
+        from Microsoft.AnalysisServices.Tabular import Server
+        s = Server()
+        s.Connect(data_source)
+        return s
+
+    def close_server(self, server):
+        server.Disconnect()
+
+    def server_alive(self, server) -> bool:
+        return bool(server.Connected)
+
+    def open_adomd(self, data_source: str):
+        conn = _adomd_connection_class()(data_source)
+        conn.Open()
+        return conn
+
+    def close_adomd(self, conn):
+        conn.Close()
+
+    def adomd_alive(self, conn) -> bool:
+        return str(conn.State) == "Open"
+
+    def model_stamp(self, conn):
+        """Cheap server-side change marker: last modification time of every database."""
+        cmd = conn.CreateCommand()
+        cmd.CommandText = "SELECT [CATALOG_NAME], [DATE_MODIFIED] FROM $SYSTEM.DBSCHEMA_CATALOGS"
+        reader = cmd.ExecuteReader()
+        try:
+            stamp = []
+            while reader.Read(): stamp.append((str(reader.GetValue(0)), str(reader.GetValue(1))))
+            return tuple(stamp)
+        finally: reader.Close()
+
+    def sync(self, server):
+        """Re-reads model metadata changed by another client (e.g. edits in Desktop)."""
+        for db in server.Databases: db.Refresh(True)
+
+class SessionManager:
+    """
+    Keeps one connected TOM Server and a bounded pool of open ADOMD connections
+    for the current instance. Sessions are health-checked when they have not
+    been used for CHECK_SECONDS, reopened on failure (re-detecting the instance
+    once if it moved) and closed after IDLE_SECONDS without use. Switching
+    instance (manage_model_connection) closes everything.
+
+    A model change seen by a check only marks the Server stale. The first
+    server() call of an exclusive hold (exclusive() -> hold number, default: the
+    model write lock) re-syncs it in place, before anything is staged; a caller
+    without the lock gets a new connection instead and the old one is closed by
+    the next exclusive caller.
+    """
+    def __init__(self, backend, pool_size: int = POOL_SIZE, idle_seconds: float = IDLE_SECONDS,
+                 check_seconds: float = CHECK_SECONDS, clock: Callable[[], float] = time.monotonic,
+                 exclusive: Callable[[], Optional[int]] = None):
+        self.backend = backend
+        self.exclusive = exclusive or LOCKS["model"].hold
+        self.pool_size = pool_size
+        self.idle_seconds = idle_seconds
+        self.check_seconds = check_seconds
+        self.clock = clock
+        self._lock = threading.Condition(threading.RLock())
+        self._ds: Optional[str] = None
+        self._gen = 0
+        self._server = None
+        self._server_used = 0.0
+        self._stale = False
+        self._served_hold = None # exclusive hold the Server was last handed to
+        self._retired: List = [] # replaced Servers other readers may still be using
+        self._stamp = None
+        self._checked = float("-inf")
+        self._idle: List[tuple] = []   # [(conn, last_used)], most recently used last
+        self._busy: Dict[int, int] = {} # id(conn) -> generation
+        self._listeners: List[Callable[[], None]] = []
+        self.stats = {"servers_opened": 0, "adomd_opened": 0, "reused": 0, "reconnects": 0, "evicted": 0, "syncs": 0}
+
+    # --- Instance binding ---
+
+    def _bind(self) -> str:
+        ds = self.backend.data_source()
+        if ds != self._ds: self._rebind(ds)
+        return ds
+
+    def _rebind(self, ds: str):
+        self._close_idle()
+        self._drop_server()
+        self._close_retired()
+        self._ds, self._gen, self._stamp = ds, self._gen + 1, None
+        self._checked = float("-inf")
+
+    def _open(self, open_fn, ds: str):
+        """Opens a session; on failure re-detects the instance once and retries if it moved."""
+        try: return open_fn(ds)
+        except Exception:
+            self.backend.forget()
+            new_ds = self.backend.data_source()
+            if new_ds == ds: raise
+            with self._lock: self._rebind(new_ds)
+            return open_fn(new_ds)
+
+    def _quiet(self, fn, *args):
+        try: return fn(*args)
+        except Exception: return None
+
+    # --- TOM Server ---
+
+    def _drop_server(self):
+        if self._server is not None: self._quiet(self.backend.close_server, self._server)
+        self._server, self._stale = None, False
+
+    def _close_retired(self):
+        for s in self._retired: self._quiet(self.backend.close_server, s)
+        self._retired = []
+
+    def server(self):
+        """Returns the shared connected Server (do not Disconnect it)."""
+        with self._lock:
+            ds = self._bind()
+            now = self.clock()
+            s = self._server
+            if s is not None and now - self._server_used >= self.idle_seconds:
+                self._drop_server(); s = None; self.stats["evicted"] += 1
+            trusted = s is not None and now - self._server_used < self.check_seconds
+            if not trusted and s is not None and not self._quiet(self.backend.server_alive, s):
+                self._drop_server(); s = None; self.stats["reconnects"] += 1
+            fresh = s is None
+            if fresh:
+                s = self._server = self._open(self.backend.open_server, ds)
+                self.stats["servers_opened"] += 1
+            else: self.stats["reused"] += 1
+            self._server_used = now
+        # Outside the lock: the stamp query borrows a pooled ADOMD connection
+        if not trusted: self._check_model(s, fresh)
+        return self._current(s)
+
+    def _current(self, s):
+        """Brings a stale Server up to date for the caller: re-sync if it is exclusive, else a new connection."""
+        hold = self.exclusive()
+        with self._lock:
+            # Nobody else can be using a replaced Server while the model is held exclusively
+            first = hold is not None and hold != self._served_hold
+            if hold is not None:
+                self._close_retired()
+                self._served_hold = hold
+            if not self._stale or self._server is not s: return s
+            if hold is None:
+                # Readers may be walking s (and writers may not touch it): leave it connected
+                self._retired.append(s)
+                self._server, self._stale = None, False
+                s = self._server = self._open(self.backend.open_server, self._ds)
+                self._server_used = self.clock()
+                self.stats["servers_opened"] += 1
+                return s
+            # Later calls of the same hold may have staged changes a refresh would throw away
+            if not first: return s
+            self._stale = False
+        self.backend.sync(s)
+        self.stats["syncs"] += 1
+        return s
+
+    def _check_model(self, server, fresh: bool):
+        try:
+            # Never wait on a full pool here (the caller may be holding a connection)
+            with self.adomd(timeout=0) as conn: stamp = self.backend.model_stamp(conn)
+        except Exception: return
+        with self._lock:
+            changed = self._stamp is not None and stamp != self._stamp
+            self._stamp = stamp
+            self._checked = self.clock()
+            # Only recorded here: callers of check() hold no model lock
+            if changed and not fresh and self._server is not None: self._stale = True
+        if changed: self._notify()
+
+    def model_key(self) -> tuple:
+        """(instance, session generation, model stamp): cache keys built with it never match another model version."""
+        with self._lock: return (self._ds, self._gen, self._stamp)
+
+    def check(self):
+        """
+        Re-reads the model stamp unless it was read in the last check_seconds (listeners hear about changes).
+        Safe without the model lock: a change marks the Server stale, server() applies it.
+        """
+        with self._lock:
+            if self.clock() - self._checked < self.check_seconds: return
+            server = self._server
+        self._check_model(server, fresh=server is None)
+
+    # --- ADOMD pool ---
+
+    def _close_idle(self, older_than: float = None):
+        now = self.clock()
+        keep = []
+        for conn, last in self._idle:
+            if older_than is None or now - last >= older_than:
+                self._quiet(self.backend.close_adomd, conn)
+                if older_than is not None: self.stats["evicted"] += 1
+            else: keep.append((conn, last))
+        self._idle = keep
+        self._lock.notify_all()
+
+    def acquire(self, timeout: float = None):
+        """Borrows an open ADOMD connection (waits while pool_size connections are in use)."""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._lock:
+            ds = self._bind()
+            self._close_idle(self.idle_seconds)
+            while True:
+                while self._idle:
+                    conn, last = self._idle.pop()
+                    if self.clock() - last < self.check_seconds or self._quiet(self.backend.adomd_alive, conn):
+                        self._busy[id(conn)] = self._gen
+                        self.stats["reused"] += 1
+                        return conn
+                    self._quiet(self.backend.close_adomd, conn)
+                    self.stats["reconnects"] += 1
+                if len(self._busy) < self.pool_size: break
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No ADOMD connection available (pool of {self.pool_size} in use).")
+                self._lock.wait(remaining)
+            # Reserve the slot, open outside the lock
+            token = object()
+            self._busy[id(token)] = self._gen
+        try:
+            conn = self._open(self.backend.open_adomd, ds)
+        except Exception:
+            with self._lock:
+                self._busy.pop(id(token), None); self._lock.notify_all()
+            raise
+        with self._lock:
+            self._busy.pop(id(token), None)
+            self._busy[id(conn)] = self._gen
+            self.stats["adomd_opened"] += 1
+        return conn
+
+    def release(self, conn, healthy: bool = True):
+        """Returns a connection to the pool (closed instead if unhealthy or from a previous instance)."""
+        with self._lock:
+            gen = self._busy.pop(id(conn), None)
+            if healthy and gen == self._gen and len(self._idle) < self.pool_size:
+                self._idle.append((conn, self.clock()))
+            else:
+                self._quiet(self.backend.close_adomd, conn)
+            self._lock.notify_all()
+
+    @contextmanager
+    def adomd(self, timeout: float = None):
+        """with SESSIONS.adomd() as conn: ... (pooled; a connection that failed is health-checked before reuse)."""
+        conn = self.acquire(timeout)
+        healthy = True
+        try:
+            yield conn
+        except BaseException:
+            healthy = bool(self._quiet(self.backend.adomd_alive, conn))
+            raise
+        finally:
+            self.release(conn, healthy)
+
+    # --- Change notification ---
+
+    def add_listener(self, fn: Callable[[], None]):
+        """fn() is called after the model changed (own SaveChanges, another client's edit or a reset)."""
+        self._listeners.append(fn)
+
+    def _notify(self):
+        for fn in list(self._listeners): self._quiet(fn)
+
+    def saved(self):
+        """Marks a SaveChanges done through this server: no re-sync needed, caches are invalidated."""
+        with self._lock: self._stamp = None
+        self._notify()
+
+    # --- Lifecycle ---
+
+    def info(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, data_source=self._ds, server=self._server is not None, server_stale=self._stale,
+                        retired_servers=len(self._retired), adomd_idle=len(self._idle), adomd_busy=len(self._busy))
+
+    def reset(self):
+        """Closes every session; the next call reconnects to the (possibly new) instance."""
+        with self._lock:
+            self._close_idle()
+            self._drop_server()
+            self._close_retired()
+            self._ds, self._gen, self._stamp = None, self._gen + 1, None
+            self._checked = float("-inf")
+        self._notify()
+
+    close = reset
+
+# Process-wide sessions for the live instance
+SESSIONS = SessionManager(ClrBackend())
+atexit.register(SESSIONS.close)
+
 def get_server():
-    """Returns a connected TOM Server object."""
-    if not load_libs(): 
-        raise Exception("Failed to load Power BI DLLs. Is Power BI Desktop installed?")
-        
-    port = find_port()
-    if not port: 
-        raise Exception("Power BI Desktop is not running or no model is open.")
-    
-    GLOBAL_CONTEXT["port"] = port
-    
-    from Microsoft.AnalysisServices.Tabular import Server
-    s = Server()
-    s.Connect(f"Data Source=localhost:{port};")
-    return s
+    """Returns the shared connected TOM Server object."""
+    return SESSIONS.server()
+
+def adomd_session(timeout: float = None):
+    """Context manager yielding a pooled open AdomdConnection (returned to the pool on exit)."""
+    return SESSIONS.adomd(timeout)
+
+def save_changes(model):
+    """model.SaveChanges() plus session bookkeeping (cache invalidation)."""
+    model.SaveChanges()
+    SESSIONS.saved()
 
 def get_adomd_connection():
-    """Returns an open AdomdConnection for querying."""
-    if not load_libs():
-        raise Exception("Failed to load Power BI DLLs.")
-        
-    port = find_port()
-    if not port:
-        raise Exception("Power BI Desktop is not running.")
-        
-    try: 
-        from Microsoft.AnalysisServices.AdomdClient import AdomdConnection
-    except: 
-        from Microsoft.PowerBI.AdomdClient import AdomdConnection
-    
-    conn = AdomdConnection(f"Data Source=localhost:{port};")
-    conn.Open()
-    return conn
+    """Returns a dedicated open AdomdConnection for querying (caller closes it). Prefer adomd_session()."""
+    return SESSIONS.backend.open_adomd(SESSIONS.backend.data_source())
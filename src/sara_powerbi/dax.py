@@ -0,0 +1,308 @@
+import json
+import math
+import threading
+from collections import OrderedDict
+import time
+import uuid
+from datetime import date, datetime, time as dtime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .connection import SESSIONS
+from .executors import cancellable, check
+
+# DAX query execution helpers: typed cell conversion, page reads and
+# server-side cursors that keep a reader open between run_dax calls.
+
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+# Open cursors hold a pooled ADOMD connection: keep few, expire them quickly
+MAX_CURSORS = 2
+CURSOR_SECONDS = 120.0
+# Result cache budget (serialized JSON bytes); bigger results are never cached
+CACHE_BYTES = 64 * 1024 * 1024
+CACHE_ENTRY_BYTES = 8 * 1024 * 1024
+
+def _net(name: str):
+    import System
+    return getattr(System, name)
+
+def _plain(v):
+    if isinstance(v, float) and not math.isfinite(v): return None
+    return v
+
+def _net_datetime(v):
+    return v.ToString("s") # sortable ISO 8601, culture-invariant
+
+def _net_number(v):
+    return _plain(float(_net("Convert").ToDouble(v)))
+
+_NET_CONVERTERS = {
+    "Boolean": bool, "String": str,
+    "Int16": int, "Int32": int, "Int64": int, "Byte": int, "UInt16": int, "UInt32": int, "UInt64": int,
+    "Double": _plain, "Single": _plain,
+    "Decimal": _net_number, "DateTime": _net_datetime,
+}
+
+def to_json_value(v):
+    """One cell as a JSON-ready value: numbers stay numbers, dates become ISO strings, blanks None."""
+    if v is None: return None
+    if isinstance(v, (bool, int, str)): return v
+    if isinstance(v, float): return _plain(v)
+    if isinstance(v, Decimal): return _plain(float(v))
+    if isinstance(v, (datetime, date, dtime)): return v.isoformat()
+    name = type(v).__name__
+    if name == "DBNull": return None
+    if name == "DateTime": return _net_datetime(v)
+    if name == "Decimal": return _net_number(v)
+    return str(v)
+
+def column_types(reader) -> List[str]:
+    """.NET type name of each result column ('Int64', 'DateTime'...)."""
+    out = []
+    for i in range(reader.FieldCount):
+        try: out.append(str(reader.GetFieldType(i).Name))
+        except Exception: out.append("Object")
+    return out
+
+def converters(types: List[str]) -> List[Callable]:
+    """Per-column converters; blanks (DBNull) are handled by read_rows."""
+    return [_NET_CONVERTERS.get(t, to_json_value) for t in types]
+
+def read_rows(reader, convert: List[Callable], limit: Optional[int]) -> Tuple[List[List], bool]:
+    """Reads up to limit rows as lists of typed values; returns (rows, exhausted)."""
+    rows, n = [], len(convert)
+    get, is_null = reader.GetValue, reader.IsDBNull
+    while limit is None or len(rows) < limit:
+        if not len(rows) & 1023: check()
+        if not reader.Read(): return rows, True
+        row = []
+        for i in range(n):
+            if is_null(i): row.append(None); continue
+            try: row.append(convert[i](get(i)))
+            except Exception: row.append(to_json_value(get(i)))
+        rows.append(row)
+    return rows, False
+
+def columnar(columns: List[str], rows: List[List]) -> Dict[str, List]:
+    """Row lists -> {column: [values]}."""
+    return {c: [r[i] for r in rows] for i, c in enumerate(columns)}
+
+class DaxCursor:
+    """An open reader (and the pooled connection it runs on) positioned after `offset` rows."""
+    __slots__ = ("token", "conn", "cmd", "reader", "columns", "types", "convert", "offset", "used", "done")
+    def __init__(self, token: str, conn, cmd, reader, used: float):
+        self.token, self.conn, self.cmd, self.reader, self.used = token, conn, cmd, reader, used
+        self.columns = [reader.GetName(i) for i in range(reader.FieldCount)]
+        self.types = column_types(reader)
+        self.convert = converters(self.types)
+        self.offset = 0
+        self.done = False
+
+    def fetch(self, n: int) -> List[List]:
+        with cancellable(self.cmd.Cancel): rows, self.done = read_rows(self.reader, self.convert, n)
+        self.offset += len(rows)
+        return rows
+
+class CursorStore:
+    """
+    Server-side cursors for paged run_dax. Each open cursor holds a pooled
+    connection; at most `limit` stay open (the least recently used is closed
+    first) and any cursor idle for `ttl` seconds is closed.
+    """
+    def __init__(self, sessions=SESSIONS, limit: int = MAX_CURSORS, ttl: float = CURSOR_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.sessions, self.limit, self.ttl, self.clock = sessions, limit, ttl, clock
+        self._lock = threading.Lock()
+        self._open: Dict[str, DaxCursor] = {}
+
+    def _release(self, cur: DaxCursor, failed: bool = False):
+        healthy = True
+        try: cur.reader.Close()
+        except Exception: healthy = False
+        if failed:
+            try: healthy = healthy and bool(self.sessions.backend.adomd_alive(cur.conn))
+            except Exception: healthy = False
+        self.sessions.release(cur.conn, healthy)
+
+    def _evict(self, room: bool) -> List[DaxCursor]:
+        """Pops expired cursors (and, with room=True, the least recently used ones beyond limit - 1)."""
+        now = self.clock()
+        out = [c for c in self._open.values() if now - c.used >= self.ttl]
+        for c in out: del self._open[c.token]
+        while room and self._open and len(self._open) >= self.limit:
+            lru = min(self._open.values(), key=lambda c: c.used)
+            out.append(self._open.pop(lru.token))
+        return out
+
+    def open(self, query: str, timeout: float = None) -> DaxCursor:
+        with self._lock: stale = self._evict(room=True)
+        for c in stale: self._release(c)
+        conn = self.sessions.acquire(timeout)
+        try:
+            cmd = conn.CreateCommand()
+            cmd.CommandText = query
+            with cancellable(cmd.Cancel): reader = cmd.ExecuteReader()
+        except Exception:
+            try: healthy = bool(self.sessions.backend.adomd_alive(conn))
+            except Exception: healthy = False
+            self.sessions.release(conn, healthy)
+            raise
+        return DaxCursor(uuid.uuid4().hex, conn, cmd, reader, self.clock())
+
+    def keep(self, cur: DaxCursor):
+        """Parks a cursor with rows left so a later call can continue it."""
+        cur.used = self.clock()
+        with self._lock: self._open[cur.token] = cur
+
+    def take(self, token: str) -> DaxCursor:
+        with self._lock:
+            stale = self._evict(room=False)
+            cur = self._open.pop(token, None)
+        for c in stale: self._release(c)
+        if cur is None: raise ValueError("Cursor not found or expired; run the query again.")
+        return cur
+
+    def close(self, cur: DaxCursor, failed: bool = False):
+        self._release(cur, failed)
+
+    def close_all(self):
+        with self._lock:
+            curs = list(self._open.values()); self._open.clear()
+        for c in curs: self._release(c)
+
+    def info(self) -> Dict:
+        with self._lock: return {"open": len(self._open), "limit": self.limit, "ttl": self.ttl}
+
+CURSORS = CursorStore()
+# A changed model (or another instance) invalidates what open readers would return
+SESSIONS.add_listener(CURSORS.close_all)
+
+def run_page(query: str = None, cursor: str = None, page_size: int = PAGE_SIZE, timeout: float = None) -> Dict:
+    """
+    First page of query, or the next page of an open cursor.
+    {"columns", "types", "data" (columnar), "offset", "rows", "next" (token or None)}.
+    """
+    size = max(1, min(int(page_size or PAGE_SIZE), MAX_PAGE_SIZE))
+    cur = CURSORS.take(cursor) if cursor else CURSORS.open(query, timeout)
+    try:
+        start = cur.offset
+        rows = cur.fetch(size)
+    except Exception:
+        CURSORS.close(cur, failed=True)
+        raise
+    if cur.done: CURSORS.close(cur)
+    else: CURSORS.keep(cur)
+    return {"columns": cur.columns, "types": cur.types, "data": columnar(cur.columns, rows),
+            "offset": start, "rows": len(rows), "next": None if cur.done else cur.token}
+
+# --- Result cache ---
+
+def normalize_query(query: str) -> str:
+    """Query text without comments and with whitespace collapsed outside "strings", 'names' and [names]."""
+    out, i, n = [], 0, len(query)
+    space = False
+    while i < n:
+        c = query[i]
+        if c in "\"'[":
+            close = "]" if c == "[" else c
+            j = i + 1
+            while j < n:
+                if query[j] == close:
+                    if close != "]" and query[j + 1:j + 2] == close: j += 2; continue
+                    break
+                j += 1
+            chunk, i = query[i:j + 1], j + 1
+        elif query.startswith("//", i) or query.startswith("--", i):
+            j = query.find("\n", i)
+            i = n if j < 0 else j
+            space = True; continue
+        elif query.startswith("/*", i):
+            j = query.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+            space = True; continue
+        elif c.isspace():
+            i += 1; space = True; continue
+        else:
+            chunk, i = c, i + 1
+        if space and out: out.append(" ")
+        space = False
+        out.append(chunk)
+    return "".join(out)
+
+def cache_key(query: str, page_size: int) -> tuple:
+    """
+    Result cache key: the model key (instance + last-modified stamp) plus normalized text and page size.
+    A result still being read when the model changes is stored under the old stamp and never served.
+    """
+    return (SESSIONS.model_key(), normalize_query(query), int(page_size or PAGE_SIZE))
+
+class ResultCache:
+    """
+    LRU of serialized query results bounded by total bytes. Cleared whenever
+    the session manager reports a model change (SaveChanges, refresh, another
+    client's edit, instance switch).
+    """
+    def __init__(self, max_bytes: int = CACHE_BYTES, max_entry_bytes: int = CACHE_ENTRY_BYTES):
+        self.max_bytes, self.max_entry_bytes = max_bytes, max_entry_bytes
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[tuple, str]" = OrderedDict()
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "skipped": 0, "invalidations": 0}
+
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key, value: str):
+        size = len(value)
+        with self._lock:
+            if size > self.max_entry_bytes or size > self.max_bytes:
+                self.stats["skipped"] += 1
+                return
+            old = self._items.pop(key, None)
+            if old is not None: self.bytes -= len(old)
+            self._items[key] = value
+            self.bytes += size
+            self.stats["stored"] += 1
+            while self.bytes > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self.bytes -= len(dropped)
+                self.stats["evicted"] += 1
+
+    def clear(self):
+        with self._lock:
+            if self._items: self.stats["invalidations"] += 1
+            self._items.clear()
+            self.bytes = 0
+
+    def info(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(self.stats, entries=len(self._items), bytes=self.bytes, max_bytes=self.max_bytes,
+                        hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else None)
+
+RESULTS = ResultCache()
+SESSIONS.add_listener(RESULTS.clear)
+
+def run_json(query: str = None, cursor: str = None, page_size: int = PAGE_SIZE, use_cache: bool = True) -> str:
+    """
+    run_page serialized as compact JSON. Complete results (no cursor left open)
+    are cached by model stamp, normalized query text and page size until the model changes.
+    """
+    if cursor or not use_cache:
+        return json.dumps(run_page(query, cursor, page_size), separators=(",", ":"))
+    SESSIONS.check() # an external edit or refresh clears the cache first
+    key = cache_key(query, page_size)
+    hit = RESULTS.get(key)
+    if hit is not None: return hit
+    res = run_page(query, None, page_size)
+    text = json.dumps(res, separators=(",", ":"))
+    if res["next"] is None: RESULTS.put(key, text)
+    return text
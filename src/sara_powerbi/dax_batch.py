@@ -0,0 +1,65 @@
+import json
+import time
+from typing import Dict, List
+
+from .connection import SESSIONS, adomd_session
+from .executors import cancellable, parallel
+from .dax import PAGE_SIZE, MAX_PAGE_SIZE, RESULTS, cache_key, column_types, columnar, converters, read_rows
+
+# Many DAX queries at once: each runs on its own pooled ADOMD connection,
+# at most `parallelism` at a time, and returns its first page_size rows (no
+# cursor is left open). Complete results share run_dax's result cache.
+
+MAX_QUERIES = 200
+
+def parse_queries(queries) -> List[Dict]:
+    """JSON text or list of query strings / {"id", "query"} objects -> [{"id", "query"}]."""
+    if isinstance(queries, str): queries = json.loads(queries)
+    if not isinstance(queries, list) or not queries: raise ValueError("queries must be a non-empty list.")
+    if len(queries) > MAX_QUERIES: raise ValueError(f"At most {MAX_QUERIES} queries per batch.")
+    out = []
+    for i, q in enumerate(queries):
+        if isinstance(q, str): q = {"query": q}
+        if not isinstance(q, dict) or not q.get("query"): raise ValueError(f"Query {i} has no text.")
+        out.append({"id": q.get("id", i), "query": q["query"]})
+    return out
+
+def run_one(query: str, page_size: int, use_cache: bool = True) -> Dict:
+    """One query on a pooled connection: run_page-shaped result plus "truncated"/"cached"."""
+    key = cache_key(query, page_size)
+    if use_cache:
+        hit = RESULTS.get(key)
+        if hit is not None: return dict(json.loads(hit), truncated=False, cached=True)
+    with adomd_session() as conn:
+        cmd = conn.CreateCommand()
+        cmd.CommandText = query
+        with cancellable(cmd.Cancel):
+            reader = cmd.ExecuteReader()
+            try:
+                columns = [reader.GetName(i) for i in range(reader.FieldCount)]
+                types = column_types(reader)
+                rows, done = read_rows(reader, converters(types), page_size)
+            finally: reader.Close()
+    res = {"columns": columns, "types": types, "data": columnar(columns, rows), "offset": 0, "rows": len(rows), "next": None}
+    if done and use_cache: RESULTS.put(key, json.dumps(res, separators=(",", ":")))
+    return dict(res, truncated=not done, cached=False)
+
+def run_batch(queries, parallelism: int = None, page_size: int = PAGE_SIZE, use_cache: bool = True) -> Dict:
+    """
+    Runs all queries, at most `parallelism` at once (capped by the ADOMD pool size).
+    Results are listed in completion order, each with its id, time and either data or error.
+    """
+    items = parse_queries(queries)
+    size = max(1, min(int(page_size or PAGE_SIZE), MAX_PAGE_SIZE))
+    workers = max(1, min(int(parallelism or SESSIONS.pool_size), SESSIONS.pool_size, len(items)))
+    if use_cache: SESSIONS.check() # an external edit or refresh clears the cache first
+    start = time.perf_counter()
+    results = []
+    for i, res, error, seconds in parallel(lambda q: run_one(q["query"], size, use_cache), items, workers):
+        entry = {"id": items[i]["id"], "ms": round(seconds * 1000, 1)}
+        if error is not None: entry["error"] = str(error)
+        else: entry.update(res)
+        results.append(entry)
+    wall = time.perf_counter() - start
+    return {"queries": len(items), "parallelism": workers, "errors": sum("error" in r for r in results),
+            "seconds": round(wall, 3), "query_seconds": round(sum(r["ms"] for r in results) / 1000, 3), "results": results}
@@ -0,0 +1,166 @@
+import csv
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None # Optional: Parquet/Arrow output needs pyarrow, CSV always works
+
+from .connection import adomd_session
+from .executors import cancellable
+from .dax import column_types, converters, read_rows, to_json_value
+
+# Streams a DAX result to disk in fixed-size row batches, so only one batch
+# is ever held in memory regardless of the result size.
+
+BATCH_ROWS = 50000
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "feather": ".arrow", "ipc": ".arrow", "csv": ".csv"}
+
+def _net_datetime(v):
+    return datetime(v.Year, v.Month, v.Day, v.Hour, v.Minute, v.Second, v.Millisecond * 1000)
+
+def _native(v):
+    """Like to_json_value, but dates stay datetimes (Arrow timestamp columns)."""
+    if type(v).__name__ == "DateTime" and hasattr(v, "Ticks"): return _net_datetime(v)
+    if isinstance(v, datetime): return v
+    return to_json_value(v)
+
+def native_converters(types: List[str]) -> List[Callable]:
+    return [_net_datetime if t == "DateTime" else _native if c is to_json_value else c for t, c in zip(types, converters(types))]
+
+def resolve_output(path: str, format: str = None) -> tuple:
+    """(absolute file path, format); format defaults to the file extension (else parquet)."""
+    path = os.path.abspath(os.path.expanduser(path))
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    fmt = (format or (ext if ext in FORMATS else "parquet")).lower()
+    if fmt not in FORMATS: raise ValueError(f"Unknown format '{format}' (parquet, arrow or csv).")
+    if os.path.isdir(path): path = os.path.join(path, "query" + FORMATS[fmt])
+    elif not ext: path += FORMATS[fmt]
+    if fmt in ("feather", "ipc"): fmt = "arrow"
+    return path, fmt
+
+# --- Sinks ---
+
+class _CsvSink:
+    def __init__(self, path: str, columns: List[str], types: List[str]):
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        self.w = csv.writer(self.f)
+        self.w.writerow(columns)
+        self.schema = [{"name": c, "type": t} for c, t in zip(columns, types)]
+
+    def write(self, rows: List[List]):
+        self.w.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+_ARROW_TYPES = {
+    "Boolean": "bool_", "String": "string", "Int16": "int64", "Int32": "int64", "Int64": "int64", "Byte": "int64",
+    "UInt16": "int64", "UInt32": "int64", "UInt64": "uint64", "Double": "float64", "Single": "float64", "Decimal": "float64",
+}
+
+class _ArrowSink:
+    """Parquet or Arrow IPC file; the schema is fixed from the .NET types (Object columns from the first batch)."""
+    def __init__(self, path: str, columns: List[str], types: List[str], fmt: str):
+        self.path, self.columns, self.types, self.fmt = path, columns, types, fmt
+        self.arrow_types = [self._type(t) for t in types]
+        self.writer = None
+        self.sink = None
+        self.arrow_schema = None
+        self.schema = None
+
+    @staticmethod
+    def _type(t: str):
+        if t == "DateTime": return pa.timestamp("us")
+        name = _ARROW_TYPES.get(t)
+        return getattr(pa, name)() if name else None
+
+    def _array(self, i: int, values: List):
+        t = self.arrow_types[i]
+        try: return pa.array(values, type=t)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            if t is not None and t != pa.string(): raise
+            # Mixed values in an untyped column: keep them as text
+            return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+    def write(self, rows: List[List]):
+        arrays = [self._array(i, [r[i] for r in rows]) for i in range(len(self.columns))]
+        if self.writer is None:
+            for i, a in enumerate(arrays):
+                if self.arrow_types[i] is None:
+                    self.arrow_types[i] = pa.string() if pa.types.is_null(a.type) else a.type
+                    if pa.types.is_null(a.type): arrays[i] = a.cast(pa.string())
+            schema = self.arrow_schema = pa.schema([pa.field(c, t) for c, t in zip(self.columns, self.arrow_types)])
+            if self.fmt == "parquet": self.writer = pq.ParquetWriter(self.path, schema)
+            else:
+                self.sink = pa.OSFile(self.path, "wb")
+                self.writer = pa_ipc.new_file(self.sink, schema)
+            self.schema = [{"name": f.name, "type": str(f.type)} for f in schema]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.arrow_schema))
+
+    def close(self):
+        if self.writer is None: self.write([]) # header-only file for an empty result
+        self.writer.close()
+        if self.sink is not None: self.sink.close()
+
+def export_reader(reader, path: str, fmt: str, batch_rows: int = BATCH_ROWS) -> Dict:
+    """Writes everything left in an open reader to path (via a temp file); returns schema/rows/timing."""
+    columns = [reader.GetName(i) for i in range(reader.FieldCount)]
+    types = column_types(reader)
+    if fmt == "csv": convert = converters(types)
+    else:
+        if pa is None: raise RuntimeError(f"{fmt} output needs the pyarrow package (pip install pyarrow); use format='csv' otherwise.")
+        convert = native_converters(types)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".sara-", suffix=".tmp", dir=os.path.dirname(path))
+    os.close(fd)
+    read_s = write_s = 0.0
+    rows_total = batches = 0
+    try:
+        sink = _CsvSink(tmp, columns, types) if fmt == "csv" else _ArrowSink(tmp, columns, types, fmt)
+        try:
+            done = False
+            while not done:
+                t0 = time.perf_counter()
+                rows, done = read_rows(reader, convert, batch_rows)
+                t1 = time.perf_counter()
+                if rows:
+                    sink.write(rows)
+                    rows_total += len(rows)
+                    batches += 1
+                write_s += time.perf_counter() - t1
+                read_s += t1 - t0
+        finally:
+            t1 = time.perf_counter()
+            sink.close()
+            write_s += time.perf_counter() - t1
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+    return {"path": path, "format": fmt, "schema": sink.schema, "rows": rows_total, "batches": batches,
+            "bytes": os.path.getsize(path), "seconds": {"read": round(read_s, 3), "write": round(write_s, 3)}}
+
+def export_query(query: str, path: str, format: str = None, batch_rows: int = BATCH_ROWS, timeout: float = None) -> Dict:
+    """Runs query on a pooled connection and streams the result to a Parquet/Arrow/CSV file."""
+    path, fmt = resolve_output(path, format)
+    if fmt != "csv" and pa is None:
+        raise RuntimeError(f"{fmt} output needs the pyarrow package (pip install pyarrow); use format='csv' otherwise.")
+    start = time.perf_counter()
+    with adomd_session(timeout) as conn:
+        cmd = conn.CreateCommand()
+        cmd.CommandText = query
+        with cancellable(cmd.Cancel):
+            reader = cmd.ExecuteReader()
+            executed = time.perf_counter()
+            try: res = export_reader(reader, path, fmt, max(1, int(batch_rows or BATCH_ROWS)))
+            finally: reader.Close()
+    res["seconds"] = dict(execute=round(executed - start, 3), **res["seconds"], total=round(time.perf_counter() - start, 3))
+    return res
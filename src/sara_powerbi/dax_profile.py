@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+import uuid
+from typing import Dict, List
+
+from .connection import adomd_session, get_server
+from .executors import cancellable
+from .report_index import write_json_atomic
+from .dax import PAGE_SIZE, MAX_PAGE_SIZE, column_types, columnar, converters, read_rows
+
+# Profiled DAX execution: client-side phase timings (connect, execute, first
+# row, full read, serialize) plus, when an engine trace can be started, the
+# server timings (query duration, storage engine scans, cache hits). Trace
+# sources are swappable: a live server trace or recorded events replayed from
+# a JSON file.
+
+TRACE_EVENTS = ("QueryEnd", "VertiPaqSEQueryEnd", "VertiPaqSEQueryCacheMatch", "DirectQueryEnd")
+TRACE_COLUMNS = ("EventClass", "EventSubclass", "SessionID", "Duration", "CpuTime", "TextData", "StartTime", "EndTime")
+# Seconds to wait for the trace's QueryEnd after the last row was read
+TRACE_WAIT = 5.0
+READ_BATCH = 10000
+MAX_EVENTS = 200
+EVENT_TEXT = 1000
+
+def _amo(*names):
+    for ns in ("Microsoft.AnalysisServices", "Microsoft.PowerBI"):
+        try:
+            mod = __import__(ns, fromlist=list(names))
+            return [getattr(mod, n) for n in names]
+        except (ImportError, AttributeError): continue
+    raise RuntimeError("Trace types (Microsoft.AnalysisServices) are not available.")
+
+def _event_row(e) -> Dict:
+    """TraceEventArgs -> plain dict (times in ms)."""
+    def get(attr, default=None):
+        try: v = getattr(e, attr)
+        except Exception: return default
+        return default if v is None else v
+    return {"event": str(get("EventClass", "")), "subclass": str(get("EventSubclass", "")),
+            "session": str(get("SessionID", "")), "duration": int(get("Duration", 0) or 0), "cpu": int(get("CpuTime", 0) or 0),
+            "text": str(get("TextData", "") or ""), "start": str(get("StartTime", "")), "end": str(get("EndTime", ""))}
+
+class ServerTrace:
+    """Engine trace on the connected server, filtered to one ADOMD session."""
+    def __init__(self, server=None):
+        self.server = server
+        self.events: List[Dict] = []
+        self._trace = None
+        self._session = ""
+        self._ended = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, session_id: str):
+        TraceEventClass, TraceColumn = _amo("TraceEventClass", "TraceColumn")
+        server = self.server or get_server()
+        self._session = session_id or ""
+        trace = server.Traces.Add(f"sara-profile-{uuid.uuid4().hex[:8]}")
+        try:
+            for name in TRACE_EVENTS:
+                ev = trace.Events.Add(getattr(TraceEventClass, name))
+                for col in TRACE_COLUMNS:
+                    # Not every event class accepts every column
+                    try: ev.Columns.Add(getattr(TraceColumn, col))
+                    except Exception: pass
+            trace.OnEvent += self._on_event
+            trace.Update()
+            trace.Start()
+        except Exception:
+            try: trace.Drop()
+            except Exception: pass
+            raise
+        self._trace = trace
+
+    def _on_event(self, sender, e):
+        row = _event_row(e)
+        if self._session and row["session"] and row["session"] != self._session: return
+        with self._lock: self.events.append(row)
+        if row["event"] == "QueryEnd": self._ended.set()
+
+    def stop(self, wait: float = TRACE_WAIT) -> List[Dict]:
+        trace, self._trace = self._trace, None
+        if trace is None: return []
+        self._ended.wait(wait)
+        try:
+            trace.Stop()
+            trace.Drop()
+        except Exception: pass
+        with self._lock: return list(self.events)
+
+class RecordedTrace:
+    """Stand-in trace replaying recorded events (a list of event dicts, or a JSON file written by save_trace)."""
+    def __init__(self, events: List[Dict]):
+        self.events = events
+
+    @classmethod
+    def load(cls, path: str) -> "RecordedTrace":
+        with open(path, "r", encoding="utf-8") as f: data = json.load(f)
+        return cls(data.get("events", []) if isinstance(data, dict) else data)
+
+    def start(self, session_id: str): pass
+
+    def stop(self, wait: float = TRACE_WAIT) -> List[Dict]:
+        return list(self.events)
+
+def save_trace(path: str, events: List[Dict]):
+    write_json_atomic(path, {"events": events})
+
+def server_timings(events: List[Dict]) -> Dict:
+    """
+    Summary in DAX Studio terms: total (QueryEnd), storage engine time (sum of non-internal
+    scans and DirectQuery calls), formula engine = total - SE, SE cache hits, SE parallelism (CPU / duration).
+    """
+    ends = [e for e in events if e.get("event") == "QueryEnd"]
+    scans = [e for e in events if e.get("event") == "VertiPaqSEQueryEnd" and "Internal" not in e.get("subclass", "")]
+    dq = [e for e in events if e.get("event") == "DirectQueryEnd"]
+    hits = [e for e in events if e.get("event") == "VertiPaqSEQueryCacheMatch" and "Internal" not in e.get("subclass", "")]
+    se = sum(e.get("duration", 0) for e in scans + dq)
+    se_cpu = sum(e.get("cpu", 0) for e in scans + dq)
+    total = ends[-1].get("duration", 0) if ends else None
+    out = {"total_ms": total, "fe_ms": max(0, total - se) if total is not None else None, "se_ms": se, "se_cpu_ms": se_cpu,
+           "se_queries": len(scans), "se_cache_hits": len(hits), "directquery_queries": len(dq),
+           "se_parallelism": round(se_cpu / se, 2) if se else None}
+    out["events"] = [{"event": e.get("event"), "subclass": e.get("subclass"), "duration_ms": e.get("duration", 0),
+                      "cpu_ms": e.get("cpu", 0), "text": (e.get("text") or "")[:EVENT_TEXT]}
+                     for e in events if e.get("event") != "QueryEnd"][:MAX_EVENTS]
+    return out
+
+def profile_query(query: str, page_size: int = PAGE_SIZE, trace=None, timeout: float = None, session=adomd_session) -> Dict:
+    """
+    Runs query once (no cache, no cursor), reading the whole result; returns the first page_size rows
+    with "timings" (client phases in ms) and, with a trace source, "server" (server_timings) and "trace_events".
+    session(timeout): context manager yielding an open connection (default: the ADOMD pool).
+    """
+    size = max(1, min(int(page_size or PAGE_SIZE), MAX_PAGE_SIZE))
+    t0 = time.perf_counter()
+    events, trace_error = [], None
+    with session(timeout) as conn:
+        t_conn = time.perf_counter()
+        if trace is not None:
+            try: trace.start(str(getattr(conn, "SessionID", "") or ""))
+            except Exception as e: trace, trace_error = None, str(e)
+        t_trace = time.perf_counter()
+        try:
+            cmd = conn.CreateCommand()
+            cmd.CommandText = query
+            with cancellable(cmd.Cancel):
+                reader = cmd.ExecuteReader()
+                t_exec = time.perf_counter()
+                try:
+                    columns = [reader.GetName(i) for i in range(reader.FieldCount)]
+                    types = column_types(reader)
+                    convert = converters(types)
+                    rows, done = read_rows(reader, convert, 1)
+                    t_first = time.perf_counter()
+                    if not done:
+                        more, done = read_rows(reader, convert, size - 1)
+                        rows += more
+                    total = len(rows)
+                    while not done:
+                        chunk, done = read_rows(reader, convert, READ_BATCH)
+                        total += len(chunk)
+                    t_read = time.perf_counter()
+                finally: reader.Close()
+        finally:
+            if trace is not None: events = trace.stop()
+    t_done = time.perf_counter()
+    res = {"columns": columns, "types": types, "data": columnar(columns, rows), "rows": len(rows), "total_rows": total}
+    s0 = time.perf_counter()
+    json.dumps(res, separators=(",", ":"))
+    t_ser = time.perf_counter()
+
+    ms = lambda a, b: round((b - a) * 1000, 2)
+    res["timings"] = {"connect_ms": ms(t0, t_conn), "trace_start_ms": ms(t_conn, t_trace), "execute_ms": ms(t_trace, t_exec),
+                      "first_row_ms": ms(t_exec, t_first), "read_ms": ms(t_first, t_read), "serialize_ms": ms(s0, t_ser),
+                      "total_ms": round(ms(t0, t_read) - ms(t_conn, t_trace) + ms(s0, t_ser), 2)}
+    if trace is not None:
+        res["timings"]["trace_wait_ms"] = ms(t_read, t_done)
+        res["server"] = server_timings(events)
+        res["trace_events"] = events
+    elif trace_error: res["server"] = {"error": f"Trace not available: {trace_error}"}
+    return res
@@ -0,0 +1,213 @@
+import asyncio
+import atexit
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Blocking tool bodies (pythonnet calls, PBIR file work) run on bounded thread
+# pools so the MCP event loop stays free: model and file tools get separate
+# pools, every call has a timeout, and a timed-out call is cancelled
+# cooperatively (running ADOMD commands are cancelled on the server).
+
+MODEL_WORKERS = 4
+FILE_WORKERS = 4
+# Seconds before a call is cancelled; per-tool overrides below
+MODEL_TIMEOUT = 300.0
+FILE_TIMEOUT = 120.0
+TOOL_TIMEOUTS: Dict[str, float] = {
+    "run_dax_to_file": 3600.0,
+    "pbir_refactor_fields": 600.0,
+    "pbir_scaffold_report": 600.0,
+    "prewarm_report_cache": 1800.0,
+    "run_dax_batch": 1800.0,
+}
+
+class Cancelled(Exception):
+    """Raised inside a tool body whose call was cancelled (timeout or client cancellation)."""
+
+class CancelToken:
+    """Cancellation flag of one tool call, with callbacks to interrupt blocking work (e.g. AdomdCommand.Cancel)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.cancelled = False
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled: return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try: fn()
+            except Exception: pass
+
+    def add(self, fn: Callable[[], None]):
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(fn); return
+        fn()
+
+    def remove(self, fn: Callable[[], None]):
+        with self._lock:
+            try: self._callbacks.remove(fn)
+            except ValueError: pass
+
+_local = threading.local()
+
+def current() -> Optional[CancelToken]:
+    """Token of the tool call running on this thread (None outside offloaded calls)."""
+    return getattr(_local, "token", None)
+
+def check():
+    """Cooperative cancellation point for long loops."""
+    token = current()
+    if token is not None and token.cancelled: raise Cancelled("Cancelled.")
+
+@contextmanager
+def cancellable(on_cancel: Callable[[], None]):
+    """with cancellable(cmd.Cancel): ... -- on_cancel runs if the call is cancelled meanwhile."""
+    token = current()
+    if token is None:
+        yield; return
+    token.add(on_cancel)
+    try: yield
+    finally: token.remove(on_cancel)
+
+class RWLock:
+    """Shared readers / exclusive writer (waiting writers go first, so reads cannot starve them)."""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._owner = None
+        self._holds = 0
+        self._waiting = 0
+
+    def hold(self) -> Optional[int]:
+        """Number of the write hold owned by the calling thread (None when it does not hold the write lock)."""
+        return self._holds if self._writer and self._owner == threading.get_ident() else None
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting: self._cond.wait()
+            self._readers += 1
+        try: yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting += 1
+            while self._writer or self._readers: self._cond.wait()
+            self._waiting -= 1
+            self._writer, self._owner = True, threading.get_ident()
+            self._holds += 1
+        try: yield
+        finally:
+            with self._cond:
+                self._writer, self._owner = False, None
+                self._cond.notify_all()
+
+# Per pool: tools reading shared state (report files, TOM model) share it, mutating tools hold it alone
+LOCKS = {"model": RWLock(), "file": RWLock()}
+
+class _Pools:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self.running: Dict[int, CancelToken] = {}
+        self.stats = {"calls": 0, "timeouts": 0, "cancelled": 0}
+
+    def get(self, kind: str) -> ThreadPoolExecutor:
+        with self._lock:
+            pool = self._pools.get(kind)
+            if pool is None:
+                workers = MODEL_WORKERS if kind == "model" else FILE_WORKERS
+                pool = self._pools[kind] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"sara-{kind}")
+            return pool
+
+    def shutdown(self):
+        for token in list(self.running.values()): token.cancel()
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for p in pools: p.shutdown(wait=False, cancel_futures=True)
+
+    def info(self) -> Dict:
+        return dict(self.stats, running=len(self.running), pools=sorted(self._pools))
+
+POOLS = _Pools()
+atexit.register(POOLS.shutdown)
+
+def _run(token: CancelToken, fn: Callable, kind: str, access: Optional[str], args, kwargs):
+    if token.cancelled: raise Cancelled("Cancelled before start.")
+    _local.token = token
+    POOLS.running[id(token)] = token
+    try:
+        if access is None: return fn(*args, **kwargs)
+        lock = LOCKS[kind]
+        with (lock.write() if access == "write" else lock.read()):
+            check()
+            return fn(*args, **kwargs)
+    finally:
+        _local.token = None
+        POOLS.running.pop(id(token), None)
+
+def parallel(fn: Callable, items: Iterable, workers: int) -> Iterator[Tuple[int, object, Optional[Exception], float]]:
+    """
+    Runs fn(item) for every item on up to `workers` threads of a call-local pool, yielding
+    (index, result, error, seconds) as each one finishes. Workers share the calling tool's
+    cancel token, so a timeout or cancellation stops them too.
+    """
+    token = current()
+    def run(i, item):
+        _local.token = token
+        start = time.perf_counter()
+        try:
+            check()
+            return i, fn(item), None, time.perf_counter() - start
+        except Exception as e: return i, None, e, time.perf_counter() - start
+        finally: _local.token = None
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sara-parallel") as pool:
+        futures = [pool.submit(run, i, item) for i, item in enumerate(items)]
+        try:
+            for f in as_completed(futures): yield f.result()
+        finally:
+            for f in futures: f.cancel()
+
+def offload(fn: Callable, kind: str, access: Optional[str] = "read", timeout: float = None) -> Callable:
+    """
+    Async wrapper running fn on the `kind` pool ('model' or 'file') with a timeout;
+    keeps fn's name, doc and signature. access: 'read', 'write' or None (no lock).
+    """
+    limit = timeout or TOOL_TIMEOUTS.get(fn.__name__) or (MODEL_TIMEOUT if kind == "model" else FILE_TIMEOUT)
+
+    @functools.wraps(fn)
+    async def call(*args, **kwargs):
+        token = CancelToken()
+        POOLS.stats["calls"] += 1
+        fut = asyncio.get_running_loop().run_in_executor(POOLS.get(kind), _run, token, fn, kind, access, args, kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), limit)
+        except asyncio.TimeoutError:
+            token.cancel()
+            POOLS.stats["timeouts"] += 1
+            return f"Error: '{fn.__name__}' timed out after {limit:g}s and was cancelled."
+        except asyncio.CancelledError:
+            token.cancel()
+            POOLS.stats["cancelled"] += 1
+            raise
+        except Cancelled as e: return f"Error: {e}"
+    return call
+
+def model_tool(fn: Callable, access: Optional[str] = "read") -> Callable:
+    return offload(fn, "model", access)
+
+def file_tool(fn: Callable, access: Optional[str] = "read") -> Callable:
+    return offload(fn, "file", access)
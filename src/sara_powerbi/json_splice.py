@@ -0,0 +1,174 @@
+import re
+import json
+from json.decoder import scanstring
+from typing import List, Optional, Tuple
+
+_WS = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_INDENT = re.compile(r'\n([ \t]+)\S')
+_LITERALS = (("true", True), ("false", False), ("null", None))
+
+# Node layout: (kind, start, end, payload)
+#   object -> [(key, key_start, value_node), ...], array -> [node, ...], scalar -> value
+OBJ, ARR, VAL = "object", "array", "value"
+
+def _skip(text: str, pos: int) -> int:
+    return _WS.match(text, pos).end()
+
+def _parse(text: str, pos: int):
+    pos = _skip(text, pos)
+    start = pos
+    ch = text[pos:pos + 1]
+    if ch == '{':
+        members = []
+        pos = _skip(text, pos + 1)
+        if text[pos] == '}': return (OBJ, start, pos + 1, members)
+        while True:
+            key_start = pos
+            if text[pos] != '"': raise ValueError(f"Expected key at {pos}")
+            key, pos = scanstring(text, pos + 1)
+            pos = _skip(text, pos)
+            if text[pos] != ':': raise ValueError(f"Expected ':' at {pos}")
+            node = _parse(text, pos + 1)
+            members.append((key, key_start, node))
+            pos = _skip(text, node[2])
+            if text[pos] == ',': pos = _skip(text, pos + 1); continue
+            if text[pos] == '}': return (OBJ, start, pos + 1, members)
+            raise ValueError(f"Expected ',' or '}}' at {pos}")
+    if ch == '[':
+        items = []
+        pos = _skip(text, pos + 1)
+        if text[pos] == ']': return (ARR, start, pos + 1, items)
+        while True:
+            node = _parse(text, pos)
+            items.append(node)
+            pos = _skip(text, node[2])
+            if text[pos] == ',': pos += 1; continue
+            if text[pos] == ']': return (ARR, start, pos + 1, items)
+            raise ValueError(f"Expected ',' or ']' at {pos}")
+    if ch == '"':
+        value, end = scanstring(text, pos + 1)
+        return (VAL, pos, end, value)
+    for literal, value in _LITERALS:
+        if text.startswith(literal, pos): return (VAL, pos, pos + len(literal), value)
+    m = _NUMBER.match(text, pos)
+    if not m: raise ValueError(f"Unexpected character at {pos}")
+    raw = m.group()
+    return (VAL, pos, m.end(), float(raw) if any(c in raw for c in ".eE") else int(raw))
+
+def parse_spans(text: str):
+    """Parses JSON text into a node tree that records the source span of every value."""
+    node = _parse(text, 0)
+    if _skip(text, node[2]) != len(text): raise ValueError("Trailing data")
+    return node
+
+def same(a, b) -> bool:
+    """Semantic JSON equality (key order ignored; 1, 1.0 and True are different)."""
+    if type(a) is not type(b): return False
+    if isinstance(a, dict): return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list): return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+def _value(node):
+    kind, _, _, payload = node
+    if kind == OBJ: return {k: _value(v) for k, _, v in payload}
+    if kind == ARR: return [_value(v) for v in payload]
+    return payload
+
+class _Splicer:
+    def __init__(self, text: str):
+        self.text = text
+        m = _INDENT.search(text)
+        self.unit = m.group(1) if m else "  "
+        self.ensure_ascii = "\\u" in text and all(ord(c) < 128 for c in text)
+        self.nl = "\r\n" if "\r\n" in text else "\n"
+        self.edits: List[Tuple[int, int, str]] = []
+
+    def line_indent(self, pos: int) -> str:
+        line_start = self.text.rfind("\n", 0, pos) + 1
+        return _WS.match(self.text, line_start).group().replace("\n", "").replace("\r", "")
+
+    def dumps(self, value, base: str, inline: bool = False) -> str:
+        if inline: return json.dumps(value, ensure_ascii=self.ensure_ascii)
+        out = json.dumps(value, indent=self.unit, ensure_ascii=self.ensure_ascii)
+        return out.replace("\n", self.nl + base)
+
+    def is_inline(self, node, in_inline: bool = False) -> bool:
+        """Single-line containers ({"x": 1, "y": 2}) keep a single-line layout."""
+        if "\n" in self.text[node[1]:node[2]]: return False
+        # Empty {} / [] on its own line (e.g. "tags": []) grows into an indented block
+        return in_inline or node[0] == VAL or bool(node[3])
+
+    def replace(self, node, value, in_inline: bool = False):
+        self.edits.append((node[1], node[2], self.dumps(value, self.line_indent(node[1]), self.is_inline(node, in_inline))))
+
+    def diff(self, node, value, in_inline: bool = False):
+        kind, start, end, payload = node
+        if kind == OBJ and isinstance(value, dict) and payload:
+            self.diff_object(node, value, in_inline)
+        elif kind == ARR and isinstance(value, list) and len(payload) == len(value):
+            inline = self.is_inline(node, in_inline)
+            for child, item in zip(payload, value): self.diff(child, item, inline)
+        elif not same(_value(node), value):
+            self.replace(node, value, in_inline)
+
+    def diff_object(self, node, value: dict, in_inline: bool = False):
+        members = node[3]
+        inline = self.is_inline(node, in_inline)
+        old_keys = {k for k, _, _ in members}
+        removed = [i for i, (k, _, _) in enumerate(members) if k not in value]
+        added = [k for k in value if k not in old_keys]
+        if len(removed) == len(members):
+            self.replace(node, value, in_inline); return
+
+        for key, _, child in members:
+            if key in value: self.diff(child, value[key], inline)
+
+        first_kept = next(i for i, (k, _, _) in enumerate(members) if k in value)
+        if first_kept:
+            # Leading removed members: drop from first key up to the first kept key
+            self.edits.append((members[0][1], members[first_kept][1], ""))
+        for i in removed:
+            if i > first_kept:
+                # Later removed members: drop together with their leading comma
+                self.edits.append((members[i - 1][2][2], members[i][2][2], ""))
+
+        if added:
+            last_end = members[-1][2][2]
+            indent = self.line_indent(members[first_kept][1])
+            sep = ", " if inline else f",{self.nl}{indent}"
+            text = "".join(f"{sep}{json.dumps(k, ensure_ascii=self.ensure_ascii)}: {self.dumps(value[k], indent, inline)}" for k in added)
+            self.edits.append((last_end, last_end, text))
+
+    def apply(self) -> str:
+        text = self.text
+        for start, end, repl in sorted(self.edits, key=lambda e: (e[0], e[1]), reverse=True):
+            text = text[:start] + repl + text[end:]
+        return text
+
+def render_minimal(original: str, data) -> Optional[str]:
+    """
+    Returns original text with only the changed JSON subtrees re-serialized and
+    spliced in (formatting of untouched bytes is preserved), or None when data
+    is semantically identical to the original.
+    """
+    try:
+        root = parse_spans(original)
+    except (ValueError, IndexError):
+        return json.dumps(data, indent=2)
+    if same(_value(root), data): return None
+    splicer = _Splicer(original)
+    splicer.diff(root, data)
+    return splicer.apply()
+
+def write_json_minimal(path: str, data) -> bool:
+    """Writes data to a PBIR JSON file touching only changed spans. Returns False when nothing changed."""
+    from .report_index import write_json_atomic
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f: original = f.read()
+    except (OSError, UnicodeDecodeError):
+        original = None
+    text = json.dumps(data, indent=2) if original is None else render_minimal(original, data)
+    if text is None: return False
+    write_json_atomic(path, None, text=text)
+    return True
@@ -0,0 +1,152 @@
+import math
+from typing import Dict, Iterable, List, Tuple
+
+# Rect: (x, y, width, height) in page pixels
+Rect = Tuple[float, float, float, float]
+
+# Spacing between visuals and from the page edges
+GAP = 10
+# Bucket size of the spatial hash; visuals span a handful of cells at most
+CELL = 128
+
+def rect_of(position: Dict, default_size: Tuple[int, int] = (300, 300)) -> Rect:
+    """Rect from a PBIR position dict (missing size -> default_size)."""
+    return (float(position.get("x", 0) or 0), float(position.get("y", 0) or 0),
+            float(position.get("width", default_size[0]) or 0), float(position.get("height", default_size[1]) or 0))
+
+def intersects(a: Rect, b: Rect) -> bool:
+    """True when the interiors overlap (touching edges do not count)."""
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+class SpatialIndex:
+    """
+    Uniform-grid spatial hash over rects. Insert and overlap queries only look
+    at the cells a rect covers, so overlap detection on a page is ~O(n) instead
+    of comparing every pair.
+    """
+    def __init__(self, cell: int = CELL):
+        self.cell = cell
+        self.rects: Dict[str, Rect] = {}
+        self._grid: Dict[Tuple[int, int], List[str]] = {}
+
+    def _cells(self, r: Rect):
+        c = self.cell
+        x0, y0 = int(r[0] // c), int(r[1] // c)
+        x1, y1 = int((r[0] + max(r[2], 1) - 1e-9) // c), int((r[1] + max(r[3], 1) - 1e-9) // c)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1): yield cx, cy
+
+    def insert(self, key: str, r: Rect):
+        self.rects[key] = r
+        for cell in self._cells(r): self._grid.setdefault(cell, []).append(key)
+
+    def query(self, r: Rect, exclude: str = None) -> List[str]:
+        """Keys whose rects overlap r."""
+        seen, hits = set(), []
+        for cell in self._cells(r):
+            for key in self._grid.get(cell, ()):
+                if key in seen or key == exclude: continue
+                seen.add(key)
+                if intersects(r, self.rects[key]): hits.append(key)
+        return hits
+
+    def overlaps(self) -> List[Tuple[str, str]]:
+        """All overlapping pairs, each reported once (in insertion order)."""
+        order = {k: i for i, k in enumerate(self.rects)}
+        pairs = []
+        for key, r in self.rects.items():
+            for other in self.query(r, exclude=key):
+                if order[other] > order[key]: pairs.append((key, other))
+        return pairs
+
+def find_overlaps(rects: Dict[str, Rect]) -> List[Tuple[str, str]]:
+    index = SpatialIndex()
+    for key, r in rects.items(): index.insert(key, r)
+    return index.overlaps()
+
+def free_spot(occupied: Iterable[Rect], width: float, height: float, page_width: float, page_height: float, gap: int = GAP) -> Tuple[int, int]:
+    """
+    Top-left position for a width x height visual that overlaps nothing in
+    occupied. Candidates are the page corner and the right/bottom edges of
+    existing visuals, tried in reading order (top-to-bottom, left-to-right);
+    when the page is full the visual goes below the lowest one.
+    """
+    index = SpatialIndex()
+    rects = list(occupied)
+    for i, r in enumerate(rects): index.insert(str(i), r)
+    xs = {gap} | {r[0] + r[2] + gap for r in rects}
+    ys = {gap} | {r[1] + r[3] + gap for r in rects}
+    for y in sorted(ys):
+        if y + height > page_height - gap and y != gap: break
+        for x in sorted(xs):
+            if x + width > page_width - gap and x != gap: continue
+            # Spacing is enforced by testing the rect grown by the gap
+            if not index.query((x - gap + 1, y - gap + 1, width + 2 * gap - 2, height + 2 * gap - 2)):
+                return int(x), int(y)
+    bottom = max((r[1] + r[3] for r in rects), default=0)
+    return gap, int(bottom + gap)
+
+def reading_order(rects: Dict[str, Rect]) -> List[str]:
+    """Keys sorted top-to-bottom then left-to-right (rows are grouped by vertical overlap)."""
+    keys = sorted(rects, key=lambda k: (rects[k][1], rects[k][0]))
+    rows, row, row_bottom = [], [], None
+    for k in keys:
+        x, y, w, h = rects[k]
+        if row and y >= row_bottom:
+            rows.append(row); row, row_bottom = [], None
+        row.append(k)
+        row_bottom = y + h if row_bottom is None else max(row_bottom, y + h)
+    if row: rows.append(row)
+    return [k for r in rows for k in sorted(r, key=lambda k: rects[k][0])]
+
+def pack_grid(keys: List[str], page_width: float, page_height: float, columns: int = None, gap: int = GAP) -> Dict[str, Rect]:
+    """Uniform grid: every visual gets the same cell, sized to fill the page."""
+    n = len(keys)
+    if not n: return {}
+    if not columns:
+        # Square-ish cells: columns ~ sqrt(n * page aspect ratio)
+        columns = max(1, min(n, round(math.sqrt(n * page_width / max(page_height, 1)))))
+    rows = math.ceil(n / columns)
+    cell_w = (page_width - gap * (columns + 1)) / columns
+    cell_h = (page_height - gap * (rows + 1)) / rows
+    if cell_w < 1 or cell_h < 1: raise ValueError(f"{n} visuals do not fit in a {columns}x{rows} grid on a {page_width:g}x{page_height:g} page.")
+    return {k: (gap + (i % columns) * (cell_w + gap), gap + (i // columns) * (cell_h + gap), cell_w, cell_h) for i, k in enumerate(keys)}
+
+def _shelves(sizes: List[Tuple[float, float]], page_width: float, gap: int) -> Tuple[List[Tuple[float, float]], float]:
+    """Shelf packing in order; returns top-left positions and the total height used."""
+    out, x, y, shelf_h = [], gap, gap, 0.0
+    for w, h in sizes:
+        if x > gap and x + w > page_width - gap:
+            x, y, shelf_h = gap, y + shelf_h + gap, 0.0
+        out.append((x, y))
+        x += w + gap
+        shelf_h = max(shelf_h, h)
+    return out, y + shelf_h + gap
+
+def pack_flow(rects: Dict[str, Rect], keys: List[str], page_width: float, page_height: float, gap: int = GAP) -> Dict[str, Rect]:
+    """
+    Flow layout: visuals keep their size and order and wrap into rows. If the
+    result is taller than the page, all sizes are scaled down uniformly until
+    it fits.
+    """
+    if not keys: return {}
+    max_w = page_width - 2 * gap
+    sizes = [(min(rects[k][2], max_w), rects[k][3]) for k in keys]
+    scale = 1.0
+    for _ in range(20):
+        scaled = [(w * scale, h * scale) for w, h in sizes]
+        positions, used = _shelves(scaled, page_width, gap)
+        if used <= page_height: break
+        # Area-based estimate, never less than a 5% step so the loop converges
+        scale *= min(0.95, math.sqrt((page_height - gap) / used))
+    else:
+        raise ValueError(f"{len(keys)} visuals do not fit on a {page_width:g}x{page_height:g} page.")
+    return {k: (x, y, w, h) for k, (x, y), (w, h) in zip(keys, positions, scaled)}
+
+def auto_layout(rects: Dict[str, Rect], page_width: float, page_height: float, mode: str = "flow", columns: int = None, gap: int = GAP) -> Dict[str, Rect]:
+    """New rects for every visual on a page. mode: 'flow' (keep sizes, wrap rows) or 'grid' (uniform cells)."""
+    keys = reading_order(rects)
+    if mode == "grid": placed = pack_grid(keys, page_width, page_height, columns, gap)
+    elif mode == "flow": placed = pack_flow(rects, keys, page_width, page_height, gap)
+    else: raise ValueError(f"Unknown layout mode '{mode}' (use 'flow' or 'grid').")
+    return {k: tuple(int(round(v)) for v in r) for k, r in placed.items()}
@@ -0,0 +1,286 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+from .connection import get_server, save_changes, SESSIONS
+from .model_meta import ModelMeta, Table, Column, Measure, Partition, Relationship, Role, list_rows, info_dict
+from .model_search import SearchIndex
+from .model_deps import DependencyGraph
+
+# Environment variable pointing at a .SemanticModel folder (or model.bim): TOM tools work offline on those files
+MODEL_PATH_ENV = "SARA_MODEL_PATH"
+
+# Backend selection: explicit offline model (manage_model_connection 'offline'); env var is read once
+MODEL_CONTEXT = {"offline": None, "env_checked": False}
+
+DATA_TYPES = {"string": "String", "int": "Int64", "double": "Double", "datetime": "DateTime", "boolean": "Boolean"}
+
+class ModelError(Exception):
+    """Expected failure with a user-facing message (object not found, already exists...)."""
+
+class ModelBackend:
+    """
+    Operations behind the TOM tools. Mutations are staged until save();
+    discard() drops everything staged since the last save.
+    """
+    kind = ""
+
+    def meta(self) -> ModelMeta:
+        raise NotImplementedError
+
+    def list_objects(self, object_type: str) -> List[Dict]:
+        return list_rows(self.meta(), object_type)
+
+    def search_index(self) -> SearchIndex:
+        """Ranked search index, kept per backend and synced with the current metadata."""
+        index = self.__dict__.get("_search_index")
+        if index is None: index = self._search_index = SearchIndex()
+        index.sync(self.meta())
+        return index
+
+    def dependency_graph(self) -> DependencyGraph:
+        """DAX dependency graph, kept per backend and synced with the current metadata."""
+        graph = self.__dict__.get("_dependency_graph")
+        if graph is None: graph = self._dependency_graph = DependencyGraph()
+        graph.sync(self.meta())
+        return graph
+
+    def search(self, query: str, object_type: str = None, table: str = None, offset: int = 0, limit: int = 50) -> Dict:
+        total, rows = self.search_index().search(query, object_type, table, offset, limit)
+        return {"total": total, "offset": offset, "results": rows}
+
+    def model_info(self) -> Dict:
+        return info_dict(self.meta())
+
+    def describe(self) -> Dict:
+        return {"type": self.kind}
+
+    # --- Mutations ---
+    def create_measure(self, table: str, name: str, expression: str, description: str = None): raise NotImplementedError
+    def update_measure(self, table: str, name: str, expression: str = None, description: str = None): raise NotImplementedError
+    def delete_measure(self, table: str, name: str): raise NotImplementedError
+    def update_column(self, table: str, name: str, new_name: str = None, is_hidden: bool = None, data_type: str = None, description: str = None): raise NotImplementedError
+    def delete_column(self, table: str, name: str): raise NotImplementedError
+    def upsert_table(self, name: str, create: bool, type: str = "Global", source_expression: str = None): raise NotImplementedError
+    def delete_table(self, name: str): raise NotImplementedError
+    def create_relationship(self, from_table: str, from_col: str, to_table: str, to_col: str, active: bool = True): raise NotImplementedError
+    def delete_relationship(self, from_table: str, from_col: str, to_table: str, to_col: str): raise NotImplementedError
+    def create_role(self, name: str, filters: Dict[str, str] = None): raise NotImplementedError
+    def save(self): raise NotImplementedError
+    def discard(self): raise NotImplementedError
+
+def _tom_types(*names):
+    try: mod = __import__("Microsoft.AnalysisServices.Tabular", fromlist=list(names))
+    except ImportError: mod = __import__("Microsoft.PowerBI.Tabular", fromlist=list(names))
+    return [getattr(mod, n) for n in names]
+
+class TomModelBackend(ModelBackend):
+    """
+    Live model of the connected Analysis Services instance (shared TOM Server session).
+    Reads are answered from a metadata snapshot built once per database
+    Version/LastUpdate; it is dropped when the session manager reports a change
+    (own SaveChanges, another client's edit, instance switch).
+    """
+    kind = "live"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ModelMeta] = None
+        self._key = None
+        self.stats = {"builds": 0, "hits": 0}
+        SESSIONS.add_listener(self.invalidate)
+
+    def invalidate(self):
+        with self._lock: self._snapshot, self._key = None, None
+
+    def model(self):
+        return get_server().Databases[0].Model
+
+    def _table(self, m, name: str):
+        t = m.Tables.Find(name)
+        if not t: raise ModelError(f"Table '{name}' not found.")
+        return t
+
+    def meta(self) -> ModelMeta:
+        db = get_server().Databases[0]
+        key = (db.ID, db.Version, str(db.LastUpdate))
+        with self._lock:
+            if self._snapshot is not None and self._key == key:
+                self.stats["hits"] += 1
+                return self._snapshot
+        meta = self._build(db)
+        with self._lock:
+            self._snapshot, self._key = meta, key
+            self.stats["builds"] += 1
+        return meta
+
+    def _build(self, db) -> ModelMeta:
+        meta = ModelMeta(db.Name, db.CompatibilityLevel, str(db.CreatedTimestamp), str(db.LastUpdate), db.Version)
+        for t in db.Model.Tables:
+            table = meta.tables[t.Name] = Table(t.Name, t.Description or "", bool(t.IsHidden))
+            for c in t.Columns:
+                kind = str(c.Type)
+                if kind == "RowNumber": continue
+                table.columns[c.Name] = Column(t.Name, c.Name, str(c.DataType), bool(c.IsHidden), c.Description or "",
+                                               getattr(c, "Expression", None) if kind == "Calculated" else None, kind,
+                                               c.SortByColumn.Name if c.SortByColumn is not None else "")
+            for meas in t.Measures:
+                table.measures[meas.Name] = Measure(t.Name, meas.Name, meas.Expression or "", meas.Description or "", bool(meas.IsHidden))
+            for p in t.Partitions:
+                table.partitions.append(Partition(t.Name, p.Name, str(p.Mode), str(p.SourceType), getattr(p.Source, "Expression", "") or ""))
+        for r in db.Model.Relationships:
+            meta.relationships.append(Relationship(r.Name, r.FromTable.Name, r.FromColumn.Name, r.ToTable.Name, r.ToColumn.Name,
+                                                   bool(r.IsActive), str(r.CrossFilteringBehavior)))
+        for role in db.Model.Roles:
+            meta.roles.append(Role(role.Name, str(role.ModelPermission), {tp.Table.Name: tp.FilterExpression for tp in role.TablePermissions}))
+        return meta
+
+    # --- Mutations (staged on the shared Server until save) ---
+
+    def create_measure(self, table, name, expression, description=None):
+        t = self._table(self.model(), table)
+        if t.Measures.Find(name): raise ModelError("Measure exists.")
+        Measure_, = _tom_types("Measure")
+        new_meas = Measure_()
+        new_meas.Name = name
+        new_meas.Expression = expression
+        if description: new_meas.Description = description
+        t.Measures.Add(new_meas)
+
+    def _measure(self, table, name):
+        t = self._table(self.model(), table)
+        meas = t.Measures.Find(name)
+        if not meas: raise ModelError("Measure not found.")
+        return t, meas
+
+    def update_measure(self, table, name, expression=None, description=None):
+        _, meas = self._measure(table, name)
+        if expression: meas.Expression = expression
+        if description: meas.Description = description
+
+    def delete_measure(self, table, name):
+        t, meas = self._measure(table, name)
+        t.Measures.Remove(meas)
+
+    def _column(self, table, name):
+        t = self._table(self.model(), table)
+        col = t.Columns.Find(name)
+        if not col: raise ModelError(f"Column '{name}' not found.")
+        return t, col
+
+    def update_column(self, table, name, new_name=None, is_hidden=None, data_type=None, description=None):
+        _, col = self._column(table, name)
+        if new_name: col.Name = new_name
+        if is_hidden is not None: col.IsHidden = is_hidden
+        if description: col.Description = description
+        if data_type and data_type.lower() in DATA_TYPES:
+            DataType, = _tom_types("DataType")
+            col.DataType = getattr(DataType, DATA_TYPES[data_type.lower()])
+
+    def delete_column(self, table, name):
+        t, col = self._column(table, name)
+        t.Columns.Remove(col)
+
+    def upsert_table(self, name, create, type="Global", source_expression=None):
+        Table_, Partition_, PartitionSourceType, MPartitionSource, CalculatedPartitionSource = _tom_types(
+            "Table", "Partition", "PartitionSourceType", "MPartitionSource", "CalculatedPartitionSource")
+        m = self.model()
+        t = m.Tables.Find(name)
+        if create:
+            if t: raise ModelError("Table exists.")
+            t = Table_()
+            t.Name = name
+            m.Tables.Add(t)
+        elif not t: raise ModelError("Table not found.")
+
+        part = next((p for p in t.Partitions), None)
+        if not part:
+            part = Partition_()
+            part.Name = name
+            t.Partitions.Add(part)
+        if type == "Global" or type == "M":
+            part.SourceType = PartitionSourceType.M
+            m_source = MPartitionSource()
+            m_source.Expression = source_expression or (part.Source.Expression if part.Source else "let Source = \"\" in Source")
+            part.Source = m_source
+        elif type == "Calculated":
+            part.SourceType = PartitionSourceType.Calculated
+            calc_source = CalculatedPartitionSource()
+            calc_source.Expression = source_expression
+            part.Source = calc_source
+
+    def delete_table(self, name):
+        m = self.model()
+        t = m.Tables.Find(name)
+        if not t: raise ModelError("Table not found.")
+        # Like the offline backends: relationships to the table go with it
+        for r in [r for r in m.Relationships if r.FromTable.Name == name or r.ToTable.Name == name]: m.Relationships.Remove(r)
+        m.Tables.Remove(t)
+
+    def create_relationship(self, from_table, from_col, to_table, to_col, active=True):
+        SingleColumnRelationship, CrossFilteringBehavior = _tom_types("SingleColumnRelationship", "CrossFilteringBehavior")
+        m = self.model()
+        rel = SingleColumnRelationship()
+        rel.FromColumn = m.Tables[from_table].Columns[from_col]
+        rel.ToColumn = m.Tables[to_table].Columns[to_col]
+        rel.IsActive = active
+        rel.CrossFilteringBehavior = CrossFilteringBehavior.OneDirection
+        m.Relationships.Add(rel)
+
+    def delete_relationship(self, from_table, from_col, to_table, to_col):
+        m = self.model()
+        for r in m.Relationships:
+            if r.FromTable.Name == from_table and r.FromColumn.Name == from_col and r.ToTable.Name == to_table and r.ToColumn.Name == to_col:
+                m.Relationships.Remove(r)
+                return
+        raise ModelError("Relationship not found.")
+
+    def create_role(self, name, filters=None):
+        m = self.model()
+        if m.Roles.Find(name): raise ModelError("Role exists.")
+        tables = {t: self._table(m, t) for t in (filters or {})}
+        ModelRole, ModelPermission, TablePermission = _tom_types("ModelRole", "ModelPermission", "TablePermission")
+        role = ModelRole()
+        role.Name = name
+        role.ModelPermission = ModelPermission.Read
+        m.Roles.Add(role)
+        for table, expression in (filters or {}).items():
+            tp = TablePermission()
+            tp.Table = tables[table]
+            tp.FilterExpression = expression
+            role.TablePermissions.Add(tp)
+
+    def save(self):
+        save_changes(self.model())
+
+    def discard(self):
+        # The Server object is shared across calls: never leave a failed change pending
+        try: self.model().UndoLocalChanges()
+        except Exception: pass
+
+    def describe(self) -> Dict:
+        from .connection import GLOBAL_CONTEXT
+        return {"type": "live", "connection_string": GLOBAL_CONTEXT.get("connection_string"), "port": GLOBAL_CONTEXT.get("port"),
+                "snapshot": dict(self.stats, cached=self._snapshot is not None)}
+
+_LIVE = TomModelBackend()
+
+def live_backend() -> TomModelBackend:
+    return _LIVE
+
+def set_offline_model(path: Optional[str]) -> Optional[ModelBackend]:
+    """Switches the TOM tools to a model on disk (None goes back to the live instance)."""
+    MODEL_CONTEXT["env_checked"] = True
+    if not path:
+        MODEL_CONTEXT["offline"] = None
+        return None
+    from .model_offline import open_model
+    MODEL_CONTEXT["offline"] = open_model(path)
+    return MODEL_CONTEXT["offline"]
+
+def get_backend() -> ModelBackend:
+    """Offline model when one is open (or SARA_MODEL_PATH is set), else the live instance."""
+    if not MODEL_CONTEXT["env_checked"]:
+        MODEL_CONTEXT["env_checked"] = True
+        if os.environ.get(MODEL_PATH_ENV): set_offline_model(os.environ[MODEL_PATH_ENV])
+    return MODEL_CONTEXT["offline"] or _LIVE
@@ -0,0 +1,172 @@
+import json
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .model_backend import ModelBackend, ModelError, DATA_TYPES
+from .model_meta import ModelMeta
+
+# Batched model edits: every operation is validated up front against name
+# indexes built from the metadata snapshot, then all of them are staged on the
+# backend and committed with a single save (one SaveChanges on a live model).
+
+OPS = ("create_measure", "update_measure", "delete_measure", "update_column", "delete_column",
+       "create_table", "update_table", "delete_table", "create_relationship", "delete_relationship")
+TABLE_TYPES = ("Global", "M", "Calculated")
+
+class _Names:
+    """Name indexes of the model as it will look after the operations validated so far."""
+    def __init__(self, meta: ModelMeta):
+        self.columns: Dict[str, Set[str]] = {t.name: set(t.columns) for t in meta.tables.values()}
+        self.measures: Dict[str, Set[str]] = {t.name: set(t.measures) for t in meta.tables.values()}
+        # Measure names are unique across the model
+        self.measure_table: Dict[str, str] = {m.lower(): t for t, ms in self.measures.items() for m in ms}
+        self.folded = {t.lower() for t in self.columns}
+        self.relationships: Set[Tuple[str, str, str, str]] = {
+            (r.from_table, r.from_column, r.to_table, r.to_column) for r in meta.relationships}
+
+    def table(self, name: str):
+        if name not in self.columns: raise ModelError(f"Table '{name}' not found.")
+
+    def column(self, table: str, name: str):
+        self.table(table)
+        if name not in self.columns[table]: raise ModelError(f"Column '{table}[{name}]' not found.")
+
+    def measure(self, table: str, name: str):
+        self.table(table)
+        if name not in self.measures[table]: raise ModelError(f"Measure '{table}[{name}]' not found.")
+
+    def free_in_table(self, table: str, name: str, measure: bool):
+        """A new name must not clash with the table's columns/measures; measure names are unique in the whole model."""
+        if name.lower() in {c.lower() for c in self.columns[table]}: raise ModelError(f"'{table}[{name}]' already exists as a column.")
+        owner = self.measure_table.get(name.lower())
+        if owner is not None and (measure or owner == table): raise ModelError(f"Measure '{name}' already exists in '{owner}'.")
+
+    def used_by(self, table: str, column: str = None) -> List[Tuple]:
+        return [r for r in self.relationships
+                if (r[0] == table and (column is None or r[1] == column)) or (r[2] == table and (column is None or r[3] == column))]
+
+def _required(op: Dict, *keys: str):
+    missing = [k for k in keys if not op.get(k)]
+    if missing: raise ModelError(f"Missing {', '.join(missing)}.")
+
+def validate_op(names: _Names, op: Dict):
+    """Checks one operation against the simulated model and applies it to the name indexes."""
+    kind = op.get("op")
+    if kind not in OPS: raise ModelError(f"Unknown op '{kind}' ({', '.join(OPS)}).")
+    if kind.endswith("_measure"):
+        _required(op, "table_name", "measure_name")
+        table, name = op["table_name"], op["measure_name"]
+        if kind == "create_measure":
+            _required(op, "expression")
+            names.table(table)
+            names.free_in_table(table, name, measure=True)
+            names.measures[table].add(name); names.measure_table[name.lower()] = table
+        else:
+            names.measure(table, name)
+            if kind == "delete_measure":
+                names.measures[table].discard(name); names.measure_table.pop(name.lower(), None)
+    elif kind.endswith("_column"):
+        _required(op, "table_name", "column_name")
+        table, name = op["table_name"], op["column_name"]
+        names.column(table, name)
+        if kind == "delete_column":
+            if names.used_by(table, name): raise ModelError(f"Column '{name}' is used by a relationship.")
+            names.columns[table].discard(name)
+            return
+        dt = op.get("data_type")
+        if dt and dt.lower() not in DATA_TYPES: raise ModelError(f"Unknown data_type '{dt}' ({', '.join(DATA_TYPES)}).")
+        new = op.get("new_name")
+        if new and new != name:
+            if new.lower() != name.lower(): names.free_in_table(table, new, measure=False)
+            names.columns[table].discard(name); names.columns[table].add(new)
+            names.relationships = {(r[0], new if r[:2] == (table, name) else r[1], r[2], new if r[2:] == (table, name) else r[3])
+                                   for r in names.relationships}
+    elif kind.endswith("_table"):
+        _required(op, "table_name")
+        table = op["table_name"]
+        if kind == "create_table":
+            if table.lower() in names.folded: raise ModelError(f"Table '{table}' already exists.")
+            ttype = op.get("type") or "Global"
+            if ttype not in TABLE_TYPES: raise ModelError(f"Unknown table type '{ttype}' ({', '.join(TABLE_TYPES)}).")
+            if ttype == "Calculated": _required(op, "source_expression")
+            names.columns[table], names.measures[table] = set(), set()
+            names.folded.add(table.lower())
+        elif kind == "update_table":
+            names.table(table)
+        else:
+            names.table(table)
+            for m in names.measures.pop(table): names.measure_table.pop(m.lower(), None)
+            del names.columns[table]
+            names.folded.discard(table.lower())
+            names.relationships -= set(names.used_by(table))
+    else:
+        _required(op, "from_table", "from_col", "to_table", "to_col")
+        key = (op["from_table"], op["from_col"], op["to_table"], op["to_col"])
+        if kind == "create_relationship":
+            names.column(key[0], key[1]); names.column(key[2], key[3])
+            if key in names.relationships: raise ModelError("Relationship already exists.")
+            names.relationships.add(key)
+        else:
+            if key not in names.relationships: raise ModelError("Relationship not found.")
+            names.relationships.discard(key)
+
+def stage_op(b: ModelBackend, op: Dict) -> str:
+    """Applies one (validated) operation to the backend without saving."""
+    kind, g = op["op"], op.get
+    if kind == "create_measure": b.create_measure(op["table_name"], op["measure_name"], op["expression"], g("description"))
+    elif kind == "update_measure": b.update_measure(op["table_name"], op["measure_name"], g("expression"), g("description"))
+    elif kind == "delete_measure": b.delete_measure(op["table_name"], op["measure_name"])
+    elif kind == "update_column":
+        b.update_column(op["table_name"], op["column_name"], g("new_name"), g("is_hidden"), g("data_type"), g("new_description"))
+    elif kind == "delete_column": b.delete_column(op["table_name"], op["column_name"])
+    elif kind in ("create_table", "update_table"):
+        b.upsert_table(op["table_name"], kind == "create_table", g("type") or "Global", g("source_expression"))
+    elif kind == "delete_table": b.delete_table(op["table_name"])
+    elif kind == "create_relationship": b.create_relationship(op["from_table"], op["from_col"], op["to_table"], op["to_col"], g("active", True))
+    else: b.delete_relationship(op["from_table"], op["from_col"], op["to_table"], op["to_col"])
+    return kind.split("_", 1)[0] + "d"
+
+def apply_model_changes(backend: ModelBackend, operations, dry_run: bool = False) -> Dict:
+    """
+    Validates every operation, stages them all and saves once. Nothing is
+    staged if any op is invalid; a failure while staging or saving discards
+    everything (the model is left as it was). Returns per-op results.
+    """
+    if isinstance(operations, str): operations = json.loads(operations)
+    if not isinstance(operations, list): raise ValueError("operations must be a list.")
+    names = _Names(backend.meta())
+    results = []
+    for i, op in enumerate(operations):
+        kind = op.get("op") if isinstance(op, dict) else None
+        try:
+            if kind is None: raise ModelError("Each operation must be an object with an 'op' key.")
+            validate_op(names, op)
+            results.append({"index": i, "op": kind, "status": "valid"})
+        except ModelError as e:
+            results.append({"index": i, "op": kind, "status": "error", "error": str(e)})
+    failed = sum(r["status"] == "error" for r in results)
+    res = {"committed": False, "operations": len(results), "errors": failed, "results": results}
+    if failed or dry_run or not results: return res
+
+    start = time.perf_counter()
+    failure: Optional[int] = None
+    try:
+        for i, op in enumerate(operations):
+            failure = i
+            results[i]["status"] = "ok"
+            results[i]["result"] = stage_op(backend, op)
+        failure = None
+        backend.save()
+    except Exception as e:
+        backend.discard()
+        msg = str(e) if isinstance(e, ModelError) else f"Error: {e}"
+        for r in results:
+            r.pop("result", None); r["status"] = "rolled_back"
+        if failure is None: res["error"] = f"Save failed: {msg}"
+        else:
+            results[failure].update(status="error", error=msg)
+            for r in results[failure + 1:]: r["status"] = "skipped"
+        res.update(errors=1, rolled_back=True)
+        return res
+    res.update(committed=True, seconds=round(time.perf_counter() - start, 3))
+    return res
@@ -0,0 +1,325 @@
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from .model_meta import ModelMeta
+from .model_search import _REF
+
+# DAX dependency graph over measures, calculated columns and calculated tables.
+# Expressions are tokenized into raw references ('T'[C], [X], bare table names;
+# variables are skipped), which are resolved against the model's names into
+# edges. The graph is kept across calls: only expressions whose text changed
+# are re-parsed, and only expressions mentioning an added/removed name are
+# re-resolved.
+
+Node = Tuple[str, Optional[str], str] # (type, table, name); tables are ("Table", None, name)
+
+_KEYWORDS = {"var", "return", "true", "false", "in", "not", "and", "or", "asc", "desc", "define", "evaluate",
+             "measure", "column", "table", "order", "by", "start", "at", "blank"}
+
+def _skip_quoted(text: str, i: int, close: str) -> Tuple[str, int]:
+    """Reads a quoted/bracketed name starting after the opening char; doubled close chars are escapes."""
+    out, n = [], len(text)
+    while i < n:
+        c = text[i]
+        if c == close:
+            if i + 1 < n and text[i + 1] == close:
+                out.append(c); i += 2; continue
+            return "".join(out), i + 1
+        out.append(c); i += 1
+    return "".join(out), n
+
+def _next_char(text: str, i: int) -> Tuple[str, int]:
+    n = len(text)
+    while i < n and text[i].isspace(): i += 1
+    return (text[i] if i < n else ""), i
+
+def _scan(expression: str):
+    """Yields (reference, start, end) for references(); [start, end) spans the [Name] part of column/bare refs."""
+    text, i, n = expression or "", 0, len(expression or "")
+    variables: Set[str] = set()
+    after_var = False
+    while i < n:
+        c = text[i]
+        if c.isspace(): i += 1; continue
+        two = text[i:i + 2]
+        if two in ("//", "--"):
+            j = text.find("\n", i)
+            i = n if j < 0 else j + 1; continue
+        if two == "/*":
+            j = text.find("*/", i + 2)
+            i = n if j < 0 else j + 2; continue
+        if c == '"':
+            _, i = _skip_quoted(text, i + 1, '"'); continue
+        if c == "'":
+            start = i
+            name, i = _skip_quoted(text, i + 1, "'")
+            nc, j = _next_char(text, i)
+            if nc == "[":
+                col, i = _skip_quoted(text, j + 1, "]")
+                yield ("col", name, col), j, i
+            else: yield ("table", name), start, i
+            after_var = False; continue
+        if c == "[":
+            start = i
+            name, i = _skip_quoted(text, i + 1, "]")
+            yield ("bare", name), start, i
+            after_var = False; continue
+        if c.isalpha() or c == "_":
+            start, j = i, i + 1
+            while j < n and (text[j].isalnum() or text[j] in "_."): j += 1
+            word, i = text[i:j], j
+            if after_var:
+                variables.add(word.lower()); after_var = False; continue
+            low = word.lower()
+            if low == "var": after_var = True; continue
+            nc, j = _next_char(text, i)
+            if nc == "(": continue # function call
+            if nc == "[":
+                col, i = _skip_quoted(text, j + 1, "]")
+                if low not in variables: yield ("col", word, col), j, i
+                continue
+            if low not in _KEYWORDS and low not in variables: yield ("table", word), start, i
+            continue
+        i += 1
+        after_var = False
+
+def references(expression: str) -> List[Tuple]:
+    """
+    Raw references of a DAX expression: ("col", table, name) for 'T'[X] / T[X],
+    ("bare", name) for [X] and ("table", name) for a bare/quoted table name.
+    Strings and comments are skipped; VAR names are not references.
+    """
+    return [ref for ref, _, _ in _scan(expression)]
+
+def rename_column_refs(expression: str, table: str, old: str, new: str, home: Optional[str] = None) -> str:
+    """
+    Rewrites references to table[old] as table[new]. Bare [old] is rewritten too when the
+    expression belongs to `home` == table (calculated columns, RLS filters of that table).
+    """
+    text, out, last = expression or "", [], 0
+    t, o = table.lower(), old.lower()
+    bare = home is not None and home.lower() == t
+    for ref, start, end in _scan(text):
+        if ref[0] == "col" and ref[1].lower() == t and ref[2].lower() == o: pass
+        elif ref[0] == "bare" and bare and ref[1].lower() == o: pass
+        else: continue
+        out += [text[last:start], "[", new.replace("]", "]]"), "]"]
+        last = end
+    return "".join(out) + text[last:] if out else text
+
+def _mentions(raw: List[Tuple]) -> Set[str]:
+    """Lowercase names a raw reference list depends on (for re-resolving when those names change)."""
+    out = set()
+    for r in raw:
+        out.update(x.lower() for x in r[1:])
+    return out
+
+def node_row(node: Node) -> Dict:
+    return {"Type": node[0], "Table": node[1], "Name": node[2]} if node[1] else {"Type": node[0], "Name": node[2]}
+
+class DependencyGraph:
+    """Dependency DAG of one model, synced incrementally with its metadata snapshot."""
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._meta: Optional[ModelMeta] = None
+        self._exprs: Dict[Node, str] = {}
+        self._raw: Dict[Node, List[Tuple]] = {}
+        self._mentioned: Dict[str, Set[Node]] = {} # lowercase name -> expression nodes mentioning it
+        self._deps: Dict[Node, Set[Node]] = {}
+        self._rdeps: Dict[Node, Set[Node]] = {}
+        self._unresolved: Dict[Node, List[str]] = {}
+        self._depth: Dict[Node, int] = {}
+        self._names: Set[Tuple] = set()
+        self._measures: Dict[str, Node] = {}
+        self._columns: Dict[Tuple[str, str], Node] = {}
+        self._tables: Dict[str, Node] = {}
+        self.stats = {"syncs": 0, "parsed": 0, "resolved": 0, "nodes": 0}
+
+    # --- Sync ---
+
+    def sync(self, meta: ModelMeta):
+        """Brings the graph in line with meta: re-parses changed expressions, re-resolves those mentioning changed names."""
+        with self._lock:
+            if meta is self._meta: return
+            exprs: Dict[Node, str] = {}
+            measures, columns, tables = {}, {}, {}
+            for t in meta.tables.values():
+                tnode = tables[t.name.lower()] = ("Table", None, t.name)
+                calc = [p.expression for p in t.partitions if p.source_type == "Calculated" and p.expression]
+                if calc: exprs[tnode] = "\n".join(calc)
+                for c in t.columns.values():
+                    node = columns[(t.name.lower(), c.name.lower())] = ("Column", t.name, c.name)
+                    if c.expression: exprs[node] = c.expression
+                for m in t.measures.values():
+                    node = measures[m.name.lower()] = ("Measure", t.name, m.name)
+                    exprs[node] = m.expression or ""
+            names = {("m", k, v[1]) for k, v in measures.items()} | {("c",) + k for k in columns} | {("t", k) for k in tables}
+            changed = {k[1] for k in names ^ self._names} | {k[2].lower() for k in names ^ self._names if k[0] == "c"}
+            self._measures, self._columns, self._tables, self._names = measures, columns, tables, names
+
+            removed = [k for k in self._exprs if k not in exprs]
+            for node in removed:
+                self._forget(node)
+                self._set_edges(node, set())
+                self._exprs.pop(node); self._unresolved.pop(node, None)
+            resolve: Set[Node] = set()
+            for node, text in exprs.items():
+                if self._exprs.get(node) == text and node in self._raw: continue
+                self._forget(node)
+                self._exprs[node], self._raw[node] = text, references(text)
+                for name in _mentions(self._raw[node]): self._mentioned.setdefault(name, set()).add(node)
+                resolve.add(node)
+                self.stats["parsed"] += 1
+            for name in changed: resolve |= self._mentioned.get(name, set())
+            for node in resolve: self._resolve(node)
+
+            # Cached depths of anything downstream of a change are stale
+            stale, todo = set(removed), list(resolve)
+            while todo:
+                node = todo.pop()
+                if node in stale: continue
+                stale.add(node)
+                todo.extend(self._rdeps.get(node, ()))
+            for node in stale: self._depth.pop(node, None)
+            self._meta = meta
+            self.stats["syncs"] += 1
+            self.stats["nodes"] = len(self._exprs)
+
+    def _forget(self, node: Node):
+        for name in _mentions(self._raw.pop(node, [])):
+            s = self._mentioned.get(name)
+            if s is not None:
+                s.discard(node)
+                if not s: del self._mentioned[name]
+
+    def _set_edges(self, node: Node, deps: Set[Node]):
+        for d in self._deps.get(node, set()) - deps:
+            s = self._rdeps.get(d)
+            if s is not None:
+                s.discard(node)
+                if not s: del self._rdeps[d]
+        for d in deps: self._rdeps.setdefault(d, set()).add(node)
+        if deps: self._deps[node] = deps
+        else: self._deps.pop(node, None)
+
+    def _resolve(self, node: Node):
+        """Raw references -> edges. [X] is a measure, else a column of the expression's own table."""
+        deps, missing = set(), []
+        own = (node[1] or "").lower()
+        for r in self._raw.get(node, []):
+            if r[0] == "col":
+                t, x = r[1].lower(), r[2].lower()
+                target = self._columns.get((t, x))
+                if target is None:
+                    m = self._measures.get(x)
+                    target = m if m is not None and m[1].lower() == t else None
+                if target is None: missing.append(f"'{r[1]}'[{r[2]}]")
+            elif r[0] == "bare":
+                x = r[1].lower()
+                target = self._measures.get(x) or self._columns.get((own, x))
+                if target is None: missing.append(f"[{r[1]}]")
+            else:
+                # Bare identifiers that are not tables (e.g. enum arguments) are not references
+                target = self._tables.get(r[1].lower())
+            if target is not None and target != node: deps.add(target)
+        self._set_edges(node, deps)
+        if missing: self._unresolved[node] = sorted(set(missing))
+        else: self._unresolved.pop(node, None)
+        self.stats["resolved"] += 1
+
+    # --- Queries ---
+
+    def find(self, name: str, table: str = None) -> Optional[Node]:
+        """'Table'[Column], Table[Measure], [Measure], a measure/table name, or a column name with table."""
+        with self._lock:
+            m = _REF.match(name or "")
+            if m:
+                table, name = m.group(1).strip(), m.group(2)
+            name = (name or "").strip().strip("[]")
+            low = name.lower()
+            if table:
+                t = table.strip("'").lower()
+                node = self._columns.get((t, low))
+                if node is not None: return node
+                node = self._measures.get(low)
+                return node if node is not None and node[1].lower() == t else None
+            node = self._measures.get(low) or self._tables.get(low)
+            if node is not None: return node
+            matches = [n for (t, c), n in self._columns.items() if c == low]
+            return matches[0] if len(matches) == 1 else None
+
+    def _walk(self, node: Node, edges: Dict[Node, Set[Node]], transitive: bool) -> List[Dict]:
+        """BFS over edges; level = distance from node."""
+        seen, frontier, out, level = {node}, [node], [], 0
+        while frontier:
+            level += 1
+            nxt = []
+            for n in frontier:
+                for d in sorted(edges.get(n, ()), key=lambda x: (x[0], x[1] or "", x[2])):
+                    if d in seen: continue
+                    seen.add(d); nxt.append(d)
+                    out.append(dict(node_row(d), Level=level))
+            if not transitive: break
+            frontier = nxt
+        return out
+
+    def dependencies(self, node: Node, transitive: bool = True) -> List[Dict]:
+        """What node depends on."""
+        with self._lock: return self._walk(node, self._deps, transitive)
+
+    def dependents(self, node: Node, transitive: bool = True) -> List[Dict]:
+        """What depends on node."""
+        with self._lock: return self._walk(node, self._rdeps, transitive)
+
+    def depth(self, node: Node) -> int:
+        """
+        Evaluation depth: 0 for data columns/regular tables, 1 + deepest dependency for expressions.
+        Iterative, memoized; a cycle (invalid DAX) is cut where it closes.
+        """
+        with self._lock:
+            memo = self._depth
+            if node in memo: return memo[node]
+            stack, active = [(node, iter(self._deps.get(node, ())))], {node}
+            while stack:
+                n, it = stack[-1]
+                for d in it:
+                    if d not in memo and d not in active:
+                        active.add(d)
+                        stack.append((d, iter(self._deps.get(d, ()))))
+                        break
+                else:
+                    stack.pop(); active.discard(n)
+                    below = [memo.get(d, 0) for d in self._deps.get(n, ())]
+                    memo[n] = (1 + max(below, default=0)) if n in self._exprs else 0
+            return memo[node]
+
+    def chain(self, node: Node) -> List[str]:
+        """Deepest dependency path below node (the chain that sets its depth)."""
+        with self._lock:
+            out, seen = [], set()
+            while node is not None and node not in seen:
+                seen.add(node)
+                out.append(f"[{node[2]}]" if node[0] == "Measure" else f"'{node[2]}'" if node[0] == "Table" else f"'{node[1]}'[{node[2]}]")
+                deps = [d for d in self._deps.get(node, ()) if d in self._exprs]
+                node = max(deps, key=lambda d: (self.depth(d), d[2]), default=None)
+            return out
+
+    def describe(self, node: Node, direction: str = "both", transitive: bool = True) -> Dict:
+        with self._lock:
+            res = dict(node_row(node), Depth=self.depth(node), Chain=self.chain(node))
+            if node in self._unresolved: res["Unresolved"] = self._unresolved[node]
+            if direction in ("both", "dependencies"): res["DependsOn"] = self.dependencies(node, transitive)
+            if direction in ("both", "dependents"): res["UsedBy"] = self.dependents(node, transitive)
+            return res
+
+    def deepest(self, limit: int = 20, object_type: str = None) -> List[Dict]:
+        """Expression objects ranked by evaluation depth (deep measure chains first)."""
+        with self._lock:
+            nodes = [n for n in self._exprs if object_type is None or n[0] == object_type]
+            ranked = sorted(nodes, key=lambda n: (-self.depth(n), n[0], n[1] or "", n[2]))[:limit]
+            return [dict(node_row(n), Depth=self.depth(n), Dependents=len(self._rdeps.get(n, ())), Chain=self.chain(n)) for n in ranked]
+
+    def unresolved(self) -> List[Dict]:
+        """Expressions referencing names that don't exist in the model."""
+        with self._lock:
+            return [dict(node_row(n), Missing=m) for n, m in sorted(self._unresolved.items(), key=lambda x: (x[0][1] or "", x[0][2]))]
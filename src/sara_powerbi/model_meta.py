@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional
+
+# Plain-Python model metadata records. Backends produce these so read tools
+# never touch the live object model (or re-parse files) to answer a query.
+
+class Column:
+    __slots__ = ("table", "name", "data_type", "is_hidden", "description", "expression", "kind", "sort_by")
+    def __init__(self, table: str, name: str, data_type: str = "", is_hidden: bool = False,
+                 description: str = "", expression: Optional[str] = None, kind: str = "Data", sort_by: str = ""):
+        self.table, self.name, self.data_type, self.is_hidden = table, name, data_type, is_hidden
+        self.description, self.expression, self.kind, self.sort_by = description, expression, kind, sort_by
+
+class Measure:
+    __slots__ = ("table", "name", "expression", "description", "is_hidden")
+    def __init__(self, table: str, name: str, expression: str = "", description: str = "", is_hidden: bool = False):
+        self.table, self.name, self.expression, self.description, self.is_hidden = table, name, expression, description, is_hidden
+
+class Partition:
+    __slots__ = ("table", "name", "mode", "source_type", "expression")
+    def __init__(self, table: str, name: str, mode: str = "", source_type: str = "", expression: str = ""):
+        self.table, self.name, self.mode, self.source_type, self.expression = table, name, mode, source_type, expression
+
+class Table:
+    __slots__ = ("name", "description", "is_hidden", "columns", "measures", "partitions")
+    def __init__(self, name: str, description: str = "", is_hidden: bool = False):
+        self.name, self.description, self.is_hidden = name, description, is_hidden
+        self.columns: Dict[str, Column] = {}
+        self.measures: Dict[str, Measure] = {}
+        self.partitions: List[Partition] = []
+
+class Relationship:
+    __slots__ = ("name", "from_table", "from_column", "to_table", "to_column", "is_active", "cross_filter")
+    def __init__(self, name: str, from_table: str, from_column: str, to_table: str, to_column: str,
+                 is_active: bool = True, cross_filter: str = "OneDirection"):
+        self.name, self.from_table, self.from_column = name, from_table, from_column
+        self.to_table, self.to_column, self.is_active, self.cross_filter = to_table, to_column, is_active, cross_filter
+
+class Role:
+    __slots__ = ("name", "permission", "filters")
+    def __init__(self, name: str, permission: str = "Read", filters: Dict[str, str] = None):
+        self.name, self.permission, self.filters = name, permission, filters or {}
+
+class ModelMeta:
+    __slots__ = ("name", "compatibility_level", "created", "last_update", "version", "tables", "relationships", "roles")
+    def __init__(self, name: str = "", compatibility_level=None, created: str = "", last_update: str = "", version=None):
+        self.name, self.compatibility_level, self.created, self.last_update, self.version = name, compatibility_level, created, last_update, version
+        self.tables: Dict[str, Table] = {}
+        self.relationships: List[Relationship] = []
+        self.roles: List[Role] = []
+
+# --- Tool-shaped views (same keys the live TOM tools always returned) ---
+
+def list_rows(meta: ModelMeta, object_type: str) -> List[Dict]:
+    tables = meta.tables.values()
+    if object_type == "tables":
+        return [{"Name": t.name, "Description": t.description or ""} for t in tables]
+    if object_type == "measures":
+        return [{"Name": m.name, "Table": t.name, "Expression": m.expression} for t in tables for m in t.measures.values()]
+    if object_type == "columns":
+        return [{"Name": c.name, "Table": t.name, "DataType": c.data_type, "Hidden": c.is_hidden} for t in tables for c in t.columns.values()]
+    if object_type == "relationships":
+        return [{"From": f"{r.from_table}[{r.from_column}]", "To": f"{r.to_table}[{r.to_column}]", "Active": r.is_active} for r in meta.relationships]
+    if object_type == "roles":
+        return [{"Name": r.name} for r in meta.roles]
+    if object_type == "partitions":
+        return [{"Table": t.name, "Partition": p.name, "Mode": p.mode, "SourceType": p.source_type} for t in tables for p in t.partitions]
+    return []
+
+def info_dict(meta: ModelMeta) -> Dict:
+    return {"Name": meta.name, "CompatibilityLevel": meta.compatibility_level, "Created": meta.created, "LastUpdate": meta.last_update}
@@ -0,0 +1,586 @@
+import os
+import re
+import glob
+import uuid
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+from . import tmdl
+from .report_index import load_json, file_sig
+from .refactor import StagedFiles
+from .model_deps import rename_column_refs
+from .model_meta import ModelMeta, Table, Column, Measure, Partition, Relationship, Role
+from .model_backend import ModelBackend, ModelError, DATA_TYPES
+
+# TMDL / model.bim spellings -> TOM enum names (what the live backend reports)
+_TYPE_NAMES = {"string": "String", "int64": "Int64", "double": "Double", "datetime": "DateTime", "decimal": "Decimal",
+               "boolean": "Boolean", "binary": "Binary", "variant": "Variant", "automatic": "Automatic"}
+_SOURCE_TYPES = {"m": "M", "calculated": "Calculated", "entity": "Entity", "query": "Query", "policyrange": "PolicyRange",
+                 "calculationgroup": "CalculationGroup"}
+# manage_column data_type -> file spelling
+_FILE_TYPES = {"String": "string", "Int64": "int64", "Double": "double", "DateTime": "dateTime", "Boolean": "boolean"}
+_DEFAULT_M = 'let Source = "" in Source'
+
+def _enum(value: str, names: Dict[str, str]) -> str:
+    if not value: return ""
+    return names.get(str(value).lower(), str(value)[:1].upper() + str(value)[1:])
+
+def _mtime(paths: List[str]) -> str:
+    stamps = [os.path.getmtime(p) for p in paths if os.path.exists(p)]
+    return datetime.datetime.fromtimestamp(max(stamps)).isoformat(sep=" ", timespec="seconds") if stamps else ""
+
+def _flag(node: tmdl.Node, key: str) -> bool:
+    """Boolean TMDL property: bare `isHidden` or `isHidden: true`."""
+    value = node.prop(key)
+    return value is True or str(value).lower() == "true"
+
+def _safe_file_name(name: str) -> str:
+    return re.sub(r'[\\/:*?"<>|]', "_", name)
+
+def resolve_model_path(path: str) -> Tuple[str, str]:
+    """(kind, path) for a .SemanticModel folder, its definition folder, a model.bim file or a .pbip project."""
+    path = os.path.abspath(path)
+    if os.path.isfile(path):
+        if path.lower().endswith(".bim"): return "bim", path
+        if path.lower().endswith(".pbip"): path = os.path.dirname(path)
+        else: raise ModelError(f"Not a model file: '{path}'.")
+    candidates = [path] + sorted(glob.glob(os.path.join(path, "*.SemanticModel")))
+    for folder in candidates:
+        if os.path.isfile(os.path.join(folder, "model.tmdl")): return "tmdl", folder
+        if os.path.isfile(os.path.join(folder, "definition", "model.tmdl")): return "tmdl", os.path.join(folder, "definition")
+        if os.path.isfile(os.path.join(folder, "model.bim")): return "bim", os.path.join(folder, "model.bim")
+    raise ModelError(f"No TMDL folder or model.bim found at '{path}'.")
+
+def _model_name(path: str) -> str:
+    """Project name from the .SemanticModel folder."""
+    for part in reversed(os.path.normpath(path).split(os.sep)):
+        if part.endswith(".SemanticModel"): return part[:-len(".SemanticModel")]
+    return os.path.splitext(os.path.basename(path))[0]
+
+class OfflineModel(ModelBackend):
+    """Common bookkeeping for file-backed models: metadata is rebuilt lazily after edits."""
+    kind = "offline"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._meta: Optional[ModelMeta] = None
+        self.load()
+
+    def load(self): raise NotImplementedError
+    def build_meta(self) -> ModelMeta: raise NotImplementedError
+
+    def meta(self) -> ModelMeta:
+        if self._meta is None: self._meta = self.build_meta()
+        return self._meta
+
+    def changed(self):
+        self._meta = None
+
+    def discard(self):
+        self.load()
+
+    def describe(self) -> Dict:
+        return {"type": "offline", "format": self.fmt, "path": self.path}
+
+    # Shared validation against the current metadata
+    def _check_column(self, table: str, column: str):
+        t = self.meta().tables.get(table)
+        if not t or column not in t.columns: raise ModelError(f"Column '{table}[{column}]' not found.")
+
+    def _relationships_using(self, table: str, column: str = None) -> List[Relationship]:
+        return [r for r in self.meta().relationships
+                if (r.from_table == table and (column is None or r.from_column == column))
+                or (r.to_table == table and (column is None or r.to_column == column))]
+
+    def _check_role(self, name: str, filters: Dict[str, str]):
+        meta = self.meta()
+        if any(r.name == name for r in meta.roles): raise ModelError("Role exists.")
+        for table in filters:
+            if table not in meta.tables: raise ModelError(f"Table '{table}' not found.")
+
+    def _check_unchanged(self, paths):
+        """Refuses to save over files edited outside this session since they were loaded (sigs: file_sig at load)."""
+        for path in paths:
+            if file_sig(path) != self.sigs.get(path):
+                raise ModelError(f"'{os.path.basename(path)}' changed on disk since the model was opened; nothing was saved. Reopen the model to pick up the change.")
+
+    def _bare_home(self, table: str, old: str) -> Optional[str]:
+        """Table whose expressions may use bare [old] for the column (None when a measure of that name makes it ambiguous)."""
+        measures = {m.lower() for t in self.meta().tables.values() for m in t.measures}
+        return None if old.lower() in measures else table
+
+class TmdlModel(OfflineModel):
+    """
+    A TMDL definition folder. Files are parsed with line spans; edits rewrite
+    only the lines of the touched objects and save() writes changed files.
+    """
+    fmt = "tmdl"
+
+    def load(self):
+        self.docs: Dict[str, tmdl.Document] = {}
+        self.dirty, self.deleted = set(), set()
+        self.sigs: Dict[str, Tuple[int, int]] = {}
+        files = [os.path.join(self.path, f) for f in ("database.tmdl", "model.tmdl", "relationships.tmdl", "expressions.tmdl")]
+        files += sorted(glob.glob(os.path.join(self.path, "tables", "*.tmdl")))
+        files += sorted(glob.glob(os.path.join(self.path, "roles", "*.tmdl")))
+        for f in files:
+            if not os.path.isfile(f): continue
+            self.sigs[f] = file_sig(f)
+            with open(f, 'r', encoding='utf-8-sig') as fh: self.docs[f] = tmdl.parse(fh.read())
+        self.changed()
+
+    # --- Lookup ---
+
+    def _table_doc(self, name: str) -> Tuple[str, tmdl.Document, tmdl.Node]:
+        for path, doc in self.docs.items():
+            for node in doc.roots:
+                if node.keyword == "table" and node.name == name: return path, doc, node
+        raise ModelError(f"Table '{name}' not found.")
+
+    def _child(self, table: str, keyword: str, name: str, missing: str):
+        path, doc, t = self._table_doc(table)
+        node = t.find(keyword, name)
+        if not node: raise ModelError(missing)
+        return path, doc, node
+
+    def _rel_doc(self, create: bool = False) -> Tuple[str, Optional[tmdl.Document]]:
+        path = os.path.join(self.path, "relationships.tmdl")
+        if path not in self.docs and create: self.docs[path] = tmdl.parse("")
+        return path, self.docs.get(path)
+
+    def _edit(self, path: str):
+        self.dirty.add(path)
+        self.deleted.discard(path)
+        self.changed()
+
+    # --- Metadata ---
+
+    def build_meta(self) -> ModelMeta:
+        db = next((n for d in self.docs.values() for n in d.roots if n.keyword == "database"), None)
+        level = db.prop("compatibilityLevel") if db else None
+        meta = ModelMeta(_model_name(self.path), int(level) if level and str(level).isdigit() else level,
+                         "", _mtime(list(self.docs)), None)
+        for path, doc in self.docs.items():
+            for node in doc.roots:
+                if node.keyword == "table":
+                    meta.tables[node.name] = self._table_meta_from(node)
+                elif node.keyword == "relationship":
+                    ft, fc = tmdl.split_ref(node.prop("fromColumn", ""))
+                    tt, tc = tmdl.split_ref(node.prop("toColumn", ""))
+                    meta.relationships.append(Relationship(node.name, ft, fc, tt, tc, str(node.prop("isActive", "true")).lower() != "false",
+                                                           _enum(node.prop("crossFilteringBehavior", "oneDirection"), {})))
+                elif node.keyword == "role":
+                    meta.roles.append(Role(node.name, _enum(node.prop("modelPermission", "read"), {}),
+                                           {tp.name: tp.value or "" for tp in node.all("tablePermission")}))
+        return meta
+
+    @staticmethod
+    def _table_meta_from(node: tmdl.Node) -> Table:
+        t = Table(node.name, "\n".join(node.doc), _flag(node, "isHidden"))
+        for c in node.all("column"):
+            t.columns[c.name] = Column(node.name, c.name, _enum(c.prop("dataType", ""), _TYPE_NAMES), _flag(c, "isHidden"),
+                                       "\n".join(c.doc), c.value, "Calculated" if c.value else "Data",
+                                       tmdl.split_name(c.prop("sortByColumn", ""))[0])
+        for m in node.all("measure"):
+            t.measures[m.name] = Measure(node.name, m.name, m.value or "", "\n".join(m.doc), _flag(m, "isHidden"))
+        for p in node.all("partition"):
+            t.partitions.append(Partition(node.name, p.name, _enum(p.prop("mode", "import"), {}), _enum(p.value, _SOURCE_TYPES), p.prop("source", "") or ""))
+        return t
+
+    # --- Measures ---
+
+    def create_measure(self, table, name, expression, description=None):
+        path, doc, t = self._table_doc(table)
+        if t.find("measure", name): raise ModelError("Measure exists.")
+        lines = doc.doc_lines(description, t.level + 1) + doc.value_lines(f"measure {tmdl.quote_name(name)}", expression or "", t.level + 1)
+        lines.append(f"{doc.unit * (t.level + 2)}lineageTag: {uuid.uuid4()}")
+        measures = t.all("measure")
+        doc.insert_child(t, lines, after=measures[-1] if measures else None)
+        self._edit(path)
+
+    def update_measure(self, table, name, expression=None, description=None):
+        missing = "Measure not found."
+        path, doc, node = self._child(table, "measure", name, missing)
+        if expression: doc.set_value(node, expression)
+        if description: doc.set_description(self._child(table, "measure", name, missing)[2], description)
+        self._edit(path)
+
+    def delete_measure(self, table, name):
+        path, doc, node = self._child(table, "measure", name, "Measure not found.")
+        doc.remove(node)
+        self._edit(path)
+
+    # --- Columns ---
+
+    def update_column(self, table, name, new_name=None, is_hidden=None, data_type=None, description=None):
+        missing = f"Column '{name}' not found."
+        path, doc, node = self._child(table, "column", name, missing)
+        if data_type and data_type.lower() in DATA_TYPES:
+            doc.set_prop(node, "dataType", _FILE_TYPES[DATA_TYPES[data_type.lower()]])
+        if is_hidden is not None:
+            doc.set_prop(self._child(table, "column", name, missing)[2], "isHidden", True if is_hidden else None)
+        if description:
+            doc.set_description(self._child(table, "column", name, missing)[2], description)
+        if new_name and new_name != name:
+            doc.rename(self._child(table, "column", name, missing)[2], new_name)
+            self._rename_refs(table, name, new_name)
+        self._edit(path)
+
+    def _rename_refs(self, table: str, old: str, new: str):
+        """
+        Files point at columns by name (TOM keeps object references): relationships, DAX
+        expressions, RLS filters, sort-by columns and hierarchy levels are rewritten.
+        """
+        rel_path, rel_doc = self._rel_doc()
+        # Every edit re-parses the document, so look the next match up again each time
+        while rel_doc:
+            hit = next(((node, key) for node in rel_doc.roots for key in ("fromColumn", "toColumn")
+                        if tmdl.split_ref(node.prop(key, "")) == (table, old)), None)
+            if not hit: break
+            rel_doc.set_prop(hit[0], hit[1], tmdl.format_ref(table, new))
+            self._edit(rel_path)
+        bare = self._bare_home(table, old)
+        for path, chain, home, what in self._ref_sites():
+            doc = self.docs[path]
+            node = _locate(doc, chain)
+            if what in ("sortByColumn", "column"):
+                if home != table or tmdl.split_name(node.prop(what, ""))[0] != old: continue
+                doc.set_prop(node, what, tmdl.quote_name(new))
+            else:
+                cur = node.prop("source", "") if what == "source" else node.value or ""
+                text = rename_column_refs(cur, table, old, new, home if home == bare else None)
+                if text == cur: continue
+                if what == "source": doc.set_expr_prop(node, "source", text)
+                else: doc.set_value(node, text)
+            self._edit(path)
+
+    def _ref_sites(self) -> List[Tuple[str, List[Tuple[str, str]], Optional[str], str]]:
+        """(path, node chain, home table, what) of every place that can name a column."""
+        sites = []
+        def walk(path, node, chain, home):
+            chain = chain + [(node.keyword, node.name)]
+            if node.keyword in ("measure", "column", "calculationItem", "tablePermission") and node.value:
+                sites.append((path, chain, home, "value"))
+            if node.keyword == "column" and node.prop("sortByColumn"): sites.append((path, chain, home, "sortByColumn"))
+            if node.keyword == "level" and node.prop("column"): sites.append((path, chain, home, "column"))
+            if node.keyword == "partition" and node.value == "calculated": sites.append((path, chain, None, "source"))
+            for child in node.children:
+                walk(path, child, chain, child.name if child.keyword == "tablePermission" else home)
+        for path, doc in self.docs.items():
+            for root in doc.roots:
+                if root.keyword in ("table", "role"): walk(path, root, [], root.name if root.keyword == "table" else None)
+        return sites
+
+    def delete_column(self, table, name):
+        path, doc, node = self._child(table, "column", name, f"Column '{name}' not found.")
+        if self._relationships_using(table, name): raise ModelError(f"Column '{name}' is used by a relationship.")
+        doc.remove(node)
+        self._edit(path)
+
+    # --- Tables ---
+
+    def upsert_table(self, name, create, type="Global", source_expression=None):
+        calculated = type == "Calculated"
+        if not calculated and type not in ("Global", "M"): raise ModelError(f"Unknown table type '{type}'.")
+        if create:
+            if name in self.meta().tables: raise ModelError("Table exists.")
+            doc = tmdl.parse("")
+            q = tmdl.quote_name(name)
+            u = doc.unit
+            lines = [f"table {q}", f"{u}lineageTag: {uuid.uuid4()}", "",
+                     f"{u}partition {q} = {'calculated' if calculated else 'm'}", f"{u * 2}mode: import"]
+            doc.replace(0, 0, lines + doc.value_lines("source", source_expression or ("" if calculated else _DEFAULT_M), 2))
+            path = os.path.join(self.path, "tables", _safe_file_name(name) + ".tmdl")
+            self.docs[path] = doc
+            self._edit(path)
+            self._add_ref("table", name)
+            return
+        path, doc, t = self._table_doc(name)
+        part = t.find("partition")
+        if not part:
+            doc.insert_child(t, [f"{doc.unit}partition {tmdl.quote_name(name)} = m", f"{doc.unit * 2}mode: import"])
+            path, doc, t = self._table_doc(name)
+            part = t.find("partition")
+        doc.set_value(part, "calculated" if calculated else "m")
+        part = self._table_doc(name)[2].find("partition")
+        expression = source_expression or part.prop("source") or ("" if calculated else _DEFAULT_M)
+        doc.set_expr_prop(part, "source", expression)
+        self._edit(path)
+
+    def _add_ref(self, kind: str, name: str):
+        """model.tmdl lists tables (`ref table X`, and roles when it already lists some) in newer TMDL versions."""
+        path = os.path.join(self.path, "model.tmdl")
+        doc = self.docs.get(path)
+        if not doc: return
+        keyword = f"ref {kind}"
+        model = next((n for n in doc.roots if n.keyword == "model"), None)
+        refs = [n for n in (model.children if model else doc.roots) if n.keyword == keyword]
+        if not refs: refs = [n for n in doc.roots if n.keyword == keyword]
+        if not refs: return
+        last = refs[-1]
+        doc.replace(last.end, last.end, [f"{doc.unit * last.level}{keyword} {tmdl.quote_name(name)}"])
+        self._edit(path)
+
+    def delete_table(self, name):
+        path, doc, t = self._table_doc(name)
+        for r in self._relationships_using(name):
+            self.delete_relationship(r.from_table, r.from_column, r.to_table, r.to_column)
+        if len(doc.roots) == 1:
+            del self.docs[path]
+            self.dirty.discard(path)
+            self.deleted.add(path)
+        else:
+            doc.remove(t)
+            self._edit(path)
+        model_path = os.path.join(self.path, "model.tmdl")
+        model_doc = self.docs.get(model_path)
+        if model_doc:
+            ref = next((n for root in model_doc.roots for n in [root] + root.children if n.keyword == "ref table" and n.name == name), None)
+            if ref:
+                model_doc.replace(ref.start, ref.end, [])
+                self._edit(model_path)
+        self.changed()
+
+    # --- Relationships ---
+
+    def create_relationship(self, from_table, from_col, to_table, to_col, active=True):
+        self._check_column(from_table, from_col)
+        self._check_column(to_table, to_col)
+        path, doc = self._rel_doc(create=True)
+        lines = [f"relationship {uuid.uuid4()}"]
+        if not active: lines.append(f"{doc.unit}isActive: false")
+        lines += [f"{doc.unit}fromColumn: {tmdl.format_ref(from_table, from_col)}", f"{doc.unit}toColumn: {tmdl.format_ref(to_table, to_col)}"]
+        doc.append_root(lines)
+        self._edit(path)
+
+    def delete_relationship(self, from_table, from_col, to_table, to_col):
+        path, doc = self._rel_doc()
+        for node in (doc.roots if doc else []):
+            if node.keyword == "relationship" and tmdl.split_ref(node.prop("fromColumn", "")) == (from_table, from_col) \
+                    and tmdl.split_ref(node.prop("toColumn", "")) == (to_table, to_col):
+                doc.remove(node)
+                self._edit(path)
+                return
+        raise ModelError("Relationship not found.")
+
+    # --- Roles ---
+
+    def create_role(self, name, filters=None):
+        filters = filters or {}
+        self._check_role(name, filters)
+        doc = tmdl.parse("")
+        lines = [f"role {tmdl.quote_name(name)}", f"{doc.unit}modelPermission: read"]
+        for table, expression in filters.items():
+            lines += [""] + doc.value_lines(f"tablePermission {tmdl.quote_name(table)}", expression, 1)
+        doc.replace(0, 0, lines)
+        path = os.path.join(self.path, "roles", _safe_file_name(name) + ".tmdl")
+        if path in self.docs: raise ModelError(f"File '{path}' is used by another role.")
+        self.docs[path] = doc
+        self._edit(path)
+        self._add_ref("role", name)
+
+    # --- Persistence ---
+
+    def save(self):
+        """Writes dirty files and removes deleted ones in one StagedFiles commit (all or nothing)."""
+        paths = sorted(self.dirty | self.deleted)
+        self._check_unchanged(paths)
+        tx = StagedFiles()
+        for path in sorted(self.dirty): tx.write_text(path, self.docs[path].text(), self.sigs.get(path))
+        for path in sorted(self.deleted): tx.remove_file(path, self.sigs.get(path))
+        tx.commit()
+        for path in paths:
+            sig = file_sig(path)
+            if sig: self.sigs[path] = sig
+            else: self.sigs.pop(path, None)
+        self.dirty, self.deleted = set(), set()
+        self.changed()
+
+def _locate(doc: tmdl.Document, chain: List[Tuple[str, str]]) -> tmdl.Node:
+    nodes, node = doc.roots, None
+    for keyword, name in chain:
+        node = next(n for n in nodes if n.keyword == keyword and n.name == name)
+        nodes = node.children
+    return node
+
+def _expr(value) -> str:
+    """model.bim stores multi-line expressions as arrays of lines."""
+    return "\n".join(value) if isinstance(value, list) else (value or "")
+
+def _bim_expr(text: str):
+    lines = (text or "").split("\n")
+    return lines if len(lines) > 1 else text
+
+class BimModel(OfflineModel):
+    """A model.bim (TMSL JSON) file. Edits go to the JSON document; save() writes only changed spans."""
+    fmt = "bim"
+
+    def load(self):
+        self.sigs: Dict[str, Tuple[int, int]] = {self.path: file_sig(self.path)}
+        self.data = load_json(self.path)
+        if not isinstance(self.data, dict): raise ModelError(f"Could not read '{self.path}'.")
+        self.model = self.data.setdefault("model", {})
+        self.changed()
+
+    def build_meta(self) -> ModelMeta:
+        d = self.data
+        meta = ModelMeta(d.get("name") or _model_name(self.path), d.get("compatibilityLevel"), "", _mtime([self.path]), None)
+        for t in self.model.get("tables", []):
+            table = meta.tables[t["name"]] = Table(t["name"], _expr(t.get("description")), bool(t.get("isHidden")))
+            for c in t.get("columns", []):
+                if c.get("type") == "rowNumber": continue
+                calculated = c.get("type") in ("calculated", "calculatedTableColumn") and "expression" in c
+                table.columns[c["name"]] = Column(t["name"], c["name"], _enum(c.get("dataType", ""), _TYPE_NAMES), bool(c.get("isHidden")),
+                                                  _expr(c.get("description")), _expr(c.get("expression")) if calculated else None,
+                                                  "Calculated" if calculated else "Data", c.get("sortByColumn", ""))
+            for m in t.get("measures", []):
+                table.measures[m["name"]] = Measure(t["name"], m["name"], _expr(m.get("expression")), _expr(m.get("description")), bool(m.get("isHidden")))
+            for p in t.get("partitions", []):
+                src = p.get("source", {})
+                table.partitions.append(Partition(t["name"], p["name"], _enum(p.get("mode", "import"), {}), _enum(src.get("type"), _SOURCE_TYPES), _expr(src.get("expression"))))
+        for r in self.model.get("relationships", []):
+            meta.relationships.append(Relationship(r.get("name", ""), r["fromTable"], r["fromColumn"], r["toTable"], r["toColumn"],
+                                                   r.get("isActive", True), _enum(r.get("crossFilteringBehavior", "oneDirection"), {})))
+        for role in self.model.get("roles", []):
+            meta.roles.append(Role(role["name"], _enum(role.get("modelPermission", "read"), {}),
+                                   {tp["name"]: _expr(tp.get("filterExpression")) for tp in role.get("tablePermissions", [])}))
+        return meta
+
+    def _table(self, name: str) -> Dict:
+        t = next((t for t in self.model.get("tables", []) if t["name"] == name), None)
+        if not t: raise ModelError(f"Table '{name}' not found.")
+        return t
+
+    def _measure(self, table: str, name: str) -> Tuple[Dict, Dict]:
+        t = self._table(table)
+        m = next((m for m in t.get("measures", []) if m["name"] == name), None)
+        if not m: raise ModelError("Measure not found.")
+        return t, m
+
+    def _column(self, table: str, name: str) -> Tuple[Dict, Dict]:
+        t = self._table(table)
+        c = next((c for c in t.get("columns", []) if c["name"] == name), None)
+        if not c: raise ModelError(f"Column '{name}' not found.")
+        return t, c
+
+    def create_measure(self, table, name, expression, description=None):
+        t = self._table(table)
+        if any(m["name"] == name for m in t.get("measures", [])): raise ModelError("Measure exists.")
+        m = {"name": name, "expression": _bim_expr(expression or ""), "lineageTag": str(uuid.uuid4())}
+        if description: m["description"] = description
+        t.setdefault("measures", []).append(m)
+        self.changed()
+
+    def update_measure(self, table, name, expression=None, description=None):
+        _, m = self._measure(table, name)
+        if expression: m["expression"] = _bim_expr(expression)
+        if description: m["description"] = description
+        self.changed()
+
+    def delete_measure(self, table, name):
+        t, m = self._measure(table, name)
+        t["measures"].remove(m)
+        self.changed()
+
+    def update_column(self, table, name, new_name=None, is_hidden=None, data_type=None, description=None):
+        _, c = self._column(table, name)
+        if new_name and new_name != name:
+            c["name"] = new_name
+            self._rename_refs(table, name, new_name)
+        if is_hidden is not None:
+            if is_hidden: c["isHidden"] = True
+            else: c.pop("isHidden", None)
+        if description: c["description"] = description
+        if data_type and data_type.lower() in DATA_TYPES: c["dataType"] = _FILE_TYPES[DATA_TYPES[data_type.lower()]]
+        self.changed()
+
+    def _rename_refs(self, table: str, old: str, new: str):
+        """Relationships, DAX expressions, RLS filters, sort-by columns and hierarchy levels name columns."""
+        for r in self.model.get("relationships", []):
+            for side in ("from", "to"):
+                if r.get(f"{side}Table") == table and r.get(f"{side}Column") == old: r[f"{side}Column"] = new
+        bare = self._bare_home(table, old)
+        def fix(obj: Dict, key: str, home: Optional[str]):
+            cur = _expr(obj.get(key))
+            text = rename_column_refs(cur, table, old, new, home if home == bare else None)
+            if text != cur: obj[key] = _bim_expr(text)
+        for t in self.model.get("tables", []):
+            home = t["name"]
+            for m in t.get("measures", []): fix(m, "expression", home)
+            for c in t.get("columns", []):
+                if "expression" in c: fix(c, "expression", home)
+                if home == table and c.get("sortByColumn") == old: c["sortByColumn"] = new
+            for h in t.get("hierarchies", []):
+                for lvl in h.get("levels", []):
+                    if home == table and lvl.get("column") == old: lvl["column"] = new
+            for p in t.get("partitions", []):
+                if p.get("source", {}).get("type") == "calculated": fix(p["source"], "expression", None)
+            for item in (t.get("calculationGroup") or {}).get("calculationItems", []): fix(item, "expression", home)
+        for role in self.model.get("roles", []):
+            for tp in role.get("tablePermissions", []):
+                if "filterExpression" in tp: fix(tp, "filterExpression", tp["name"])
+
+    def delete_column(self, table, name):
+        t, c = self._column(table, name)
+        if self._relationships_using(table, name): raise ModelError(f"Column '{name}' is used by a relationship.")
+        t["columns"].remove(c)
+        self.changed()
+
+    def upsert_table(self, name, create, type="Global", source_expression=None):
+        calculated = type == "Calculated"
+        if not calculated and type not in ("Global", "M"): raise ModelError(f"Unknown table type '{type}'.")
+        tables = self.model.setdefault("tables", [])
+        t = next((t for t in tables if t["name"] == name), None)
+        if create:
+            if t: raise ModelError("Table exists.")
+            t = {"name": name, "lineageTag": str(uuid.uuid4()), "partitions": []}
+            tables.append(t)
+        elif not t: raise ModelError("Table not found.")
+        parts = t.setdefault("partitions", [])
+        if not parts: parts.append({"name": name, "mode": "import", "source": {}})
+        src = parts[0].setdefault("source", {})
+        expression = source_expression or _expr(src.get("expression")) or ("" if calculated else _DEFAULT_M)
+        parts[0]["source"] = {"type": "calculated" if calculated else "m", "expression": _bim_expr(expression)}
+        self.changed()
+
+    def delete_table(self, name):
+        t = self._table(name)
+        for r in self._relationships_using(name):
+            self.delete_relationship(r.from_table, r.from_column, r.to_table, r.to_column)
+        self.model["tables"].remove(t)
+        self.changed()
+
+    def create_relationship(self, from_table, from_col, to_table, to_col, active=True):
+        self._check_column(from_table, from_col)
+        self._check_column(to_table, to_col)
+        r = {"name": str(uuid.uuid4()), "fromTable": from_table, "fromColumn": from_col, "toTable": to_table, "toColumn": to_col}
+        if not active: r["isActive"] = False
+        self.model.setdefault("relationships", []).append(r)
+        self.changed()
+
+    def delete_relationship(self, from_table, from_col, to_table, to_col):
+        rels = self.model.get("relationships", [])
+        r = next((r for r in rels if (r["fromTable"], r["fromColumn"], r["toTable"], r["toColumn"]) == (from_table, from_col, to_table, to_col)), None)
+        if not r: raise ModelError("Relationship not found.")
+        rels.remove(r)
+        self.changed()
+
+    def create_role(self, name, filters=None):
+        filters = filters or {}
+        self._check_role(name, filters)
+        role = {"name": name, "modelPermission": "read"}
+        if filters: role["tablePermissions"] = [{"name": t, "filterExpression": _bim_expr(e)} for t, e in filters.items()]
+        self.model.setdefault("roles", []).append(role)
+        self.changed()
+
+    def save(self):
+        self._check_unchanged([self.path])
+        tx = StagedFiles()
+        tx.write_json(self.path, self.data, self.sigs[self.path])
+        tx.commit()
+        self.sigs[self.path] = file_sig(self.path)
+        self.changed()
+
+def open_model(path: str) -> OfflineModel:
+    kind, resolved = resolve_model_path(path)
+    return TmdlModel(resolved) if kind == "tmdl" else BimModel(resolved)
@@ -0,0 +1,203 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set, Tuple
+
+from .model_meta import ModelMeta
+
+# Ranked search over model metadata. Names are tokenized (words, camelCase
+# parts, digits) and indexed with trigrams for typo tolerance; expressions and
+# descriptions get a trigram index that narrows substring matches. The index
+# is kept across calls and only re-indexes objects whose text changed.
+
+TYPES = {"table": "Table", "tables": "Table", "column": "Column", "columns": "Column", "measure": "Measure", "measures": "Measure"}
+_TYPE_ORDER = {"Measure": 0, "Column": 1, "Table": 2}
+_SPLIT = re.compile(r"[\W_]+")
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])|(?<=[^\W\d])(?=\d)|(?<=\d)(?=[^\W\d])")
+FUZZY_MIN = 0.5 # token trigram similarity for a typo match
+_REF = re.compile(r"^\s*'?([^'\[]+?)'?\s*\[([^\]]+)\]\s*$") # 'Table'[Column] / Table[Measure]
+
+def fold(text: str) -> str:
+    """Lowercase without accents ('Líquida' -> 'liquida')."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def tokenize(text: str) -> List[str]:
+    """'Total Sales YTD' / 'totalSalesYTD' / 'sales_2024' -> lowercase word tokens."""
+    out = []
+    for part in _SPLIT.split(text or ""):
+        for tok in _CAMEL.split(part):
+            if tok: out.append(fold(tok))
+    return out
+
+def grams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def token_grams(token: str) -> Set[str]:
+    return grams(f" {token} ")
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Dice coefficient of two trigram sets."""
+    if not a or not b: return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+class _Doc:
+    __slots__ = ("key", "type", "table", "name", "norm", "tokens", "token_grams", "table_tokens", "text", "sig")
+    def __init__(self, key, type_: str, table: Optional[str], name: str, text: str, sig):
+        self.key, self.type, self.table, self.name, self.sig = key, type_, table, name, sig
+        self.norm = fold(name)
+        self.tokens = tokenize(name)
+        self.token_grams = [token_grams(t) for t in self.tokens]
+        self.table_tokens = tokenize(table) if table else []
+        self.text = fold(text)
+
+def _docs_of(meta: ModelMeta) -> Dict[Tuple, Tuple]:
+    """key -> (type, table, name, searchable text) for every table, column and measure."""
+    out = {}
+    for t in meta.tables.values():
+        out[("Table", None, t.name)] = ("Table", None, t.name, t.description or "")
+        for c in t.columns.values():
+            out[("Column", t.name, c.name)] = ("Column", t.name, c.name, "\n".join(filter(None, (c.expression, c.description))))
+        for m in t.measures.values():
+            out[("Measure", t.name, m.name)] = ("Measure", t.name, m.name, "\n".join(filter(None, (m.expression, m.description))))
+    return out
+
+class SearchIndex:
+    """Inverted index over names (tokens + trigrams) and expression/description text (trigrams)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = None
+        self._docs: Dict[Tuple, _Doc] = {}
+        self._tokens: Dict[str, Set[Tuple]] = {}
+        self._name_grams: Dict[str, Set[Tuple]] = {}
+        self._text_grams: Dict[str, Set[Tuple]] = {}
+        self._vocab: Optional[List[str]] = None # sorted tokens, for prefix lookups
+        self.stats = {"documents": 0, "indexed": 0, "removed": 0, "syncs": 0}
+
+    # --- Maintenance ---
+
+    def _post(self, index: Dict[str, Set], keys, key, add: bool):
+        for k in keys:
+            if add: index.setdefault(k, set()).add(key)
+            else:
+                s = index.get(k)
+                if s is None: continue
+                s.discard(key)
+                if not s: del index[k]
+
+    def _index(self, doc: _Doc, add: bool):
+        self._post(self._tokens, doc.tokens, doc.key, add)
+        self._post(self._name_grams, set().union(*doc.token_grams) if doc.token_grams else (), doc.key, add)
+        self._post(self._text_grams, grams(doc.text), doc.key, add)
+        self._vocab = None
+
+    def sync(self, meta: ModelMeta):
+        """Brings the index in line with meta, re-indexing only added/changed/removed objects."""
+        with self._lock:
+            if meta is self._meta: return
+            current = _docs_of(meta)
+            for key in [k for k in self._docs if k not in current]:
+                self._index(self._docs.pop(key), False)
+                self.stats["removed"] += 1
+            for key, (type_, table, name, text) in current.items():
+                old = self._docs.get(key)
+                if old is not None and old.sig == text: continue
+                if old is not None: self._index(old, False)
+                doc = self._docs[key] = _Doc(key, type_, table, name, text, text)
+                self._index(doc, True)
+                self.stats["indexed"] += 1
+            self._meta = meta
+            self.stats["documents"] = len(self._docs)
+            self.stats["syncs"] += 1
+
+    # --- Query ---
+
+    def _prefixed(self, token: str) -> List[str]:
+        if self._vocab is None: self._vocab = sorted(self._tokens)
+        vocab, out = self._vocab, []
+        i = bisect_left(vocab, token)
+        while i < len(vocab) and vocab[i].startswith(token):
+            out.append(vocab[i]); i += 1
+        return out
+
+    def _token_hits(self, tok: str) -> Tuple[Set[Tuple], Set[Tuple], Set[Tuple]]:
+        """(exact, prefix, near) doc keys for one query token; near = enough shared name trigrams for a typo match."""
+        exact = self._tokens.get(tok, set())
+        prefix: Set[Tuple] = set()
+        for t in self._prefixed(tok):
+            if t != tok: prefix |= self._tokens[t]
+        tg = token_grams(tok)
+        need = max(1, int(len(tg) * FUZZY_MIN / 2 + 0.5))
+        counts: Dict[Tuple, int] = {}
+        for g in tg:
+            for key in self._name_grams.get(g, ()): counts[key] = counts.get(key, 0) + 1
+        near = {k for k, n in counts.items() if n >= need}
+        return exact, prefix, near
+
+    def _text_hits(self, q: str) -> Set[Tuple]:
+        if len(q) < 3: return {k for k, d in self._docs.items() if q in d.text}
+        # Objects whose text holds every trigram of the query (verified by substring in scoring)
+        postings = sorted((self._text_grams.get(g, set()) for g in grams(q)), key=len)
+        hits = set(postings[0]) if postings else set()
+        for p in postings[1:]:
+            hits &= p
+            if not hits: break
+        return {k for k in hits if q in self._docs[k].text}
+
+    @staticmethod
+    def _score(doc: _Doc, q: str, token_hits: List[Tuple], q_grams: List[Set[str]], text_hit: bool) -> Tuple[float, str]:
+        if doc.norm == q: return 100.0, "name"
+        if doc.norm.startswith(q): return 80.0 + 10.0 * len(q) / len(doc.norm), "name"
+        if q in doc.norm: return 60.0 + 10.0 * len(q) / len(doc.norm), "name"
+        score, match = 0.0, ""
+        if token_hits:
+            total = 0.0
+            for (tok, (exact, prefix, near)), tg in zip(token_hits, q_grams):
+                if doc.key in exact: total += 1.0
+                elif doc.key in prefix: total += 0.8
+                elif tok in doc.table_tokens: total += 0.7
+                elif doc.key in near:
+                    best = max(similarity(tg, dg) for dg in doc.token_grams)
+                    if best >= FUZZY_MIN: total += 0.8 * best
+            frac = total / len(token_hits)
+            if frac > 0:
+                score, match = 50.0 * frac, "name" if frac >= 0.8 else "fuzzy"
+        if text_hit:
+            score, match = (score + 5.0, match) if score else (25.0, "text")
+        return score, match
+
+    def search(self, query: str, object_type: str = None, table: str = None,
+               offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict]]:
+        """Returns (total matches, one page of ranked rows)."""
+        type_ = TYPES.get((object_type or "").lower()) if object_type else None
+        if object_type and not type_: raise ValueError(f"Unknown object_type '{object_type}' (table, column or measure).")
+        ref = _REF.match(query or "")
+        if ref and not table: table, query = ref.group(1), ref.group(2)
+        table = fold(table) if table else None
+        q = fold(query).strip()
+        q_tokens = tokenize(query)
+        q_grams = [token_grams(t) for t in q_tokens]
+        with self._lock:
+            if q:
+                token_hits = [(tok, self._token_hits(tok)) for tok in q_tokens]
+                text = self._text_hits(q)
+                keys = set(text)
+                for _, (exact, prefix, near) in token_hits: keys |= exact | prefix | near
+            else: keys = set(self._docs)
+            scored = []
+            for key in keys:
+                doc = self._docs[key]
+                if type_ and doc.type != type_: continue
+                if table and fold(doc.table if doc.table is not None else doc.name) != table: continue
+                score, match = self._score(doc, q, token_hits, q_grams, key in text) if q else (0.0, "")
+                if q and score <= 0: continue
+                scored.append((score, match, doc))
+        scored.sort(key=lambda s: (-s[0], len(s[2].name), _TYPE_ORDER[s[2].type], s[2].table or "", s[2].name))
+        rows = []
+        for score, match, doc in scored[offset:offset + limit]:
+            row = {"Type": doc.type, "Name": doc.name}
+            if doc.table is not None: row["Table"] = doc.table
+            if q: row.update(Score=round(score, 1), Match=match)
+            rows.append(row)
+        return len(scored), rows
@@ -0,0 +1,118 @@
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from .model_deps import DependencyGraph, references
+from .model_meta import ModelMeta
+from .scan import loads, visual_files
+
+# Cross-layer column usage: which model columns are referenced by the report
+# (visuals, visual/page/report filters) or by the model itself (DAX,
+# relationships, RLS, sort-by), and how much VertiPaq memory the unreferenced
+# ones hold.
+
+MB = 1024 * 1024
+
+def _walk_fields(obj, out: Dict[Tuple[str, str], int]):
+    """Collects (entity, property) of every field reference in a PBIR document (hierarchy levels count as their level name)."""
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            prop = node.get("Property") or node.get("Level")
+            expr = node.get("Expression")
+            if isinstance(prop, str) and isinstance(expr, dict):
+                src = expr.get("SourceRef")
+                if src is None and isinstance(expr.get("Hierarchy"), dict):
+                    src = (expr["Hierarchy"].get("Expression") or {}).get("SourceRef")
+                entity = src.get("Entity") if isinstance(src, dict) else None
+                if entity:
+                    key = (entity, prop)
+                    out[key] = out.get(key, 0) + 1
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+def report_fields(report_path: str, stats: Dict = None) -> Dict[Tuple[str, str], int]:
+    """
+    One pass over the report: every visual.json (visual and its filters), page.json and report.json.
+    Returns (entity, property) -> number of references.
+    """
+    out: Dict[Tuple[str, str], int] = {}
+    definition = os.path.join(report_path, "definition")
+    files = [os.path.join(definition, "report.json")]
+    pages_dir = os.path.join(definition, "pages")
+    try: files += [os.path.join(e.path, "page.json") for e in os.scandir(pages_dir) if e.is_dir()]
+    except OSError: pass
+    files += [path for _, _, path in visual_files(report_path)]
+    for path in files:
+        try:
+            with open(path, "rb") as f: raw = f.read()
+            data = loads(raw)
+        except (OSError, ValueError): continue
+        if stats is not None:
+            stats["files"] = stats.get("files", 0) + 1
+            stats["bytes_parsed"] = stats.get("bytes_parsed", 0) + len(raw)
+        _walk_fields(data, out)
+    return out
+
+def model_references(meta: ModelMeta, graph: DependencyGraph) -> Dict[Tuple[str, str], List[str]]:
+    """(table, column) -> why the model itself needs the column (DAX, relationships, RLS, sort-by)."""
+    out: Dict[Tuple[str, str], List[str]] = {}
+    def add(table: str, column: str, why: str):
+        out.setdefault((table, column), []).append(why)
+    for t in meta.tables.values():
+        for c in t.columns.values():
+            if c.sort_by: add(t.name, c.sort_by, f"sort by of '{t.name}'[{c.name}]")
+            if c.expression: _expression_refs(graph, ("Column", t.name, c.name), add, f"calculated column '{t.name}'[{c.name}]")
+        for m in t.measures.values():
+            _expression_refs(graph, ("Measure", t.name, m.name), add, f"measure [{m.name}]")
+        if any(p.source_type == "Calculated" for p in t.partitions):
+            _expression_refs(graph, ("Table", None, t.name), add, f"calculated table '{t.name}'")
+    for r in meta.relationships:
+        add(r.from_table, r.from_column, f"relationship {r.from_table}[{r.from_column}] -> {r.to_table}[{r.to_column}]")
+        add(r.to_table, r.to_column, f"relationship {r.from_table}[{r.from_column}] -> {r.to_table}[{r.to_column}]")
+    columns = {(t.lower(), c.lower()): (t, c) for t, tb in meta.tables.items() for c in tb.columns}
+    for role in meta.roles:
+        for table, expression in role.filters.items():
+            for ref in references(expression):
+                if ref[0] == "col": key = (ref[1].lower(), ref[2].lower())
+                elif ref[0] == "bare": key = (table.lower(), ref[1].lower())
+                else: continue
+                if key in columns: add(*columns[key], f"RLS role '{role.name}'")
+    return out
+
+def _expression_refs(graph: DependencyGraph, node, add, why: str):
+    for d in graph.dependencies(node, transitive=False):
+        if d["Type"] == "Column": add(d["Table"], d["Name"], why)
+
+def unused_columns(meta: ModelMeta, graph: DependencyGraph, fields: Dict[Tuple[str, str], int],
+                   storage: Optional[Dict] = None, top: Optional[int] = 50) -> Dict:
+    """
+    Columns referenced neither by the report nor by the model, ranked by dictionary + data size
+    (storage: a vertipaq.analyze() report; without it the columns are listed unranked).
+    """
+    used_report: Set[Tuple[str, str]] = {(e.lower(), p.lower()) for e, p in fields}
+    needed = {(t.lower(), c.lower()) for t, c in model_references(meta, graph)}
+    sizes = {(c["table"].lower(), c["column"].lower()): c for c in (storage or {}).get("columns", [])}
+    rows, total_columns = [], 0
+    for t in meta.tables.values():
+        for c in t.columns.values():
+            total_columns += 1
+            key = (t.name.lower(), c.name.lower())
+            if key in used_report or key in needed: continue
+            row = {"Table": t.name, "Column": c.name, "Kind": c.kind, "Hidden": c.is_hidden}
+            s = sizes.get(key)
+            if s is not None:
+                row.update(Dictionary=s["dictionary"], Data=s["data"], Hierarchy=s["hierarchy"],
+                           Size=s["dictionary"] + s["data"], Cardinality=s["cardinality"], PctModel=s["pct_model"])
+            rows.append(row)
+    rows.sort(key=lambda r: (-r.get("Size", 0), r["Table"], r["Column"]))
+    res = {"columns": total_columns, "report_fields": len(used_report), "unused": len(rows)}
+    if storage is not None:
+        # Dropping a column frees its attribute hierarchy as well
+        reclaim = sum(r.get("Size", 0) + r.get("Hierarchy", 0) for r in rows)
+        model_total = storage["model"]["total"]
+        res.update(reclaimable_mb=round(reclaim / MB, 2), model_mb=round(model_total / MB, 2),
+                   reclaimable_pct=round(100.0 * reclaim / model_total, 2) if model_total else 0.0)
+    res["results"] = rows[:top]
+    return res
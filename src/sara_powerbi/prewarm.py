@@ -0,0 +1,141 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .connection import SESSIONS, adomd_session
+from .executors import LOCKS, cancellable, check, parallel
+from .report_index import get_index, load_json
+
+# Cache pre-warming: each visual's query.queryState projections become a
+# SUMMARIZECOLUMNS query (group-by columns + measures/aggregations), and the
+# queries of a page or report run concurrently on the pooled ADOMD
+# connections. Report/page/visual filters are not applied, so the queries
+# warm the storage engine cache for each visual's columns and measures.
+
+# Rows Power BI reads for a default visual (data reduction window)
+ROW_LIMIT = 1001
+# QueryAggregateFunction codes used in PBIR Aggregation projections
+AGGREGATIONS = {0: "SUM", 1: "AVERAGE", 2: "DISTINCTCOUNT", 3: "MIN", 4: "MAX", 5: "COUNTA", 6: "MEDIAN", 7: "STDEV.P", 8: "VAR.P"}
+
+def _quote_table(name: str) -> str:
+    return "'" + name.replace("'", "''") + "'"
+
+def _ref(table: str, name: str) -> str:
+    return f"{_quote_table(table)}[{name.replace(']', ']]')}]"
+
+def _entity(expr) -> Optional[str]:
+    src = expr.get("SourceRef") if isinstance(expr, dict) else None
+    return src.get("Entity") if isinstance(src, dict) else None
+
+def field_dax(field: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """PBIR projection field -> ("column", 'T'[C]) / ("value", measure or aggregation expression) / (None, reason)."""
+    if "Column" in field:
+        f = field["Column"]
+        table = _entity(f.get("Expression"))
+        return ("column", _ref(table, f["Property"])) if table else (None, "column without entity")
+    if "Measure" in field:
+        f = field["Measure"]
+        table = _entity(f.get("Expression"))
+        return ("value", _ref(table, f["Property"])) if table else ("value", f"[{f['Property']}]")
+    if "Aggregation" in field:
+        agg = field["Aggregation"]
+        fn = AGGREGATIONS.get(agg.get("Function"))
+        kind, inner = field_dax(agg.get("Expression", {}))
+        if fn is None: return None, f"aggregation function {agg.get('Function')}"
+        if kind != "column": return None, inner or "aggregation over a non-column"
+        return "value", f"{fn}({inner})"
+    if "HierarchyLevel" in field:
+        lvl = field["HierarchyLevel"]
+        hier = lvl.get("Expression", {}).get("Hierarchy", {})
+        table = _entity(hier.get("Expression"))
+        # A level of a user hierarchy is usually named after its column
+        return ("column", _ref(table, lvl["Level"])) if table and lvl.get("Level") else (None, "hierarchy level without entity")
+    return None, f"unsupported field {next(iter(field), '?')}"
+
+def visual_query(data: Dict) -> Tuple[Optional[str], str]:
+    """visual.json -> (SUMMARIZECOLUMNS query, "") or (None, reason it was skipped)."""
+    state = (((data or {}).get("visual") or {}).get("query") or {}).get("queryState")
+    if not isinstance(state, dict) or not state: return None, "no query"
+    columns, values, labels = [], [], set()
+    for role in state.values():
+        for proj in (role or {}).get("projections", []):
+            kind, dax = field_dax(proj.get("field", {}))
+            if kind is None: return None, dax
+            if kind == "column":
+                if dax not in columns: columns.append(dax)
+                continue
+            label = proj.get("nativeQueryRef") or proj.get("queryRef") or f"Value{len(values) + 1}"
+            while label in labels: label += "_"
+            labels.add(label)
+            values.append(f"\"{label.replace(chr(34), chr(34) * 2)}\", {dax}")
+    if not columns and not values: return None, "no fields"
+    body = "SUMMARIZECOLUMNS(" + ", ".join(columns + values) + ")"
+    if columns: body = f"TOPN({ROW_LIMIT}, {body})"
+    return "EVALUATE " + body, ""
+
+def report_queries(report_path: str, page_name: str = None) -> Tuple[List[Dict], List[Dict]]:
+    """(queries, skipped) for the visuals of one page (display name) or the whole report, in page order."""
+    index = get_index(report_path)
+    if page_name:
+        page = index.find_page(page_name)
+        if page is None: raise ValueError(f"Page '{page_name}' not found.")
+        pages = [page]
+    else: pages = index.pages()
+    queries, skipped = [], []
+    for page in pages:
+        for vis in index.visuals(page["id"]):
+            info = {"page": page["name"], "visual": vis["id"], "title": vis["title"] or "", "type": vis["type"]}
+            query, reason = visual_query(load_json(vis["path"]) or {})
+            if query: queries.append(dict(info, query=query))
+            elif reason != "no query": skipped.append(dict(info, reason=reason))
+    return queries, skipped
+
+def execute_count(query: str, timeout: float = None) -> int:
+    """Runs query on a pooled connection and reads the whole result, counting rows."""
+    with adomd_session(timeout) as conn:
+        cmd = conn.CreateCommand()
+        cmd.CommandText = query
+        with cancellable(cmd.Cancel):
+            reader = cmd.ExecuteReader()
+            rows = 0
+            try:
+                while reader.Read():
+                    rows += 1
+                    if not rows & 1023: check()
+            finally: reader.Close()
+    return rows
+
+def prewarm(report_path: str, page_name: str = None, parallelism: int = None, passes: int = 1, dry_run: bool = False) -> Dict:
+    """
+    Runs every visual query of a page/report `passes` times (pass 1 is the cold run), at most
+    `parallelism` at once (capped by the ADOMD pool size). Returns per-visual rows and times.
+    """
+    # Runs on the model pool: hold off PBIR writers while the visuals are read (not while the queries run)
+    with LOCKS["file"].read(): queries, skipped = report_queries(report_path, page_name)
+    res = {"visuals": len(queries) + len(skipped), "queries": len(queries), "skipped": skipped}
+    if dry_run:
+        res["results"] = queries
+        return res
+    workers = max(1, min(int(parallelism or SESSIONS.pool_size), SESSIONS.pool_size))
+    passes = max(1, int(passes or 1))
+    results = [dict(q, ms=[]) for q in queries]
+    pass_seconds = []
+    for _ in range(passes):
+        start = time.perf_counter()
+        for i, rows, error, seconds in parallel(lambda q: execute_count(q["query"]), queries, workers):
+            r = results[i]
+            r["ms"].append(round(seconds * 1000, 1))
+            if error is not None: r["error"] = str(error)
+            else: r["rows"] = rows
+        pass_seconds.append(round(time.perf_counter() - start, 3))
+    pages: Dict[str, Dict] = {}
+    for r in results:
+        if "error" not in r: r.pop("query")
+        p = pages.setdefault(r["page"], {"page": r["page"], "visuals": 0, "cold_ms": 0.0, "slowest_ms": 0.0})
+        p["visuals"] += 1
+        if r["ms"]:
+            p["cold_ms"] = round(p["cold_ms"] + r["ms"][0], 1)
+            p["slowest_ms"] = max(p["slowest_ms"], r["ms"][0])
+    results.sort(key=lambda r: -(r["ms"][0] if r["ms"] else 0))
+    res.update(parallelism=workers, pass_seconds=pass_seconds, errors=sum("error" in r for r in results),
+               query_seconds=round(sum(r["ms"][0] for r in results if r["ms"]) / 1000, 3), pages=list(pages.values()), results=results)
+    return res
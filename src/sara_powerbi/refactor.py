@@ -0,0 +1,230 @@
+import os
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
+
+from .report_index import get_index, file_sig, node_at, write_json_atomic
+from .json_splice import render_minimal
+
+# Worker threads used to load/transform and stage visual.json files
+MAX_WORKERS = 8
+
+def parse_renames(renames) -> List[Dict]:
+    """
+    Normalizes rename specs. Accepts a JSON string or a list of dicts:
+    {"table": "Sales", "old": "Rev", "new": "Revenue", "kind": "Measure"}  (kind optional: Measure/Column)
+    """
+    if isinstance(renames, str): renames = json.loads(renames)
+    if isinstance(renames, dict): renames = [renames]
+    specs = []
+    for r in renames:
+        table, old, new = r.get("table"), r.get("old"), r.get("new")
+        if not table or not old or not new:
+            raise ValueError(f"Rename needs 'table', 'old' and 'new': {r}")
+        specs.append({"table": table, "old": old, "new": new, "kind": r.get("kind")})
+    return specs
+
+def _transform(task: Dict) -> Dict:
+    """Loads one visual.json and applies its renames in memory. Runs on the worker pool."""
+    res = {"path": task["path"], "page_id": task["page_id"], "visual_id": task["visual_id"], "replacements": 0}
+    try:
+        sig = file_sig(task["path"])
+        with open(task["path"], 'r', encoding='utf-8-sig') as f: original = f.read()
+        data = json.loads(original)
+        for json_path, spec in task["edits"]:
+            obj = node_at(data, json_path)
+            if not isinstance(obj, dict) or obj.get("Property") != spec["old"]: continue
+            source = obj.get("Expression", {}).get("SourceRef", {})
+            if source.get("Entity") != spec["table"]: continue
+            obj["Property"] = spec["new"]
+            res["replacements"] += 1
+        # Only the renamed spans are rewritten; unchanged documents are not staged at all
+        text = render_minimal(original, data) if res["replacements"] else None
+        res["status"] = "staged" if text is not None else "unchanged"
+        res["sig"] = sig; res["original"] = original; res["data"] = data
+        if text is not None: res["text"] = text
+    except Exception as e:
+        res["status"] = "error"; res["error"] = str(e)
+    return res
+
+def _read(path: str):
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f: return f.read()
+    except (OSError, UnicodeDecodeError): return None
+
+def _stage(res: Dict) -> Dict:
+    """Writes the new content next to the target as a temp file (commit is a rename)."""
+    if file_sig(res["path"]) != res["sig"]:
+        raise RuntimeError(f"'{res['path']}' changed on disk since it was read")
+    tmp = f"{res['path']}.sara-{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f: f.write(res["text"])
+    res["tmp"] = tmp
+    return res
+
+def _discard(staged: List[Dict]):
+    for res in staged:
+        tmp = res.pop("tmp", None)
+        if tmp:
+            try: os.remove(tmp)
+            except OSError: pass
+
+class StagedFiles:
+    """
+    Several file writes and file/folder removals committed together: contents are staged
+    as temp files next to their targets, commit() replaces them with os.replace and
+    moves removed files and folders aside; a failure part-way restores what was already done.
+    """
+    def __init__(self):
+        self.files: List[Dict] = []
+        self.deletes: List[Dict] = []
+        self.removals: List[str] = []
+
+    def write_json(self, path: str, data, sig=False) -> bool:
+        """Stages data for path (only changed spans; new files in full). sig: file_sig when it was read. False when unchanged."""
+        original = _read(path)
+        text = json.dumps(data, indent=2) if original is None else render_minimal(original, data)
+        if text is None: return False
+        self.files.append({"path": path, "sig": file_sig(path) if sig is False else sig, "original": original, "text": text})
+        return True
+
+    def write_text(self, path: str, text: str, sig=False) -> bool:
+        """Stages text for path. sig as for write_json. False when unchanged."""
+        original = _read(path)
+        if text == original: return False
+        self.files.append({"path": path, "sig": file_sig(path) if sig is False else sig, "original": original, "text": text})
+        return True
+
+    def remove_file(self, path: str, sig=False):
+        """Removes path on commit (missing files are skipped); sig as for write_json."""
+        self.deletes.append({"path": path, "sig": file_sig(path) if sig is False else sig})
+
+    def remove_dir(self, path: str):
+        self.removals.append(path)
+
+    def commit(self):
+        created = self._make_dirs()
+        try:
+            for d in self.deletes:
+                if file_sig(d["path"]) != d["sig"]: raise RuntimeError(f"'{d['path']}' changed on disk since it was read")
+            for f in self.files: _stage(f)
+        except Exception:
+            _discard(self.files)
+            _remove_dirs(created)
+            raise
+        done, moved = [], []
+        try:
+            for f in self.files:
+                os.replace(f["tmp"], f["path"])
+                del f["tmp"]
+                done.append(f)
+            for path in [d["path"] for d in self.deletes if os.path.isfile(d["path"])] + [p for p in self.removals if os.path.isdir(p)]:
+                aside = f"{path}.sara-{os.getpid()}.removed"
+                os.replace(path, aside)
+                moved.append((path, aside))
+        except Exception as e:
+            # Roll back in reverse order, then drop the remaining temp files
+            for path, aside in reversed(moved):
+                try: os.replace(aside, path)
+                except OSError: pass
+            for f in reversed(done):
+                try:
+                    if f["original"] is None: os.remove(f["path"])
+                    else: write_json_atomic(f["path"], None, text=f["original"])
+                except OSError: pass
+            _discard(self.files)
+            _remove_dirs(created)
+            raise RuntimeError(f"Commit failed (nothing was changed): {e}") from e
+        for _, aside in moved:
+            if os.path.isdir(aside): shutil.rmtree(aside, ignore_errors=True)
+            else:
+                try: os.remove(aside)
+                except OSError: pass
+
+    def _make_dirs(self) -> List[str]:
+        """Creates missing parent folders; returns them deepest first (for rollback)."""
+        created: List[str] = []
+        for f in self.files:
+            d, missing = os.path.dirname(f["path"]), []
+            while d and not os.path.isdir(d):
+                missing.append(d)
+                d = os.path.dirname(d)
+            for d in reversed(missing):
+                os.mkdir(d)
+                created.insert(0, d)
+        return created
+
+def _remove_dirs(dirs: List[str]):
+    for d in dirs:
+        try: os.rmdir(d)
+        except OSError: pass
+
+def refactor_fields(report_path: str, renames, max_workers: int = MAX_WORKERS) -> Dict:
+    """
+    Renames several fields across the report in one pass.
+    1. Candidate visuals come from the field-reference index (no full scan).
+    2. Files are loaded and transformed on a thread pool.
+    3. All rewritten files are staged as temp files, then committed with os.replace.
+    Any load/transform/stage error aborts before the first commit; a failure while
+    committing restores the files already replaced. Returns per-file results.
+    """
+    specs = parse_renames(renames)
+    index = get_index(report_path)
+
+    # Group index hits per visual: one load/write per file whatever the number of renames
+    tasks: Dict[Tuple, Dict] = {}
+    for spec in specs:
+        for vis, ref, json_paths in index.references(spec["old"], entity=spec["table"], kind=spec["kind"]):
+            key = (vis["page_id"], vis["id"])
+            task = tasks.setdefault(key, {"path": vis["path"], "page_id": vis["page_id"], "visual_id": vis["id"], "edits": []})
+            task["edits"].extend((p, spec) for p in json_paths)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(_transform, tasks.values()))
+        changed = [r for r in results if r["status"] == "staged"]
+        errors = [r for r in results if r["status"] == "error"]
+
+        if not errors and changed:
+            futures = [(r, pool.submit(_stage, r)) for r in changed]
+            for r, fut in futures:
+                try: fut.result()
+                except Exception as e:
+                    r["status"] = "error"; r["error"] = str(e); errors.append(r)
+
+    committed = []
+    if errors:
+        _discard(changed)
+        for r in changed:
+            if r["status"] == "staged": r["status"] = "aborted"
+    else:
+        try:
+            for r in changed:
+                os.replace(r["tmp"], r["path"])
+                del r["tmp"]
+                committed.append(r)
+                r["status"] = "updated"
+        except Exception as e:
+            # Roll back what was already replaced, drop the remaining temp files
+            for r in committed:
+                try: write_json_atomic(r["path"], None, text=r["original"])
+                except Exception: pass
+                r["status"] = "rolled_back"
+            _discard(changed)
+            for r in changed:
+                if r["status"] == "staged": r["status"] = "aborted"
+            errors.append({"path": None, "status": "error", "error": f"Commit failed: {e}"})
+            committed = []
+
+    for r in committed:
+        index.record(r["page_id"], r["visual_id"], r["path"], r["data"])
+
+    files = [{k: r[k] for k in ("path", "page_id", "visual_id", "status", "replacements", "error") if k in r} for r in results]
+    return {
+        "committed": not errors,
+        "renames": [{k: v for k, v in s.items() if v} for s in specs],
+        "files_scanned": len(results),
+        "files_updated": len(committed),
+        "replacements": sum(r["replacements"] for r in committed),
+        "files": files,
+        "errors": [e.get("error") for e in errors if e.get("path") is None]
+    }
@@ -0,0 +1,396 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from typing import Dict, List, Optional, Iterator, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None # Optional: without watchdog the index revalidates by mtime/size
+    FileSystemEventHandler = object
+
+from .scan import loads
+
+# Minimum delay between two stat-based revalidations of the same scope (no watcher)
+REVALIDATE_SECONDS = 1.0
+
+def file_sig(path: str):
+    """Returns the (mtime_ns, size) change signature of a file, or None if missing."""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def load_json(path: str):
+    """Reads a PBIR JSON file (orjson when installed). Returns None if it is missing or unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            return loads(f.read())
+    except Exception:
+        return None
+
+def write_json_atomic(path: str, data, text: str = None):
+    """Writes a PBIR JSON file via a temp file in the same folder + os.replace (never half-written)."""
+    if text is None: text = json.dumps(data, indent=2)
+    fd, tmp = tempfile.mkstemp(prefix=".sara-", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+def visual_title(data: Dict) -> str:
+    """Returns the literal title of a visual.json document ('' when untitled)."""
+    try:
+        return data.get("visual", {}).get("objects", {}).get("general", [])[0]["properties"]["title"]["expr"]["Literal"]["Value"].replace("'", "")
+    except Exception:
+        return ""
+
+def extract_field_refs(data: Dict) -> List[Tuple[Tuple, Tuple]]:
+    """
+    Finds every field reference ({"Property": ..., "Expression": {"SourceRef": {"Entity": ...}}})
+    under the "visual" node. Returns [((entity, property, kind), json_path)], where kind is the
+    enclosing key (Measure, Column, ...) and json_path the key/index path to the node.
+    """
+    refs = []
+    def walk(obj, path, kind):
+        if isinstance(obj, dict):
+            prop = obj.get("Property")
+            if isinstance(prop, str):
+                expr = obj.get("Expression")
+                src = expr.get("SourceRef", {}) if isinstance(expr, dict) else {}
+                refs.append(((src.get("Entity") if isinstance(src, dict) else None, prop, kind), path))
+            for k, v in obj.items(): walk(v, path + (k,), k)
+        elif isinstance(obj, list):
+            for i, item in enumerate(obj): walk(item, path + (i,), kind)
+    if isinstance(data, dict) and "visual" in data: walk(data["visual"], ("visual",), None)
+    return refs
+
+def node_at(data, json_path: Tuple):
+    """Follows a json_path from extract_field_refs. Returns None if it no longer exists."""
+    node = data
+    try:
+        for part in json_path: node = node[part]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return node
+
+class _Watcher(FileSystemEventHandler):
+    """Marks index scopes dirty from filesystem events."""
+    def __init__(self, index):
+        self.index = index
+
+    def on_any_event(self, event):
+        self.index._mark_dirty(event.src_path)
+        dest = getattr(event, "dest_path", None)
+        if dest: self.index._mark_dirty(dest)
+
+class ReportIndex:
+    """
+    Resident in-memory index of a PBIR report: pages, visuals, titles, types,
+    positions and file paths. Entries are re-read only when their file's
+    mtime/size changed, or when a filesystem watcher flagged them.
+
+    Scopes: "" is the page list (pages.json + page.json files), a page id is the
+    visuals of that page.
+
+    Alongside it keeps an inverted field-reference index:
+    (entity, property, kind) -> {(page_id, visual_id): [json_path, ...]},
+    updated per visual whenever that visual is re-read or written.
+    """
+    def __init__(self, report_path: str, watch: bool = True):
+        self.report_path = report_path
+        self.pages_dir = os.path.join(report_path, "definition", "pages")
+        self._pages: Dict[str, Dict] = {}
+        self._order: List[str] = []
+        self._order_sig = None
+        self._visuals: Dict[str, Dict[str, Dict]] = {}
+        self._checked: Dict[str, float] = {}
+        self._refs: Dict[Tuple, Dict[Tuple, List[Tuple]]] = {}
+        self._by_property: Dict[str, set] = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self._observer = None
+        self._warming = None
+        if watch and Observer: self._start_watcher()
+
+    # --- Watcher ---
+
+    def _start_watcher(self):
+        if not os.path.isdir(self.pages_dir): return
+        try:
+            self._observer = Observer()
+            self._observer.schedule(_Watcher(self), self.pages_dir, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+        except Exception:
+            self._observer = None
+
+    def _mark_dirty(self, path: str):
+        rel = os.path.relpath(path, self.pages_dir)
+        if rel.startswith(".."): return
+        parts = rel.split(os.sep)
+        with self._lock:
+            if len(parts) <= 2:
+                # pages.json, a page folder or its page.json
+                self._dirty.add("")
+            if parts[0] not in ("", ".", "pages.json"):
+                self._dirty.add(parts[0])
+
+    def close(self):
+        """Stops the filesystem watcher, if any."""
+        if self._observer:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=1)
+            except Exception: pass
+            self._observer = None
+
+    # --- Revalidation ---
+
+    def _stale(self, scope: str) -> bool:
+        if scope not in self._checked or scope in self._dirty: return True
+        if self._observer: return False
+        return time.monotonic() - self._checked[scope] >= REVALIDATE_SECONDS
+
+    def _done(self, scope: str):
+        self._dirty.discard(scope)
+        self._checked[scope] = time.monotonic()
+
+    def _refresh_pages(self):
+        found = {}
+        try:
+            for entry in os.scandir(self.pages_dir):
+                if not entry.is_dir(): continue
+                p_file = os.path.join(entry.path, "page.json")
+                sig = file_sig(p_file)
+                if sig: found[entry.name] = (p_file, sig)
+        except OSError: pass
+
+        for pid in list(self._pages):
+            if pid not in found: self.forget(pid)
+
+        for pid, (p_file, sig) in found.items():
+            cur = self._pages.get(pid)
+            if cur and cur["sig"] == sig: continue
+            data = load_json(p_file) or {}
+            self._pages[pid] = {
+                "id": pid,
+                "name": data.get("displayName", pid),
+                "width": data.get("width", 1280),
+                "height": data.get("height", 720),
+                "path": p_file,
+                "sig": sig
+            }
+
+        reg = os.path.join(self.pages_dir, "pages.json")
+        sig = file_sig(reg)
+        if sig != self._order_sig:
+            data = load_json(reg) if sig else None
+            self._order = list((data or {}).get("pageOrder", []))
+            self._order_sig = sig
+        self._done("")
+
+    def _refresh_visuals(self, page_id: str):
+        current = self._visuals.setdefault(page_id, {})
+        visuals_dir = os.path.join(self.pages_dir, page_id, "visuals")
+        seen = set()
+        try:
+            for entry in os.scandir(visuals_dir):
+                if not entry.is_dir(): continue
+                v_file = os.path.join(entry.path, "visual.json")
+                sig = file_sig(v_file)
+                if not sig: continue
+                seen.add(entry.name)
+                cur = current.get(entry.name)
+                if cur and cur["sig"] == sig: continue
+                data = load_json(v_file)
+                if data is None:
+                    self._drop(page_id, entry.name)
+                    continue
+                self._store(page_id, entry.name, v_file, data, sig)
+        except OSError: pass
+
+        for vid in list(current):
+            if vid not in seen: self._drop(page_id, vid)
+        self._done(page_id)
+
+    def _store(self, page_id: str, visual_id: str, v_file: str, data: Dict, sig):
+        # Replaced in place so listing order stays stable across edits
+        self._unlink_refs(page_id, self._visuals.get(page_id, {}).get(visual_id))
+        entry = self._entry(page_id, visual_id, v_file, data, sig)
+        key = (page_id, visual_id)
+        grouped: Dict[Tuple, List[Tuple]] = {}
+        for ref, json_path in extract_field_refs(data):
+            grouped.setdefault(ref, []).append(json_path)
+        for ref, paths in grouped.items():
+            self._refs.setdefault(ref, {})[key] = paths
+            self._by_property.setdefault(ref[1], set()).add(ref)
+        entry["refs"] = list(grouped)
+        self._visuals.setdefault(page_id, {})[visual_id] = entry
+
+    def _drop(self, page_id: str, visual_id: str):
+        self._unlink_refs(page_id, self._visuals.get(page_id, {}).pop(visual_id, None))
+
+    def _unlink_refs(self, page_id: str, entry: Optional[Dict]):
+        if not entry: return
+        key = (page_id, entry["id"])
+        for ref in entry.get("refs", ()):
+            holders = self._refs.get(ref)
+            if holders is None: continue
+            holders.pop(key, None)
+            if not holders:
+                del self._refs[ref]
+                self._by_property.get(ref[1], set()).discard(ref)
+                if not self._by_property.get(ref[1]): self._by_property.pop(ref[1], None)
+
+    @staticmethod
+    def _entry(page_id: str, visual_id: str, v_file: str, data: Dict, sig) -> Dict:
+        pos = data.get("position", {}) or {}
+        return {
+            "id": visual_id,
+            "page_id": page_id,
+            "path": v_file,
+            "title": visual_title(data),
+            "type": data.get("visual", {}).get("visualType"),
+            "position": {k: pos[k] for k in ("x", "y", "z", "width", "height") if k in pos},
+            "sig": sig
+        }
+
+    def _ensure_pages(self):
+        if self._stale(""): self._refresh_pages()
+
+    def _ensure_visuals(self, page_id: str):
+        if self._stale(page_id): self._refresh_visuals(page_id)
+
+    def _ensure_all(self):
+        self._ensure_pages()
+        for pid in list(self._pages): self._ensure_visuals(pid)
+
+    # --- Queries ---
+
+    def warm_async(self, scope: str = None):
+        """Loads a page scope (or the whole report) on a background thread, so later lookups hit memory."""
+        with self._lock:
+            if self._warming is not None and self._warming.is_alive(): return
+            def warm():
+                try:
+                    with self._lock: self._ensure_pages()
+                    for pid in ([scope] if scope else list(self._pages)):
+                        with self._lock: self._ensure_visuals(pid)
+                except Exception: pass
+            self._warming = threading.Thread(target=warm, name="sara-index-warm", daemon=True)
+            self._warming.start()
+
+    def is_warm(self, scope: str = None) -> bool:
+        """True when a scope (or, with None, every page) has already been loaded once."""
+        with self._lock:
+            if scope is not None: return scope in self._checked
+            return "" in self._checked and all(pid in self._checked for pid in self._pages)
+
+    def pages(self) -> List[Dict]:
+        """Returns page entries in report order (pages.json first, then unlisted folders)."""
+        with self._lock:
+            self._ensure_pages()
+            ordered = [self._pages[pid] for pid in self._order if pid in self._pages]
+            listed = set(self._order)
+            ordered += [p for pid, p in self._pages.items() if pid not in listed]
+            return ordered
+
+    def page(self, page_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._ensure_pages()
+            return self._pages.get(page_id)
+
+    def find_page(self, page_name: str) -> Optional[Dict]:
+        """Finds a page by display name."""
+        return next((p for p in self.pages() if p["name"] == page_name), None)
+
+    def visuals(self, page_id: str) -> List[Dict]:
+        """Returns the visual entries of a page."""
+        with self._lock:
+            self._ensure_visuals(page_id)
+            return list(self._visuals.get(page_id, {}).values())
+
+    def all_visuals(self) -> Iterator[Dict]:
+        """Iterates over visual entries of every page, in page order."""
+        for page in self.pages():
+            for v in self.visuals(page["id"]): yield v
+
+    def find_visual(self, page_id: str, title: str = None, visual_id: str = None) -> Optional[Dict]:
+        """Finds a visual on a page by id, or else by title."""
+        with self._lock:
+            self._ensure_visuals(page_id)
+            vis = self._visuals.get(page_id, {})
+            if visual_id: return vis.get(visual_id)
+            return next((v for v in vis.values() if v["title"] == title), None)
+
+    def references(self, prop: str, entity: str = None, kind: str = None) -> List[Tuple[Dict, Tuple, List[Tuple]]]:
+        """
+        Looks up visuals referencing a field, in page order.
+        Returns [(visual_entry, (entity, property, kind), [json_path, ...])].
+        entity/kind of None match any.
+        """
+        with self._lock:
+            self._ensure_all()
+            rank = {pid: i for i, pid in enumerate(self._order)}
+            hits = []
+            for ref in self._by_property.get(prop, ()):
+                if entity is not None and ref[0] != entity: continue
+                if kind is not None and ref[2] != kind: continue
+                for (pid, vid), paths in self._refs.get(ref, {}).items():
+                    vis = self._visuals.get(pid, {}).get(vid)
+                    if vis: hits.append((vis, ref, paths))
+            hits.sort(key=lambda h: (rank.get(h[0]["page_id"], len(rank)), h[0]["page_id"], h[0]["id"]))
+            return hits
+
+    def fields(self) -> Dict[Tuple, int]:
+        """Returns every referenced (entity, property, kind) with the number of visuals using it."""
+        with self._lock:
+            self._ensure_all()
+            return {ref: len(holders) for ref, holders in self._refs.items()}
+
+    # --- Updates from our own writes ---
+
+    def record(self, page_id: str, visual_id: str, v_file: str, data: Dict):
+        """Updates a visual entry after the server wrote its visual.json (no re-read)."""
+        with self._lock:
+            sig = file_sig(v_file)
+            if not sig: return
+            self._store(page_id, visual_id, v_file, data, sig)
+
+    def forget(self, page_id: str, visual_id: str = None):
+        """Drops a visual, or a whole page, from the index after deletion."""
+        with self._lock:
+            if visual_id:
+                self._drop(page_id, visual_id)
+                return
+            for vid in list(self._visuals.get(page_id, {})): self._drop(page_id, vid)
+            self._pages.pop(page_id, None)
+            self._visuals.pop(page_id, None)
+            self._checked.pop(page_id, None)
+
+    def invalidate(self, scope: str = None):
+        """Forces revalidation of one scope (or all scopes) on next access."""
+        with self._lock:
+            if scope is None: self._checked.clear()
+            else: self._checked.pop(scope, None)
+
+_INDEXES: Dict[str, ReportIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+def get_index(report_path: str) -> ReportIndex:
+    """Returns the resident index for a report folder, creating it on first use."""
+    key = os.path.normcase(os.path.abspath(report_path))
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(key)
+        if idx is None:
+            idx = _INDEXES[key] = ReportIndex(report_path)
+        return idx
@@ -0,0 +1,127 @@
+import os
+import re
+import json
+from typing import Dict, List, Tuple
+
+try:
+    import yaml
+except ImportError:
+    yaml = None # Optional: YAML specs need PyYAML, JSON always works
+
+from . import layout
+from .report_index import get_index
+from .batch import apply_batch
+
+# Friendly aliases -> PBIR visualType
+VISUAL_TYPES = {
+    "bar_chart": "clusteredBarChart", "bar": "clusteredBarChart", "column_chart": "clusteredColumnChart",
+    "line_chart": "lineChart", "line": "lineChart", "pie": "pieChart", "donut": "donutChart",
+    "table": "tableEx", "matrix": "pivotTable"
+}
+# Default (width, height) per type
+DEFAULT_SIZES = {"card": (300, 150), "multiRowCard": (300, 150), "textbox": (300, 100), "slicer": (250, 150)}
+DEFAULT_SIZE = (400, 300)
+# Role that receives the 'measure'/'values' shorthand
+VALUE_ROLES = {"card": "Values", "multiRowCard": "Values", "tableEx": "Values", "pivotTable": "Values", "slicer": "Values"}
+# Plain "Table[Field]" strings in these roles are measures, elsewhere columns
+MEASURE_ROLES = {"Y", "Y2", "Values", "Size", "Tooltips", "TargetValue", "MinValue", "MaxValue"}
+
+_FIELD = re.compile(r"^\s*'?(?P<table>[^'\[\]]+?)'?\s*\[(?P<name>[^\]]+)\]\s*$")
+
+def load_spec(spec) -> Dict:
+    """Accepts a dict, JSON/YAML text or a path to a .json/.yaml file."""
+    if isinstance(spec, dict): return spec
+    if isinstance(spec, str) and "\n" not in spec and os.path.isfile(spec):
+        with open(spec, 'r', encoding='utf-8-sig') as f: spec = f.read()
+    try: data = json.loads(spec)
+    except ValueError:
+        if yaml is None: raise ValueError("Spec is not valid JSON (install PyYAML for YAML specs).")
+        data = yaml.safe_load(spec)
+    if isinstance(data, list): data = {"pages": data}
+    if not isinstance(data, dict) or not isinstance(data.get("pages"), list):
+        raise ValueError("Spec needs a 'pages' list.")
+    return data
+
+def parse_field(field, default_kind: str) -> Tuple[str, str, str]:
+    """
+    'Sales[Revenue]' / "'Dim Date'[Month]" -> (kind, table, name). kind comes from
+    {"measure": ...} / {"column": ...} wrappers, else default_kind.
+    """
+    kind = default_kind
+    if isinstance(field, dict):
+        key = next((k for k in ("measure", "column") if k in field), None)
+        if not key: raise ValueError(f"Field needs 'measure' or 'column': {field}")
+        kind, field = key.capitalize(), field[key]
+    m = _FIELD.match(str(field))
+    if not m: raise ValueError(f"Field '{field}' is not in Table[Name] form.")
+    return kind, m.group("table"), m.group("name")
+
+def _as_list(value) -> List:
+    return value if isinstance(value, list) else [value]
+
+def visual_op(page_name: str, spec: Dict) -> Dict:
+    """Translates one spec visual into a batch operation."""
+    vtype = VISUAL_TYPES.get(spec.get("type"), spec.get("type"))
+    if not vtype: raise ValueError(f"Visual needs a 'type': {spec}")
+    title = spec.get("title", "New Visual")
+    roles: Dict[str, List] = {}
+    for role, fields in (spec.get("fields") or {}).items():
+        default = "Measure" if role in MEASURE_ROLES else "Column"
+        roles[role] = [parse_field(f, default) for f in _as_list(fields)]
+    for key, role in (("category", "Category"), ("legend", "Series")):
+        if spec.get(key): roles.setdefault(role, []).extend(parse_field(f, "Column") for f in _as_list(spec[key]))
+    for key in ("measure", "value", "values"):
+        if spec.get(key): roles.setdefault(VALUE_ROLES.get(vtype, "Y"), []).extend(parse_field(f, "Measure") for f in _as_list(spec[key]))
+
+    op = {"page_name": page_name}
+    if not roles:
+        if vtype not in ("card", "textbox"): raise ValueError(f"Visual '{title}' ({vtype}) needs bound fields.")
+        op.update({"op": "create_visual", "visual_type": vtype, "title": title})
+    elif vtype == "clusteredBarChart" and set(roles) == {"Category", "Y"} and len(roles["Category"]) == len(roles["Y"]) == 1 \
+            and roles["Category"][0][0] == "Column" and roles["Y"][0][0] == "Measure":
+        # Same document as pbir_create_bar_chart (includes the default sort)
+        (_, cat_table, cat_col), (_, val_table, val_measure) = roles["Category"][0], roles["Y"][0]
+        op.update({"op": "create_bar_chart", "visual_title": title, "category_table": cat_table, "category_col": cat_col,
+                   "value_table": val_table, "value_measure": val_measure})
+    else:
+        op.update({"op": "create_chart", "visual_type": vtype, "title": title, "fields": roles})
+    width, height = DEFAULT_SIZES.get(vtype, DEFAULT_SIZE)
+    op.update({"width": spec.get("width") or width, "height": spec.get("height") or height})
+    for key in ("x", "y", "z"):
+        if spec.get(key) is not None: op[key] = spec[key]
+    return op
+
+def plan(spec, existing_pages: Dict[str, Dict]) -> List[Dict]:
+    """
+    Batch operations for a spec. New pages are laid out with their 'layout'
+    ('flow' by default, 'grid' or 'none'); visuals added to existing pages go
+    to free spots.
+    """
+    spec = load_spec(spec)
+    ops = []
+    for page in spec["pages"]:
+        name = page.get("name")
+        if not name: raise ValueError(f"Page needs a 'name': {page}")
+        width, height = page.get("width", 1280), page.get("height", 720)
+        is_new = name not in existing_pages
+        if is_new: ops.append({"op": "create_page", "name": name, "width": width, "height": height})
+        v_ops = [visual_op(name, v) for v in page.get("visuals", [])]
+        mode = page.get("layout", "flow") if is_new else "none"
+        auto = [op for op in v_ops if op.get("x") is None and op.get("y") is None]
+        if mode != "none" and auto:
+            rects = {str(i): (0, 0, op["width"], op["height"]) for i, op in enumerate(auto)}
+            keys = list(rects)
+            if mode == "grid": placed = layout.pack_grid(keys, width, height, page.get("columns"), page.get("gap", layout.GAP))
+            elif mode == "flow": placed = layout.pack_flow(rects, keys, width, height, page.get("gap", layout.GAP))
+            else: raise ValueError(f"Unknown layout '{mode}' on page '{name}' (use 'flow', 'grid' or 'none').")
+            for key, (x, y, w, h) in placed.items():
+                auto[int(key)].update({"x": int(round(x)), "y": int(round(y)), "width": int(round(w)), "height": int(round(h))})
+        ops.extend(v_ops)
+    return ops
+
+def scaffold_report(report_path: str, spec, dry_run: bool = False) -> Dict:
+    """Generates every page and visual of a spec in one batch transaction (one pages.json update)."""
+    ops = plan(spec, {p["name"]: p for p in get_index(report_path).pages()})
+    res = apply_batch(report_path, ops, dry_run=dry_run)
+    if dry_run: res["plan"] = ops
+    return res
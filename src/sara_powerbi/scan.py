@@ -0,0 +1,73 @@
+import os
+import json
+import mmap
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None # Optional: falls back to the stdlib parser
+
+# Files at least this large are searched through mmap instead of being read whole
+MMAP_THRESHOLD = 64 * 1024
+
+def loads(raw: bytes):
+    """Parses JSON bytes with orjson when installed, else the stdlib json module."""
+    if raw[:3] == b'\xef\xbb\xbf': raw = raw[3:]
+    if orjson: return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
+
+def json_tokens(text: str) -> List[bytes]:
+    """
+    Byte forms a string can take inside a JSON file: raw UTF-8 (what Power BI
+    writes) and the \\u-escaped form (what json.dump writes by default).
+    """
+    raw = text.encode('utf-8')
+    escaped = json.dumps(text)[1:-1].encode('ascii')
+    return [raw] if raw == escaped else [raw, escaped]
+
+def contains(path: str, tokens: List[bytes]) -> Tuple[bool, bytes]:
+    """
+    Checks a file's raw bytes for any token without parsing it.
+    Returns (matched, content) where content is only loaded for matches.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not any(mm.find(t) != -1 for t in tokens): return False, b""
+                return True, mm[:]
+        raw = f.read()
+    return any(t in raw for t in tokens), raw
+
+def visual_files(report_path: str, page_ids: Iterable[str] = None) -> Iterator[Tuple[str, str, str]]:
+    """Yields (page_id, visual_id, path) for every visual.json, optionally limited to some pages."""
+    pages_dir = os.path.join(report_path, "definition", "pages")
+    if page_ids is None:
+        try: page_ids = [e.name for e in os.scandir(pages_dir) if e.is_dir()]
+        except OSError: return
+    for pid in page_ids:
+        try: entries = list(os.scandir(os.path.join(pages_dir, pid, "visuals")))
+        except OSError: continue
+        for entry in entries:
+            if entry.is_dir():
+                yield pid, entry.name, os.path.join(entry.path, "visual.json")
+
+def scan_visuals(report_path: str, needles: List[str], page_ids: Iterable[str] = None, stats: Dict = None) -> Iterator[Tuple[str, str, str, Dict]]:
+    """
+    Byte-prefiltered scan: yields (page_id, visual_id, path, data) only for the
+    visual.json files whose bytes contain one of the needles; everything else
+    is rejected without JSON parsing. stats (optional) counts files/bytes.
+    """
+    tokens = [t for n in needles for t in json_tokens(n)]
+    for pid, vid, v_file in visual_files(report_path, page_ids):
+        try: matched, raw = contains(v_file, tokens)
+        except OSError: continue
+        if stats is not None: stats["files"] = stats.get("files", 0) + 1
+        if not matched: continue
+        try: data = loads(raw)
+        except ValueError: continue
+        if stats is not None:
+            stats["parsed"] = stats.get("parsed", 0) + 1
+            stats["bytes_parsed"] = stats.get("bytes_parsed", 0) + len(raw)
+        yield pid, vid, v_file, data
@@ -12,39 +12,55 @@ if sys.platform == "win32":
 
 from mcp.server.fastmcp import FastMCP
 from sara_powerbi.tools import pbir, tom
+from sara_powerbi.executors import file_tool, model_tool
 
 # Initialize Server
 mcp = FastMCP("sara-powerbi-ultimate")
 
 # --- REGISTER TOOLS ---
+# Tool bodies block (pythonnet, file I/O): they run on the model/file thread pools, not on the event loop.
+# "write" tools run alone on their pool's lock; DAX query tools only use ADOMD connections and take no lock
+# (run_dax_profiled takes the write lock: its engine trace is added to and dropped from the shared TOM Server).
 
 # PBIR Tools
-mcp.add_tool(pbir.pbir_get_info)
-mcp.add_tool(pbir.pbir_inspect_structure)
-mcp.add_tool(pbir.pbir_create_page)
-mcp.add_tool(pbir.pbir_create_visual)
-mcp.add_tool(pbir.pbir_create_bar_chart)
-mcp.add_tool(pbir.pbir_bind_measure)
-mcp.add_tool(pbir.pbir_format_visual)
-mcp.add_tool(pbir.pbir_refactor_field)
-mcp.add_tool(pbir.pbir_audit_usage)
-mcp.add_tool(pbir.pbir_list_visuals)
-mcp.add_tool(pbir.pbir_delete_object)
-mcp.add_tool(pbir.pbir_update_visual_layout)
+mcp.add_tool(file_tool(pbir.pbir_get_info))
+mcp.add_tool(file_tool(pbir.pbir_set_project, "write"))
+mcp.add_tool(file_tool(pbir.pbir_inspect_structure))
+mcp.add_tool(file_tool(pbir.pbir_create_page, "write"))
+mcp.add_tool(file_tool(pbir.pbir_create_visual, "write"))
+mcp.add_tool(file_tool(pbir.pbir_create_bar_chart, "write"))
+mcp.add_tool(file_tool(pbir.pbir_bind_measure, "write"))
+mcp.add_tool(file_tool(pbir.pbir_format_visual, "write"))
+mcp.add_tool(file_tool(pbir.pbir_refactor_field, "write"))
+mcp.add_tool(file_tool(pbir.pbir_refactor_fields, "write"))
+mcp.add_tool(file_tool(pbir.pbir_audit_usage))
+mcp.add_tool(file_tool(pbir.pbir_list_visuals))
+mcp.add_tool(file_tool(pbir.pbir_delete_object, "write"))
+mcp.add_tool(file_tool(pbir.pbir_update_visual_layout, "write"))
+mcp.add_tool(file_tool(pbir.pbir_apply_batch, "write"))
+mcp.add_tool(file_tool(pbir.pbir_auto_layout, "write"))
+mcp.add_tool(file_tool(pbir.pbir_scaffold_report, "write"))
 
 # TOM Tools
-mcp.add_tool(tom.manage_model_connection)
-mcp.add_tool(tom.list_objects)
-mcp.add_tool(tom.search_model)
-mcp.add_tool(tom.run_dax)
-mcp.add_tool(tom.manage_measure)
-mcp.add_tool(tom.manage_column)
-mcp.add_tool(tom.manage_table)
-mcp.add_tool(tom.manage_relationship)
-mcp.add_tool(tom.manage_role)
-mcp.add_tool(tom.manage_calc_group)
-mcp.add_tool(tom.get_model_info)
-mcp.add_tool(tom.get_vertipaq_stats)
+mcp.add_tool(model_tool(tom.manage_model_connection, "write"))
+mcp.add_tool(model_tool(tom.list_objects))
+mcp.add_tool(model_tool(tom.search_model))
+mcp.add_tool(model_tool(tom.get_dependencies))
+mcp.add_tool(model_tool(tom.run_dax, None))
+mcp.add_tool(model_tool(tom.run_dax_batch, None))
+mcp.add_tool(model_tool(tom.run_dax_to_file, None))
+mcp.add_tool(model_tool(tom.run_dax_profiled, "write"))
+mcp.add_tool(model_tool(tom.prewarm_report_cache, None))
+mcp.add_tool(model_tool(tom.manage_measure, "write"))
+mcp.add_tool(model_tool(tom.manage_column, "write"))
+mcp.add_tool(model_tool(tom.manage_table, "write"))
+mcp.add_tool(model_tool(tom.manage_relationship, "write"))
+mcp.add_tool(model_tool(tom.apply_model_changes, "write"))
+mcp.add_tool(model_tool(tom.manage_role, "write"))
+mcp.add_tool(model_tool(tom.manage_calc_group, "write"))
+mcp.add_tool(model_tool(tom.get_model_info))
+mcp.add_tool(model_tool(tom.get_vertipaq_stats, None))
+mcp.add_tool(model_tool(tom.find_unused_columns))
 
 def main():
     """Entry point for the server."""
@@ -0,0 +1,237 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# TMDL (Tabular Model Definition Language) reader with line spans, so edits
+# can rewrite only the lines of the object they touch.
+
+OBJECT_KEYWORDS = {
+    "model", "database", "table", "column", "measure", "partition", "hierarchy", "level", "annotation",
+    "extendedProperty", "relationship", "role", "tablePermission", "columnPermission", "calculationGroup",
+    "calculationItem", "expression", "culture", "perspective", "perspectiveTable", "perspectiveColumn",
+    "perspectiveMeasure", "perspectiveHierarchy", "dataSource", "ref", "variation", "linguisticMetadata",
+    "queryGroup", "member", "formatStringDefinition", "detailRowsDefinition", "changedProperty",
+}
+_PLAIN_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_PROP = re.compile(r"^([A-Za-z][A-Za-z0-9_]*)\s*:\s?(.*)$")
+_EXPR_PROP = re.compile(r"^([A-Za-z][A-Za-z0-9_]*)\s*=\s*(.*)$")
+FENCE = "```"
+
+class Node:
+    """One TMDL object. Lines [start, end) include its /// description and children."""
+    __slots__ = ("keyword", "name", "value", "level", "start", "decl", "end", "doc", "props", "children", "expr_span")
+    def __init__(self, keyword: str, name: str, value: Optional[str], level: int, decl: int, doc: List[str], start: int):
+        self.keyword, self.name, self.value, self.level = keyword, name, value, level
+        self.decl, self.start, self.end, self.doc = decl, start, decl + 1, doc
+        self.props: Dict[str, Tuple[str, int, int]] = {} # key -> (value, first line, end line)
+        self.children: List["Node"] = []
+        self.expr_span: Optional[Tuple[int, int]] = None  # lines of a multi-line value
+
+    def find(self, keyword: str, name: str = None) -> Optional["Node"]:
+        return next((c for c in self.children if c.keyword == keyword and (name is None or c.name == name)), None)
+
+    def all(self, keyword: str) -> List["Node"]:
+        return [c for c in self.children if c.keyword == keyword]
+
+    def prop(self, key: str, default=None):
+        p = self.props.get(key)
+        return p[0] if p else default
+
+def quote_name(name: str) -> str:
+    return name if _PLAIN_NAME.match(name) else "'" + name.replace("'", "''") + "'"
+
+def split_name(text: str) -> Tuple[str, str]:
+    """Reads a (possibly quoted) object name from the start of text; returns (name, rest)."""
+    text = text.lstrip()
+    if text.startswith("'"):
+        i, out = 1, []
+        while i < len(text):
+            if text[i] == "'":
+                if text[i + 1:i + 2] == "'": out.append("'"); i += 2; continue
+                return "".join(out), text[i + 1:]
+            out.append(text[i]); i += 1
+        return "".join(out), ""
+    m = re.match(r"[^\s=.:]+", text)
+    if not m: return "", text
+    return m.group().strip(), text[m.end():]
+
+def split_ref(text: str) -> Tuple[str, str]:
+    """'Dim Date'.Date / Sales.'Order Date' -> (table, column)."""
+    table, rest = split_name(text)
+    rest = rest.lstrip()
+    if rest.startswith("."): rest = rest[1:]
+    column, _ = split_name(rest)
+    return table, column
+
+def format_ref(table: str, column: str) -> str:
+    return f"{quote_name(table)}.{quote_name(column)}"
+
+class Document:
+    """A parsed .tmdl file: lines plus the node tree."""
+    def __init__(self, text: str):
+        self.newline = "\r\n" if "\r\n" in text else "\n"
+        self.lines = text.splitlines()
+        self.unit = self._detect_unit()
+        self.roots: List[Node] = []
+        self.parse()
+
+    def _detect_unit(self) -> str:
+        spaces = []
+        for line in self.lines:
+            if line.startswith("\t"): return "\t"
+            n = len(line) - len(line.lstrip(" "))
+            if n and line.strip(): spaces.append(n)
+        return " " * min(spaces) if spaces else "\t"
+
+    def level(self, line: str) -> int:
+        n, u = 0, self.unit
+        while line.startswith(u, n * len(u)): n += 1
+        return n
+
+    def text(self) -> str:
+        return self.newline.join(self.lines) + self.newline
+
+    def parse(self):
+        self.roots = []
+        stack: List[Node] = []
+        doc: List[str] = []
+        doc_start = None
+        i, lines = 0, self.lines
+        while i < len(lines):
+            line = lines[i]
+            stripped = line.strip()
+            if not stripped:
+                i += 1; continue
+            lvl = self.level(line)
+            while stack and stack[-1].level >= lvl: stack.pop()
+            if stripped.startswith("///"):
+                if doc_start is None: doc_start = i
+                doc.append(stripped[3:].strip())
+                i += 1; continue
+            parent = stack[-1] if stack else None
+            word = stripped.split(None, 1)[0]
+            rest = stripped[len(word):]
+            if word == "ref" and rest.strip():
+                # ref table Sales -> keyword "ref table"
+                sub = rest.split(None, 1)[0]
+                word, rest = f"ref {sub}", rest.lstrip()[len(sub):]
+            # `database` may be declared without a name
+            named = rest.strip() or word == "database"
+            if (word in OBJECT_KEYWORDS or word.startswith("ref ")) and named and not rest.lstrip().startswith(":"):
+                name, tail = split_name(rest)
+                tail = tail.strip()
+                value = tail[1:].strip() if tail.startswith("=") else None
+                node = Node(word, name, value, lvl, i, doc, doc_start if doc_start is not None else i)
+                doc, doc_start = [], None
+                i = self._value_block(node, i, lvl, value)
+                (parent.children if parent else self.roots).append(node)
+                stack.append(node)
+                for n in stack: n.end = max(n.end, i)
+                continue
+            doc, doc_start = [], None
+            m = _PROP.match(stripped)
+            e = None if m else _EXPR_PROP.match(stripped)
+            key, value = (m.group(1), m.group(2).strip()) if m else (e.group(1), e.group(2).strip()) if e else (stripped, True)
+            first = i
+            if e: i = self._value_block(None, i, lvl, value)
+            else: i += 1
+            if parent:
+                if e and value in ("", FENCE):
+                    value = self.block_text(first + 1, i, lvl, fenced=value == FENCE)
+                parent.props[key] = (value, first, i)
+                for n in stack: n.end = max(n.end, i)
+
+    def _value_block(self, node: Optional[Node], i: int, lvl: int, value: Optional[str]) -> int:
+        """Skips the lines of a multi-line `= ...` value; returns the next line index."""
+        j = i + 1
+        if value == FENCE:
+            while j < len(self.lines) and self.lines[j].strip() != FENCE: j += 1
+            j = min(j + 1, len(self.lines))
+        elif value == "":
+            while j < len(self.lines) and (not self.lines[j].strip() or self.level(self.lines[j]) >= lvl + 2): j += 1
+            while j > i + 1 and not self.lines[j - 1].strip(): j -= 1
+        if node is not None and j > i + 1:
+            node.expr_span = (i + 1, j)
+            node.value = self.block_text(i + 1, j, lvl, fenced=value == FENCE)
+        return j
+
+    def block_text(self, start: int, end: int, lvl: int, fenced: bool = False) -> str:
+        lines = self.lines[start:end]
+        if fenced and lines and lines[-1].strip() == FENCE: lines = lines[:-1]
+        prefix = self.unit * (lvl + 2)
+        out = [l[len(prefix):] if l.startswith(prefix) else l.lstrip() for l in lines]
+        return "\n".join(out).strip("\n")
+
+    # --- Rendering ---
+
+    def value_lines(self, head: str, expression: str, lvl: int) -> List[str]:
+        """`head = expr` on one line, or `head =` followed by the indented block."""
+        pad = self.unit * lvl
+        expr_lines = (expression or "").strip("\n").split("\n")
+        if len(expr_lines) == 1: return [f"{pad}{head} = {expr_lines[0].strip()}"]
+        inner = self.unit * (lvl + 2)
+        return [f"{pad}{head} ="] + [inner + l if l.strip() else "" for l in expr_lines]
+
+    def doc_lines(self, description: str, lvl: int) -> List[str]:
+        if not description: return []
+        return [f"{self.unit * lvl}/// {l}".rstrip() for l in description.split("\n")]
+
+    def replace(self, start: int, end: int, new_lines: List[str]):
+        self.lines[start:end] = new_lines
+        self.parse()
+
+    def remove(self, node: Node):
+        """Removes a node and one separating blank line."""
+        start, end = node.start, node.end
+        if end < len(self.lines) and not self.lines[end].strip(): end += 1
+        elif start > 0 and not self.lines[start - 1].strip(): start -= 1
+        self.replace(start, end, [])
+
+    def set_prop(self, node: Node, key: str, value, prop_level: int = None):
+        """Sets `key: value` (value True -> bare flag, None -> remove) on a node."""
+        lvl = node.level + 1 if prop_level is None else prop_level
+        cur = node.props.get(key)
+        if value is None or value is False:
+            if cur: self.replace(cur[1], cur[2], [])
+            return
+        line = f"{self.unit * lvl}{key}" if value is True else f"{self.unit * lvl}{key}: {value}"
+        if cur: self.replace(cur[1], cur[2], [line])
+        else:
+            # After the declaration (and its multi-line value)
+            at = node.expr_span[1] if node.expr_span else node.decl + 1
+            self.replace(at, at, [line])
+
+    def set_description(self, node: Node, description: str):
+        self.replace(node.start, node.decl, self.doc_lines(description, node.level))
+
+    def rename(self, node: Node, new_name: str):
+        line = self.lines[node.decl]
+        pad = line[:len(line) - len(line.lstrip())]
+        _, tail = split_name(line.strip()[len(node.keyword):])
+        self.replace(node.decl, node.decl + 1, [f"{pad}{node.keyword} {quote_name(new_name)}{tail}"])
+
+    def set_value(self, node: Node, expression: str):
+        """Replaces the `= expression` of a declaration (single or multi-line)."""
+        head = f"{node.keyword} {quote_name(node.name)}"
+        end = node.expr_span[1] if node.expr_span else node.decl + 1
+        self.replace(node.decl, end, self.value_lines(head, expression, node.level))
+
+    def set_expr_prop(self, node: Node, key: str, expression: str):
+        """Sets a `key = expression` property (e.g. a partition's source)."""
+        cur = node.props.get(key)
+        new = self.value_lines(key, expression, node.level + 1)
+        if cur: self.replace(cur[1], cur[2], new)
+        else:
+            at = node.end
+            self.replace(at, at, new)
+
+    def insert_child(self, parent: Node, new_lines: List[str], after: Optional[Node] = None):
+        """Inserts an object block (blank-line separated) after `after` or at the end of parent."""
+        at = after.end if after else parent.end
+        self.replace(at, at, [""] + new_lines)
+
+    def append_root(self, new_lines: List[str]):
+        while self.lines and not self.lines[-1].strip(): self.lines.pop()
+        self.replace(len(self.lines), len(self.lines), ([""] if self.lines else []) + new_lines)
+
+def parse(text: str) -> Document:
+    return Document(text)
@@ -1,98 +1,178 @@
 import os
 import json
-import uuid
 import psutil
 from typing import List, Dict, Optional
+from ..report_index import get_index, load_json, visual_title, extract_field_refs
+from ..json_splice import write_json_minimal
+from ..scan import scan_visuals
+from ..refactor import refactor_fields
+from ..batch import apply_batch
+from ..scaffold import scaffold_report
+from .. import visuals, layout
+from ..visuals import new_id, page_doc, visual_doc, bar_chart_doc, bind_measure, set_title, set_position
+
+# Environment variable pointing at a .Report folder (or .pbip file): skips process scanning
+PROJECT_PATH_ENV = "SARA_REPORT_PATH"
+
+# Detection state: explicit override and last successful auto-detection
+DETECT_CONTEXT = {"override": None, "srv_pid": None, "desktop_pid": None, "path": None}
 
 class PBIRManager:
+    @staticmethod
+    def resolve_report_dir(path: str) -> Optional[str]:
+        """Normalizes a .pbip file, .Report folder or project folder to its .Report folder."""
+        if not path: return None
+        path = os.path.abspath(os.path.expanduser(path.strip().strip('"')))
+        if path.endswith('.pbip'): path = path[:-len('.pbip')] + ".Report"
+        if path.endswith('.Report'):
+            return path if os.path.isdir(path) else None
+        if os.path.isdir(os.path.join(path, "definition", "pages")): return path
+        try:
+            reports = [e.path for e in os.scandir(path) if e.is_dir() and e.name.endswith('.Report')]
+            if len(reports) == 1: return reports[0]
+        except OSError: pass
+        return None
+
+    @staticmethod
+    def set_project_path(path: str = None) -> Optional[str]:
+        """Pins the project to a folder (None clears the override). Returns the resolved .Report folder."""
+        if not path:
+            DETECT_CONTEXT["override"] = None
+            return None
+        report_dir = PBIRManager.resolve_report_dir(path)
+        DETECT_CONTEXT["override"] = report_dir
+        return report_dir
+
     @staticmethod
     def detect_path() -> Optional[str]:
-        """Auto-detects the .Report folder of the open Power BI Project"""
+        """
+        Returns the .Report folder of the active Power BI Project.
+        Order: explicit override, SARA_REPORT_PATH, cached detection (revalidated
+        with pid_exists + path check), then a full process scan.
+        """
+        if DETECT_CONTEXT["override"]:
+            if os.path.isdir(DETECT_CONTEXT["override"]): return DETECT_CONTEXT["override"]
+            DETECT_CONTEXT["override"] = None
+
+        env_path = os.environ.get(PROJECT_PATH_ENV)
+        if env_path:
+            return PBIRManager.resolve_report_dir(env_path)
+
+        cached = DETECT_CONTEXT["path"]
+        if cached:
+            try:
+                if psutil.pid_exists(DETECT_CONTEXT["srv_pid"]) and psutil.pid_exists(DETECT_CONTEXT["desktop_pid"]) and os.path.isdir(cached):
+                    return cached
+            except Exception: pass
+            DETECT_CONTEXT.update({"srv_pid": None, "desktop_pid": None, "path": None})
+
+        srv_pid, desktop_pid, report_dir = PBIRManager._scan_processes()
+        if report_dir:
+            DETECT_CONTEXT.update({"srv_pid": srv_pid, "desktop_pid": desktop_pid, "path": report_dir})
+        return report_dir
+
+    @staticmethod
+    def _scan_processes():
+        """Auto-detects the .Report folder of the open Power BI Project. Returns (srv_pid, desktop_pid, path)."""
+        srv_pid = None
         try:
             # 1. Find Data Engine (msmdsrv)
-            srv_pid = None
             for proc in psutil.process_iter(['pid', 'name']):
                 if 'msmdsrv.exe' in (proc.info['name'] or '').lower():
                     srv_pid = proc.info['pid']
                     break 
             
-            if not srv_pid: return None
+            if not srv_pid: return None, None, None
 
             # 2. Get Parent (PBIDesktop)
             try:
                 parent = psutil.Process(srv_pid).parent()
-                if not parent or 'PBIDesktop' not in parent.name(): return None
-            except: return None
+                if not parent or 'PBIDesktop' not in parent.name(): return srv_pid, None, None
+            except: return srv_pid, None, None
 
             # 3. Scan Command Line (If opened via double-click)
             cmdline = parent.cmdline()
             for arg in cmdline:
                 if arg.endswith('.pbip'):
                     report_dir = arg.replace(".pbip", ".Report")
-                    if os.path.exists(report_dir): return report_dir
+                    if os.path.exists(report_dir): return srv_pid, parent.pid, report_dir
 
             # 4. Scan Open Files 
             try:
                 for f in parent.open_files():
                     if f.path.endswith('.pbip'):
                         report_dir = f.path.replace(".pbip", ".Report")
-                        if os.path.exists(report_dir): return report_dir
+                        if os.path.exists(report_dir): return srv_pid, parent.pid, report_dir
             except: pass
 
+            return srv_pid, parent.pid, None
         except Exception: 
             pass
-        return None
+        return srv_pid, None, None
 
     @staticmethod
     def get_pages(report_path: str) -> List[Dict]:
-        """Reads pages from the PBIR structure."""
-        pages_dir = os.path.join(report_path, "definition", "pages")
-        if not os.path.exists(pages_dir): return []
-        
-        # 1. Try to get order from pages.json
-        pages_order = []
-        pages_reg = os.path.join(pages_dir, "pages.json")
-        if os.path.exists(pages_reg):
-            try:
-                with open(pages_reg, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    pages_order = data.get("pageOrder", [])
-            except: pass
-            
-        # 2. Scan directories
-        found_pages = []
-        try:
-            for entry in os.scandir(pages_dir):
-                if entry.is_dir() and os.path.exists(os.path.join(entry.path, "page.json")):
-                    found_pages.append(entry.name)
-        except: pass
-        
-        # Merge
-        final_list = []
-        seen = set()
-        
-        for pid in pages_order:
-            if pid in found_pages:
-                final_list.append(pid)
-                seen.add(pid)
-        
-        for pid in found_pages:
-            if pid not in seen:
-                final_list.append(pid)
-                
-        # 3. Read Metadata
-        res = []
-        for pid in final_list:
-            p_file = os.path.join(pages_dir, pid, "page.json")
-            try:
-                with open(p_file, 'r', encoding='utf-8') as f:
-                    p_data = json.load(f)
-                    pname = p_data.get("displayName", pid)
-                    res.append({"id": pid, "name": pname})
-            except:
-                res.append({"id": pid, "name": pid})
-                
-        return res
+        """Reads pages from the PBIR structure (served from the resident report index)."""
+        return [{"id": p["id"], "name": p["name"]} for p in get_index(report_path).pages()]
+
+    @staticmethod
+    def find_visual(report_path: str, page_id: str, title: str):
+        """
+        Finds a visual by title. Returns (index_entry, data) or (None, None).
+        Warm page: index lookup. Cold page: byte-prefiltered scan, so only files
+        containing the title are parsed (the index is left to load lazily).
+        """
+        index = get_index(report_path)
+        if index.is_warm(page_id) or not title or "'" in title:
+            vis = index.find_visual(page_id, title=title)
+            data = load_json(vis["path"]) if vis else None
+            return (vis, data) if data else (None, None)
+        index.warm_async(page_id)
+        for pid, vid, v_file, data in scan_visuals(report_path, [title], page_ids=[page_id]):
+            if visual_title(data) == title:
+                return {"id": vid, "page_id": pid, "path": v_file, "title": title}, data
+        return None, None
+
+    @staticmethod
+    def update_page_order(report_path: str, add: List[str] = (), remove: List[str] = ()):
+        """Appends/removes page ids in pages.json (pageOrder) with a single write."""
+        pages_reg = os.path.join(report_path, "definition", "pages", "pages.json")
+        with open(pages_reg, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if "pageOrder" not in data: data["pageOrder"] = []
+        data["pageOrder"] = [pid for pid in data["pageOrder"] if pid not in remove] + list(add)
+        if "pages" in data: del data["pages"]
+        write_json_minimal(pages_reg, data)
+        get_index(report_path).invalidate("")
+
+    @staticmethod
+    def write_page(report_path: str, data: Dict):
+        """Creates/overwrites a page folder and its page.json."""
+        page_dir = os.path.join(report_path, "definition", "pages", data["name"])
+        os.makedirs(page_dir, exist_ok=True)
+        write_json_minimal(os.path.join(page_dir, "page.json"), data)
+        get_index(report_path).invalidate("")
+
+    @staticmethod
+    def place_visual(report_path: str, page: Dict, data: Dict):
+        """Moves a new visual to the first free spot on the page (no overlap with existing visuals)."""
+        if not data: return
+        _, _, w, h = layout.rect_of(data.get("position", {}))
+        occupied = [layout.rect_of(v["position"]) for v in get_index(report_path).visuals(page["id"])]
+        x, y = layout.free_spot(occupied, w, h, page["width"], page["height"])
+        set_position(data, x=x, y=y)
+
+    @staticmethod
+    def write_visual(report_path: str, page_id: str, visual_id: str, data: Dict) -> bool:
+        """
+        Writes a visual.json (only changed spans; skipped when semantically unchanged)
+        and updates the report index in place. Returns False if nothing was written.
+        """
+        v_file = os.path.join(report_path, "definition", "pages", page_id, "visuals", visual_id, "visual.json")
+        os.makedirs(os.path.dirname(v_file), exist_ok=True)
+        written = write_json_minimal(v_file, data)
+        get_index(report_path).record(page_id, visual_id, v_file, data)
+        return written
 
 def pbir_inspect_structure() -> str:
     """Debugs the folder structure of the detected project."""
@@ -123,39 +203,28 @@ def pbir_get_info() -> str:
         "total_pages": len(pages)
     }, indent=2)
 
+def pbir_set_project(project_path: str = None) -> str:
+    """Pin the PBIR project (.pbip file, .Report folder or project folder). Empty clears it and re-enables auto-detection."""
+    if not project_path:
+        PBIRManager.set_project_path(None)
+        return "Project override cleared. Auto-detection enabled."
+    report_dir = PBIRManager.set_project_path(project_path)
+    if not report_dir: return f"No .Report folder found at '{project_path}'."
+    return f"Project set to: {report_dir}"
+
 def pbir_create_page(name: str) -> str:
     """Create a new blank report page."""
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
     
-    page_guid = str(uuid.uuid4()).replace("-", "")[:20]
+    page_guid = new_id()
     
     # 1. Update pages.json (pageOrder)
-    pages_reg = os.path.join(path, "definition", "pages", "pages.json")
-    try:
-        with open(pages_reg, 'r+', encoding='utf-8') as f:
-            data = json.load(f)
-            if "pageOrder" not in data: data["pageOrder"] = []
-            data["pageOrder"].append(page_guid)
-            if "pages" in data: del data["pages"]
-            f.seek(0); json.dump(data, f, indent=2); f.truncate()
+    try: PBIRManager.update_page_order(path, add=[page_guid])
     except Exception as e: return f"Error updating registry: {e}"
     
     # 2. Create Page Folder
-    page_dir = os.path.join(path, "definition", "pages", page_guid)
-    os.makedirs(page_dir, exist_ok=True)
-    
-    page_json = {
-        "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/page/2.0.0/schema.json",
-        "name": page_guid,
-        "displayName": name,
-        "width": 1280,
-        "height": 720,
-        "displayOption": "FitToPage"
-    }
-    
-    with open(os.path.join(page_dir, "page.json"), 'w', encoding='utf-8') as f:
-        json.dump(page_json, f, indent=2)
+    PBIRManager.write_page(path, page_doc(page_guid, name))
         
     return f"Page '{name}' created ({page_guid})"
 
@@ -164,57 +233,13 @@ def pbir_create_visual(page_name: str, visual_type: str, title: str = "New Visua
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
     
-    pages = PBIRManager.get_pages(path)
-    tgt_page = next((p for p in pages if p["name"] == page_name), None)
+    tgt_page = get_index(path).find_page(page_name)
     if not tgt_page: return "Page not found"
     
-    vis_guid = str(uuid.uuid4()).replace("-", "")[:20]
-    vis_dir = os.path.join(path, "definition", "pages", tgt_page["id"], "visuals", vis_guid)
-    os.makedirs(vis_dir, exist_ok=True)
-    
-    visual_json = {}
-    
-    # Helper for Title Expression
-    def create_title_expr(text):
-        return {
-            "title": {
-                "expr": {
-                    "Literal": {
-                        "Value": f"'{text}'"
-                    }
-                }
-            }
-        }
-
-    if visual_type == "textbox":
-        visual_json = {
-             "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.4.0/schema.json",
-             "name": vis_guid,
-             "position": {"x": 100, "y": 100, "width": 300, "height": 100},
-             "visual": {
-                "visualType": "shape",
-                "objects": {
-                    "general": [{"properties": create_title_expr(title)}]
-                },
-                "drillFilterOtherVisuals": True
-             }
-        }
-    elif visual_type == "card":
-        visual_json = {
-            "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.4.0/schema.json",
-            "name": vis_guid,
-            "position": {"x": 50, "y": 50, "z": 0, "width": 300, "height": 300, "tabOrder": 1000},
-            "visual": {
-                "visualType": "card",
-                "objects": {
-                    "general": [{"properties": create_title_expr(title)}]
-                },
-                "drillFilterOtherVisuals": True
-            }
-        }
-
-    with open(os.path.join(vis_dir, "visual.json"), 'w', encoding='utf-8') as f:
-        json.dump(visual_json, f, indent=2)
+    vis_guid = new_id()
+    visual_json = visual_doc(vis_guid, visual_type, title)
+    PBIRManager.place_visual(path, tgt_page, visual_json)
+    PBIRManager.write_visual(path, tgt_page["id"], vis_guid, visual_json)
         
     return f"Visual {visual_type} created on {page_name}"
 
@@ -223,64 +248,13 @@ def pbir_create_bar_chart(page_name: str, visual_title: str, category_table: str
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
     
-    pages = PBIRManager.get_pages(path)
-    tgt_page = next((p for p in pages if p["name"] == page_name), None)
+    tgt_page = get_index(path).find_page(page_name)
     if not tgt_page: return f"Page '{page_name}' not found."
     
-    vis_guid = str(uuid.uuid4()).replace("-", "")[:20]
-    vis_dir = os.path.join(path, "definition", "pages", tgt_page["id"], "visuals", vis_guid)
-    os.makedirs(vis_dir, exist_ok=True)
-
-    # Title Property
-    title_prop = {
-        "title": {
-            "expr": {
-                "Literal": {
-                    "Value": f"'{visual_title}'"
-                }
-            }
-        }
-    }
-
-    visual_json = {
-      "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.4.0/schema.json",
-      "name": vis_guid,
-      "position": {"x": 50, "y": 200, "z": 0, "width": 400, "height": 300, "tabOrder": 2000},
-      "visual": {
-        "visualType": "clusteredBarChart",
-        "query": {
-          "queryState": {
-            "Category": {
-              "projections": [{
-                  "field": {"Column": {"Expression": {"SourceRef": {"Entity": category_table}}, "Property": category_col}},
-                  "queryRef": f"{category_table}.{category_col}",
-                  "nativeQueryRef": category_col,
-                  "displayName": category_col
-                }]
-            },
-            "Y": {
-              "projections": [{
-                  "field": {"Measure": {"Expression": {"SourceRef": {"Entity": value_table}}, "Property": value_measure}},
-                  "queryRef": f"{value_table}.{value_measure}",
-                  "nativeQueryRef": value_measure,
-                  "displayName": value_measure
-                }]
-            }
-          },
-          "sortDefinition": {
-             "sort": [{"field": {"Measure": {"Expression": {"SourceRef": {"Entity": value_table}}, "Property": value_measure}}, "direction": "Descending"}],
-             "isDefaultSort": True
-          }
-        },
-        "objects": {
-          "general": [{"properties": title_prop}]
-        },
-        "drillFilterOtherVisuals": True
-      }
-    }
-    
-    with open(os.path.join(vis_dir, "visual.json"), 'w', encoding='utf-8') as f:
-        json.dump(visual_json, f, indent=2)
+    vis_guid = new_id()
+    visual_json = bar_chart_doc(vis_guid, visual_title, category_table, category_col, value_table, value_measure)
+    PBIRManager.place_visual(path, tgt_page, visual_json)
+    PBIRManager.write_visual(path, tgt_page["id"], vis_guid, visual_json)
         
     return f"Created Bar Chart '{visual_title}' on '{page_name}'"
 
@@ -289,49 +263,14 @@ def pbir_bind_measure(page_name: str, visual_title: str, measure_table: str, mea
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
     
-    pages = PBIRManager.get_pages(path)
-    tgt_page = next((p for p in pages if p["name"] == page_name), None)
+    tgt_page = get_index(path).find_page(page_name)
     if not tgt_page: return f"Page '{page_name}' not found."
     
-    visuals_dir = os.path.join(path, "definition", "pages", tgt_page["id"], "visuals")
-    if not os.path.exists(visuals_dir): return "No visuals found."
-    
-    vis_path = None; vis_data = None
-    
-    for entry in os.scandir(visuals_dir):
-        if entry.is_dir():
-            v_file = os.path.join(entry.path, "visual.json")
-            if os.path.exists(v_file):
-                try:
-                    with open(v_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        try:
-                            title_expr = data.get("visual", {}).get("objects", {}).get("general", [])[0]["properties"]["title"]["expr"]["Literal"]["Value"]
-                            if title_expr.replace("'", "") == visual_title:
-                                vis_path = v_file; vis_data = data; break
-                        except: pass
-                except: pass
-    
-    if not vis_path: return f"Visual '{visual_title}' not found on '{page_name}'."
+    vis, vis_data = PBIRManager.find_visual(path, tgt_page["id"], visual_title)
+    if not vis_data: return f"Visual '{visual_title}' not found on '{page_name}'."
     
-    query_structure = {
-      "queryState": {
-        "Values": {
-          "projections": [{
-              "field": {"Measure": {"Expression": {"SourceRef": {"Entity": measure_table}}, "Property": measure_name}},
-              "queryRef": f"{measure_table}.{measure_name}",
-              "nativeQueryRef": measure_name,
-              "displayName": measure_name
-            }]
-        }
-      }
-    }
-    
-    if "visual" not in vis_data: vis_data["visual"] = {}
-    vis_data["visual"]["query"] = query_structure
-    
-    with open(vis_path, 'w', encoding='utf-8') as f:
-        json.dump(vis_data, f, indent=2)
+    bind_measure(vis_data, measure_table, measure_name)
+    PBIRManager.write_visual(path, tgt_page["id"], vis["id"], vis_data)
         
     return f"Bound measure '{measure_table}[{measure_name}]' to visual '{visual_title}'."
 
@@ -340,127 +279,102 @@ def pbir_format_visual(page_name: str, visual_title: str, new_title: str = None,
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
     
-    pages = PBIRManager.get_pages(path)
-    tgt_page = next((p for p in pages if p["name"] == page_name), None)
+    tgt_page = get_index(path).find_page(page_name)
     if not tgt_page: return f"Page '{page_name}' not found."
     
-    visuals_dir = os.path.join(path, "definition", "pages", tgt_page["id"], "visuals")
-    if not os.path.exists(visuals_dir): return "No visuals found."
-    
-    vis_data = None; vis_path = None
-    
-    for entry in os.scandir(visuals_dir):
-        if entry.is_dir():
-            v_file = os.path.join(entry.path, "visual.json")
-            if os.path.exists(v_file):
-                try:
-                    with open(v_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        curr_title = ""
-                        try:
-                            curr_title = data.get("visual", {}).get("objects", {}).get("general", [])[0]["properties"]["title"]["expr"]["Literal"]["Value"].replace("'", "")
-                        except: pass
-                        if curr_title == visual_title:
-                            vis_data = data; vis_path = v_file; break
-                except: pass
-    
+    vis, vis_data = PBIRManager.find_visual(path, tgt_page["id"], visual_title)
     if not vis_data: return f"Visual '{visual_title}' not found."
     
-    if new_title:
-        if "visual" not in vis_data: vis_data["visual"] = {}
-        if "objects" not in vis_data["visual"]: vis_data["visual"]["objects"] = {}
-        if "general" not in vis_data["visual"]["objects"]: vis_data["visual"]["objects"]["general"] = [{"properties": {}}]
-        vis_data["visual"]["objects"]["general"][0]["properties"]["title"] = {"expr": {"Literal": {"Value": f"'{new_title}'"}}}
+    if new_title: set_title(vis_data, new_title)
         
     if rename_fields:
-        try:
-            mapping = json.loads(rename_fields)
-            def recurse_rename(obj):
-                if isinstance(obj, dict):
-                    if "displayName" in obj and "nativeQueryRef" in obj:
-                        if obj["nativeQueryRef"] in mapping: obj["displayName"] = mapping[obj["nativeQueryRef"]]
-                        elif obj["displayName"] in mapping: obj["displayName"] = mapping[obj["displayName"]]
-                    for k, v in obj.items(): recurse_rename(v)
-                elif isinstance(obj, list):
-                    for item in obj: recurse_rename(item)
-            if "query" in vis_data.get("visual", {}): recurse_rename(vis_data["visual"]["query"])
+        try: visuals.rename_fields(vis_data, rename_fields)
         except Exception as e: return f"Error parsing mapping: {e}"
         
-    with open(vis_path, 'w', encoding='utf-8') as f:
-        json.dump(vis_data, f, indent=2)
+    PBIRManager.write_visual(path, tgt_page["id"], vis["id"], vis_data)
     return f"Formatted '{visual_title}'."
 
+def pbir_apply_batch(operations: str, dry_run: bool = False) -> str:
+    """
+    Apply many PBIR edits in one transaction (each file written once; nothing written if any op fails).
+    operations: JSON list. Ops and their keys (same as the single tools):
+      create_page {name}, create_visual {page_name, visual_type, title},
+      create_bar_chart {page_name, visual_title, category_table, category_col, value_table, value_measure},
+      create_chart {page_name, visual_type, title, fields: {role: [[kind, table, name], ...]}},
+      bind_measure {page_name, visual_title, measure_table, measure_name},
+      format_visual {page_name, visual_title, new_title, rename_fields},
+      update_layout {page_name, visual_title, x, y, width, height, z},
+      delete_visual {page_name, visual_title | visual_id}.
+    Create ops also accept x/y/width/height/z (without x/y the visual goes to the first free spot). Targets may use visual_id instead of visual_title.
+    """
+    path = PBIRManager.detect_path()
+    if not path: return "No project detected."
+    try:
+        return json.dumps(apply_batch(path, operations, dry_run=dry_run), indent=2)
+    except Exception as e: return f"Error: {e}"
+
+def pbir_scaffold_report(spec: str, dry_run: bool = False) -> str:
+    """
+    Build pages and visuals from a declarative JSON/YAML spec (text or file path) in one transaction.
+    {"pages": [{"name": "Overview", "layout": "flow"|"grid"|"none", "columns": 3,
+                "visuals": [{"type": "card", "title": "Revenue", "measure": "Sales[Revenue]"},
+                            {"type": "bar_chart", "title": "By Month", "category": "Date[Month]", "value": "Sales[Revenue]"},
+                            {"type": "lineChart", "title": "Trend", "fields": {"Category": ["Date[Month]"], "Y": ["Sales[Revenue]"]}},
+                            {"type": "textbox", "title": "Header", "x": 10, "y": 10, "width": 600, "height": 60}]}]}
+    Existing pages get the visuals added on free spots. dry_run returns the planned operations.
+    """
+    path = PBIRManager.detect_path()
+    if not path: return "No project detected."
+    try:
+        return json.dumps(scaffold_report(path, spec, dry_run=dry_run), indent=2)
+    except Exception as e: return f"Error: {e}"
+
 def pbir_refactor_field(table_name: str, old_name: str, new_name: str) -> str:
     """Refactor (Rename) a field use in ALL visuals."""
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
     
-    pages = PBIRManager.get_pages(path)
-    count = 0
-    
-    for page in pages:
-        visuals_dir = os.path.join(path, "definition", "pages", page["id"], "visuals")
-        if not os.path.exists(visuals_dir): continue
-        
-        for entry in os.scandir(visuals_dir):
-            if entry.is_dir():
-                v_file = os.path.join(entry.path, "visual.json")
-                if os.path.exists(v_file):
-                    try:
-                        changed = False
-                        with open(v_file, 'r', encoding='utf-8') as f: data = json.load(f)
-                        
-                        def recurse_replace(obj):
-                            nonlocal changed
-                            if isinstance(obj, dict):
-                                if "Property" in obj and obj["Property"] == old_name:
-                                    expr = obj.get("Expression", {})
-                                    source = expr.get("SourceRef", {})
-                                    if source.get("Entity") == table_name:
-                                        obj["Property"] = new_name; changed = True
-                                for k, v in obj.items(): recurse_replace(v)
-                            elif isinstance(obj, list):
-                                for item in obj: recurse_replace(item)
-                                
-                        if "visual" in data: recurse_replace(data["visual"])
-                        if changed:
-                            with open(v_file, 'w', encoding='utf-8') as f: json.dump(data, f, indent=2)
-                            count += 1
-                    except: pass
-    return f"Refactored '{old_name}' to '{new_name}' in {count} visuals."
+    try:
+        res = refactor_fields(path, [{"table": table_name, "old": old_name, "new": new_name}])
+    except Exception as e: return f"Error: {e}"
+    if not res["committed"]:
+        return json.dumps(res, indent=2)
+    return f"Refactored '{old_name}' to '{new_name}' in {res['files_updated']} visuals."
+
+def pbir_refactor_fields(renames: str) -> str:
+    """
+    Rename several measures/columns across ALL visuals in one atomic pass.
+    renames: JSON list like [{"table": "Sales", "old": "Rev", "new": "Revenue", "kind": "Measure"}] (kind optional).
+    """
+    path = PBIRManager.detect_path()
+    if not path: return "No project detected."
+    try:
+        return json.dumps(refactor_fields(path, renames), indent=2)
+    except Exception as e: return f"Error: {e}"
 
 def pbir_audit_usage(object_name: str) -> str:
     """Find which visuals use a specific measure or column."""
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
-    pages = PBIRManager.get_pages(path)
+    index = get_index(path)
     usage = []
     
-    for page in pages:
-        visuals_dir = os.path.join(path, "definition", "pages", page["id"], "visuals")
-        if not os.path.exists(visuals_dir): continue
-        for entry in os.scandir(visuals_dir):
-            if entry.is_dir():
-                v_file = os.path.join(entry.path, "visual.json")
-                if os.path.exists(v_file):
-                    try:
-                        with open(v_file, 'r', encoding='utf-8') as f: data = json.load(f)
-                        found = False
-                        def recurse_find(obj):
-                            nonlocal found
-                            if found: return
-                            if isinstance(obj, dict):
-                                if "Property" in obj and obj["Property"] == object_name: found = True; return
-                                for k, v in obj.items(): recurse_find(v)
-                            elif isinstance(obj, list):
-                                for item in obj: recurse_find(item)
-                        if "visual" in data: recurse_find(data["visual"])
-                        if found:
-                            title = "Untitled"
-                            try: title = data["visual"]["objects"]["general"][0]["properties"]["title"]["expr"]["Literal"]["Value"]
-                            except: pass
-                            usage.append(f"Page: {page['name']} | Visual: {title}")
-                    except: pass
+    if index.is_warm():
+        seen = set()
+        for vis, ref, json_paths in index.references(object_name):
+            key = (vis["page_id"], vis["id"])
+            if key in seen: continue
+            seen.add(key)
+            page = index.page(vis["page_id"]) or {"name": vis["page_id"]}
+            usage.append(f"Page: {page['name']} | Visual: {vis['title'] or 'Untitled'}")
+    else:
+        # Cold index: one-shot scan that only parses files containing the name (index loads in background)
+        index.warm_async()
+        for page in index.pages():
+            hits = sorted((vid, data) for pid, vid, v_file, data in scan_visuals(path, [object_name], page_ids=[page["id"]])
+                          if any(ref[1] == object_name for ref, _ in extract_field_refs(data)))
+            for vid, data in hits:
+                usage.append(f"Page: {page['name']} | Visual: {visual_title(data) or 'Untitled'}")
     if not usage: return f"Object '{object_name}' not found."
     return json.dumps(usage, indent=2)
 
@@ -468,68 +382,44 @@ def pbir_list_visuals(page_name: str) -> str:
     """List all visuals on a page."""
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
-    pages = PBIRManager.get_pages(path)
-    tgt_page = next((p for p in pages if p["name"] == page_name), None)
+    tgt_page = get_index(path).find_page(page_name)
     if not tgt_page: return f"Page '{page_name}' not found."
     visuals_dir = os.path.join(path, "definition", "pages", tgt_page["id"], "visuals")
     if not os.path.exists(visuals_dir): return "No visuals found."
     
     res = []
-    for entry in os.scandir(visuals_dir):
-        if entry.is_dir():
-            v_file = os.path.join(entry.path, "visual.json")
-            if os.path.exists(v_file):
-                try:
-                    with open(v_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        title = "Untitled"
-                        try: title = data.get("visual", {}).get("objects", {}).get("general", [])[0]["properties"]["title"]["expr"]["Literal"]["Value"].replace("'", "")
-                        except: pass
-                        pos = data.get("position", {})
-                        res.append({"id": entry.name, "title": title, "type": data.get("visual", {}).get("visualType"), "x": int(pos.get("x",0)), "y": int(pos.get("y",0))})
-                except: pass
+    for vis in get_index(path).visuals(tgt_page["id"]):
+        pos = vis["position"]
+        res.append({"id": vis["id"], "title": vis["title"] or "Untitled", "type": vis["type"], "x": int(pos.get("x",0)), "y": int(pos.get("y",0))})
     return json.dumps(res, indent=2)
 
 def pbir_delete_object(page_name: str, visual_title: str = None, visual_id: str = None) -> str:
     """Delete a Page or a Visual on that page."""
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
-    pages = PBIRManager.get_pages(path)
-    tgt_page = next((p for p in pages if p["name"] == page_name), None)
+    tgt_page = get_index(path).find_page(page_name)
     if not tgt_page: return f"Page '{page_name}' not found."
     
     # DELETE PAGE
     if not visual_title and not visual_id:
-        pages_reg = os.path.join(path, "definition", "pages", "pages.json")
-        try:
-            with open(pages_reg, 'r+', encoding='utf-8') as f:
-                data = json.load(f)
-                if tgt_page["id"] in data.get("pageOrder", []):
-                    data["pageOrder"].remove(tgt_page["id"])
-                    f.seek(0); json.dump(data, f, indent=2); f.truncate()
+        try: PBIRManager.update_page_order(path, remove=[tgt_page["id"]])
         except: pass
         import shutil
         shutil.rmtree(os.path.join(path, "definition", "pages", tgt_page["id"]), ignore_errors=True)
+        get_index(path).forget(tgt_page["id"]); get_index(path).invalidate("")
         return f"Page '{page_name}' deleted."
         
     # DELETE VISUAL
     visuals_dir = os.path.join(path, "definition", "pages", tgt_page["id"], "visuals")
     target_id = visual_id
     if not target_id and visual_title:
-        for entry in os.scandir(visuals_dir):
-            if entry.is_dir():
-                v_file = os.path.join(entry.path, "visual.json")
-                if os.path.exists(v_file):
-                    try:
-                        with open(v_file, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            t = data.get("visual", {}).get("objects", {}).get("general", [])[0]["properties"]["title"]["expr"]["Literal"]["Value"].replace("'", "")
-                            if t == visual_title: target_id = entry.name; break
-                    except: pass
+        vis, _ = PBIRManager.find_visual(path, tgt_page["id"], visual_title)
+        if vis: target_id = vis["id"]
                     
     if target_id:
         import shutil
         shutil.rmtree(os.path.join(visuals_dir, target_id), ignore_errors=True)
+        get_index(path).forget(tgt_page["id"], target_id)
         return f"Visual deleted (ID: {target_id})."
     return "Visual not found."
 
@@ -537,32 +427,45 @@ def pbir_update_visual_layout(page_name: str, visual_title: str, x: int = None,
     """Update position and size of a visual."""
     path = PBIRManager.detect_path()
     if not path: return "No project detected."
-    pages = PBIRManager.get_pages(path)
-    tgt_page = next((p for p in pages if p["name"] == page_name), None)
+    tgt_page = get_index(path).find_page(page_name)
     if not tgt_page: return "Page not found."
     
-    visuals_dir = os.path.join(path, "definition", "pages", tgt_page["id"], "visuals")
-    vis_path = None; vis_data = None
-    
-    for entry in os.scandir(visuals_dir):
-        if entry.is_dir():
-            v_file = os.path.join(entry.path, "visual.json")
-            if os.path.exists(v_file):
-                try:
-                    with open(v_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        t = data.get("visual", {}).get("objects", {}).get("general", [])[0]["properties"]["title"]["expr"]["Literal"]["Value"].replace("'", "")
-                        if t == visual_title: vis_path = v_file; vis_data = data; break
-                except: pass
-                
+    vis, vis_data = PBIRManager.find_visual(path, tgt_page["id"], visual_title)
     if not vis_data: return "Visual not found."
     
-    if "position" not in vis_data: vis_data["position"] = {}
-    if x is not None: vis_data["position"]["x"] = x
-    if y is not None: vis_data["position"]["y"] = y
-    if width is not None: vis_data["position"]["width"] = width
-    if height is not None: vis_data["position"]["height"] = height
-    if z is not None: vis_data["position"]["z"] = z
+    set_position(vis_data, x=x, y=y, width=width, height=height, z=z)
     
-    with open(vis_path, 'w', encoding='utf-8') as f: json.dump(vis_data, f, indent=2)
+    PBIRManager.write_visual(path, tgt_page["id"], vis["id"], vis_data)
     return f"Updated layout for '{visual_title}'."
+
+def pbir_auto_layout(page_name: str, mode: str = "flow", columns: int = None, gap: int = 10, dry_run: bool = False) -> str:
+    """
+    Re-arrange ALL visuals on a page so none overlap, within the page width/height.
+    mode: 'flow' (keep sizes and reading order, wrap into rows; shrinks to fit) or 'grid' (uniform cells, optional columns).
+    dry_run: only report overlaps and the planned positions. Positions are written in one transaction.
+    """
+    path = PBIRManager.detect_path()
+    if not path: return "No project detected."
+    index = get_index(path)
+    tgt_page = index.find_page(page_name)
+    if not tgt_page: return f"Page '{page_name}' not found."
+
+    rects = {v["id"]: layout.rect_of(v["position"]) for v in index.visuals(tgt_page["id"])}
+    if not rects: return "No visuals found."
+    try: placed = layout.auto_layout(rects, tgt_page["width"], tgt_page["height"], mode=mode, columns=columns, gap=gap)
+    except ValueError as e: return f"Error: {e}"
+
+    res = {"page": page_name, "mode": mode, "visuals": len(rects),
+           "overlaps_before": [list(p) for p in layout.find_overlaps(rects)],
+           "overlaps_after": len(layout.find_overlaps(placed))}
+    ops = [{"op": "update_layout", "page_name": page_name, "visual_id": vid, "x": x, "y": y, "width": w, "height": h}
+           for vid, (x, y, w, h) in placed.items() if (x, y, w, h) != tuple(int(round(v)) for v in rects[vid])]
+    if dry_run:
+        res["positions"] = {vid: {"x": x, "y": y, "width": w, "height": h} for vid, (x, y, w, h) in placed.items()}
+        return json.dumps(res, indent=2)
+    try: batch = apply_batch(path, ops)
+    except Exception as e: return f"Error: {e}"
+    if not batch["committed"]: return json.dumps(batch, indent=2)
+    res["moved"] = len(ops)
+    res["visuals_written"] = batch.get("visuals_written", 0)
+    return json.dumps(res, indent=2)
@@ -1,11 +1,25 @@
+import os
 import json
-from ..connection import get_server, get_adomd_connection, GLOBAL_CONTEXT
+from ..connection import get_server, SESSIONS, GLOBAL_CONTEXT
+from ..dax import run_json, CURSORS, RESULTS
+from ..dax_batch import run_batch
+from ..dax_export import export_query
+from ..dax_profile import profile_query, RecordedTrace, ServerTrace, save_trace
+from ..executors import LOCKS, POOLS
+from .. import model_batch, model_usage, prewarm, vertipaq
+from ..report_index import write_json_atomic
+from .pbir import PBIRManager
+from ..model_backend import get_backend, live_backend, set_offline_model, ModelError, MODEL_CONTEXT
 import psutil
 
-def manage_model_connection(operation: str = "get_current", connection_string: str = None) -> str:
-    """Manage connection (list/select/get_current/connect)."""
+def manage_model_connection(operation: str = "get_current", connection_string: str = None, model_path: str = None) -> str:
+    """
+    Manage connection (list/select/get_current/connect/sessions/offline).
+    offline: work on a .SemanticModel folder (TMDL) or model.bim given in model_path, without Power BI running; empty model_path goes back to the live model.
+    """
     try:
         if operation == "get_current":
+            if MODEL_CONTEXT["offline"]: return json.dumps(dict(connected=True, **MODEL_CONTEXT["offline"].describe()), indent=2)
             cs = GLOBAL_CONTEXT.get("connection_string")
             if cs: return json.dumps({"connected": True, "type": "xmla", "connection_string": cs}, indent=2)
             
@@ -16,8 +30,10 @@ def manage_model_connection(operation: str = "get_current", connection_string: s
             if not connection_string: return "Error: connection_string is required for 'connect' operation."
             
             # Reset previous context
+            set_offline_model(None)
             GLOBAL_CONTEXT["connection_string"] = connection_string
             GLOBAL_CONTEXT["port"] = None # Invalidate local port priority
+            SESSIONS.reset()
             
             try:
                 s = get_server()
@@ -32,8 +48,18 @@ def manage_model_connection(operation: str = "get_current", connection_string: s
                     return "Connected to Workspace, but no datasets found."
             except Exception as e:
                 GLOBAL_CONTEXT["connection_string"] = None
+                SESSIONS.reset()
                 return f"Connection Failed: {e}"
 
+        elif operation == "offline":
+            backend = set_offline_model(model_path)
+            if not backend: return "Offline model closed. Using the live model."
+            meta = backend.meta()
+            return f"Offline model opened: {backend.path} ({len(meta.tables)} tables, {sum(len(t.measures) for t in meta.tables.values())} measures)"
+
+        elif operation == "sessions":
+            return json.dumps(dict(SESSIONS.info(), snapshot=live_backend().stats, cursors=CURSORS.info(), cache=RESULTS.info(), executors=POOLS.info()), indent=2)
+
         elif operation == "list":
             return json.dumps([{"pid": p.info['pid'], "name": p.info['name']} for p in psutil.process_iter(['pid','name']) if 'msmdsrv' in (p.info['name'] or '').lower()], indent=2)
         return "Unknown op"
@@ -42,243 +68,179 @@ def manage_model_connection(operation: str = "get_current", connection_string: s
 def list_objects(object_type: str = "tables") -> str:
     """List objects: tables, measures, columns, relationships, roles, partitions."""
     try:
-        m = get_server().Databases[0].Model
-        res = []
-        if object_type == "tables":
-            res = [{"Name": t.Name, "Description": t.Description or ""} for t in m.Tables]
-        elif object_type == "measures":
-            for t in m.Tables:
-                for meas in t.Measures: res.append({"Name": meas.Name, "Table": t.Name, "Expression": meas.Expression})
-        elif object_type == "relationships":
-            for r in m.Relationships:
-                res.append({"From": f"{r.FromTable.Name}[{r.FromColumn.Name}]", "To": f"{r.ToTable.Name}[{r.ToColumn.Name}]", "Active": r.IsActive})
-        elif object_type == "roles":
-            res = [{"Name": r.Name} for r in m.Roles]
-        elif object_type == "partitions":
-            for t in m.Tables:
-                for p in t.Partitions: res.append({"Table": t.Name, "Partition": p.Name, "Mode": str(p.Mode), "SourceType": str(p.SourceType)})
-        return json.dumps(res, indent=2)
+        return json.dumps(get_backend().list_objects(object_type), indent=2)
     except Exception as e: return f"Error: {e}"
 
-def search_model(query: str) -> str:
-    """Deep search tables, columns, measures, expressions."""
+def search_model(query: str, object_type: str = None, table: str = None, offset: int = 0, limit: int = 50) -> str:
+    """
+    Ranked search over tables, columns and measures (names, DAX expressions, descriptions).
+    Tolerates typos; filter with object_type (table/column/measure) and table; page with offset/limit.
+    """
     try:
-        m = get_server().Databases[0].Model
-        res = []
-        q = query.lower()
-        for t in m.Tables:
-            if q in t.Name.lower(): res.append({"Type": "Table", "Name": t.Name})
-            for c in t.Columns:
-                if q in c.Name.lower(): res.append({"Type": "Column", "Name": c.Name, "Table": t.Name})
-            for meas in t.Measures:
-                if q in meas.Name.lower() or (meas.Expression and q in meas.Expression.lower()):
-                    res.append({"Type": "Measure", "Name": meas.Name, "Table": t.Name})
-        return json.dumps(res[:50], indent=2)
+        return json.dumps(get_backend().search(query, object_type, table, offset, limit), indent=2)
     except Exception as e: return f"Error: {e}"
 
-def run_dax(query: str) -> str:
-    """Execute DAX query (limit 2000 rows)."""
+def run_dax(query: str = None, page_size: int = 1000, cursor: str = None, use_cache: bool = True) -> str:
+    """
+    Execute a DAX query and return one page of results (columnar: {"columns", "types", "data": {column: [values]}}).
+    Numbers stay numbers, dates are ISO strings. When "next" is set, call again with cursor=<next> (no query) for the following page.
+    Complete results are cached until the model changes; use_cache=False forces a round trip.
+    """
     try:
-        conn = get_adomd_connection()
-        cmd = conn.CreateCommand()
-        cmd.CommandText = query
-        reader = cmd.ExecuteReader()
-        
-        cols = [reader.GetName(i) for i in range(reader.FieldCount)]
-        data = []
-        c = 0
-        while reader.Read() and c < 2000:
-            row = {}
-            for i in range(reader.FieldCount):
-                val = reader.GetValue(i)
-                row[cols[i]] = str(val) if val is not None else None
-            data.append(row)
-            c+=1
-        reader.Close(); conn.Close()
-        return json.dumps(data, indent=2) 
+        if not query and not cursor: return "Error: query or cursor is required."
+        return run_json(query, cursor, page_size, use_cache)
+    except Exception as e: return f"Error: {e}"
+
+def run_dax_batch(queries: str, parallelism: int = 4, page_size: int = 1000, use_cache: bool = True) -> str:
+    """
+    Execute many DAX queries (or DMV selects) concurrently on pooled connections.
+    queries: JSON list of query strings or {"id", "query"} objects. parallelism: queries in flight (capped by the connection pool).
+    Each result (in completion order) has its id, time and columnar data (first page_size rows; "truncated" if more) or its own error.
+    """
+    try:
+        return json.dumps(run_batch(queries, parallelism, page_size, use_cache), separators=(",", ":"))
+    except Exception as e: return f"Error: {e}"
+
+def run_dax_profiled(query: str, page_size: int = 1000, server_timings: bool = True, trace_path: str = None, record_trace_path: str = None) -> str:
+    """
+    Execute a DAX query once (no cache) and return its first page plus a timing breakdown: client phases
+    (connect, execute, first row, full read, serialize) and, with server_timings, engine trace timings
+    (total, formula vs storage engine, SE queries with xmSQL, cache hits).
+    trace_path: replay trace events recorded earlier with record_trace_path instead of tracing the server.
+    """
+    try:
+        trace = RecordedTrace.load(trace_path) if trace_path else ServerTrace() if server_timings else None
+        res = profile_query(query, page_size, trace)
+        events = res.pop("trace_events", None)
+        if record_trace_path and events is not None:
+            path = os.path.abspath(os.path.expanduser(record_trace_path))
+            save_trace(path, events)
+            res["recorded_trace"] = path
+        return json.dumps(res, separators=(",", ":"))
     except Exception as e: return f"Error: {e}"
 
+def run_dax_to_file(query: str, output_path: str, format: str = None, batch_rows: int = 50000) -> str:
+    """
+    Execute a DAX query and stream the full result to a file (parquet, arrow or csv; default from the extension, else parquet).
+    Rows are written in batches of batch_rows, so any result size uses bounded memory. Returns path, schema, row count and timing.
+    """
+    try:
+        return json.dumps(export_query(query, output_path, format, batch_rows), indent=2)
+    except Exception as e: return f"Error: {e}"
+
+def _apply(change) -> str:
+    """Runs change(backend) and commits it; anything staged is discarded on failure."""
+    backend = get_backend()
+    try:
+        msg = change(backend)
+        backend.save()
+        return msg
+    except ModelError as e:
+        backend.discard()
+        return str(e)
+    except Exception as e:
+        backend.discard()
+        return f"Error: {e}"
+
 def manage_measure(operation: str, table_name: str, measure_name: str, expression: str = None, description: str = None) -> str:
     """Create, Update, or Delete measures."""
-    try:
-        m = get_server().Databases[0].Model
-        
-        # Helper to find table/measure
-        tgt_table = next((t for t in m.Tables if t.Name == table_name), None)
-        if not tgt_table: return f"Table '{table_name}' not found."
-        
-        import clr
-        try: from Microsoft.AnalysisServices.Tabular import Measure
-        except: from Microsoft.PowerBI.Tabular import Measure
-        
+    def change(b):
         if operation == "create":
-            if any(meas.Name == measure_name for meas in tgt_table.Measures): return "Measure exists."
-            new_meas = Measure()
-            new_meas.Name = measure_name
-            new_meas.Expression = expression
-            if description: new_meas.Description = description
-            tgt_table.Measures.Add(new_meas)
-            m.SaveChanges()
+            b.create_measure(table_name, measure_name, expression, description)
             return f"Measure '{measure_name}' created."
-            
         elif operation == "update":
-            meas = next((meas for meas in tgt_table.Measures if meas.Name == measure_name), None)
-            if not meas: return "Measure not found."
-            if expression: meas.Expression = expression
-            if description: meas.Description = description
-            m.SaveChanges()
+            b.update_measure(table_name, measure_name, expression, description)
             return f"Measure '{measure_name}' updated."
-            
         elif operation == "delete":
-            meas = next((meas for meas in tgt_table.Measures if meas.Name == measure_name), None)
-            if not meas: return "Measure not found."
-            tgt_table.Measures.Remove(meas)
-            m.SaveChanges()
+            graph = b.dependency_graph()
+            node = graph.find(measure_name, table_name)
+            used_by = graph.dependents(node, transitive=False) if node else []
+            b.delete_measure(table_name, measure_name)
+            if used_by:
+                names = ", ".join(f"{r.get('Table', '')}[{r['Name']}]" for r in used_by)
+                return f"Measure '{measure_name}' deleted. Warning: {len(used_by)} object(s) referenced it and are now broken: {names}."
             return f"Measure '{measure_name}' deleted."
-            
-        return "Unknown op."
-    except Exception as e: return f"Error: {e}"
+        raise ModelError("Unknown op.")
+    return _apply(change)
 
 def manage_column(operation: str, table_name: str, column_name: str, new_name: str = None, is_hidden: bool = None, data_type: str = None, new_description: str = None) -> str:
     """Manage Table Columns. Ops: update (rename, hide, type), delete."""
-    try:
-        m = get_server().Databases[0].Model
-        tgt_table = next((t for t in m.Tables if t.Name == table_name), None)
-        if not tgt_table: return f"Table '{table_name}' not found."
-        
-        tgt_col = next((c for c in tgt_table.Columns if c.Name == column_name), None)
-        if not tgt_col: return f"Column '{column_name}' not found."
-        
-        from Microsoft.AnalysisServices.Tabular import DataType
+    def change(b):
         if operation == "update":
-            if new_name: tgt_col.Name = new_name
-            if is_hidden is not None: tgt_col.IsHidden = is_hidden
-            if new_description: tgt_col.Description = new_description
-            if data_type:
-                dt_map = {"string": DataType.String, "int": DataType.Int64, "double": DataType.Double, "datetime": DataType.DateTime, "boolean": DataType.Boolean}
-                if data_type.lower() in dt_map: tgt_col.DataType = dt_map[data_type.lower()]
-            m.SaveChanges()
+            b.update_column(table_name, column_name, new_name, is_hidden, data_type, new_description)
             return f"Column '{column_name}' updated."
-            
         elif operation == "delete":
-            tgt_table.Columns.Remove(tgt_col)
-            m.SaveChanges()
+            b.delete_column(table_name, column_name)
             return f"Column '{column_name}' deleted."
-            
-        return "Unknown op."
-    except Exception as e: return f"Error: {e}"
+        raise ModelError("Unknown op.")
+    return _apply(change)
 
 def manage_table(operation: str, table_name: str, type: str = "Global", source_expression: str = None) -> str:
     """Create/Delete Tables. Types: 'Global' (M), 'Calculated' (DAX)."""
-    try:
-        m = get_server().Databases[0].Model
-        
+    def change(b):
         if operation == "create" or operation == "update":
-             import clr
-             try: from Microsoft.AnalysisServices.Tabular import Table, Partition, PartitionSourceType, ModeType, MPartitionSource, CalculatedPartitionSource
-             except: from Microsoft.PowerBI.Tabular import Table, Partition, PartitionSourceType, ModeType, MPartitionSource, CalculatedPartitionSource
-             
-             # Check if table exists
-             t = next((t for t in m.Tables if t.Name == table_name), None)
-             
-             if operation == "create":
-                 if t: return "Table exists."
-                 t = Table()
-                 t.Name = table_name
-                 m.Tables.Add(t)
-             
-             # If Updating/Creating M Partition
-             if type == "Global" or type == "M":
-                 # Find or Create Partition
-                 part = next((p for p in t.Partitions), None)
-                 if not part:
-                     part = Partition()
-                     part.Name = table_name
-                     t.Partitions.Add(part)
-                 
-                 part.SourceType = PartitionSourceType.M
-                 m_source = MPartitionSource()
-                 m_source.Expression = source_expression or (part.Source.Expression if part.Source else "let Source = \"\" in Source")
-                 part.Source = m_source
-                 
-             elif type == "Calculated":
-                 part = next((p for p in t.Partitions), None)
-                 if not part:
-                     part = Partition()
-                     part.Name = table_name
-                     t.Partitions.Add(part)
-
-                 part.SourceType = PartitionSourceType.Calculated
-                 calc_source = CalculatedPartitionSource()
-                 calc_source.Expression = source_expression
-                 part.Source = calc_source
-                 
-             m.SaveChanges()
-             return f"Table '{table_name}' {operation}d successfully."
-             
+            b.upsert_table(table_name, operation == "create", type, source_expression)
+            return f"Table '{table_name}' {operation}d successfully."
         elif operation == "delete":
-            t = next((t for t in m.Tables if t.Name == table_name), None)
-            if t: 
-                m.Tables.Remove(t); m.SaveChanges()
-                return f"Table '{table_name}' deleted."
-            return "Table not found."
-    except Exception as e: return f"Error: {e}"
+            b.delete_table(table_name)
+            return f"Table '{table_name}' deleted."
+        raise ModelError("Unknown op.")
+    return _apply(change)
 
 def manage_relationship(operation: str, from_table: str, from_col: str, to_table: str, to_col: str, active: bool = True) -> str:
     """Manage relationships."""
-    try:
-        m = get_server().Databases[0].Model
+    def change(b):
         if operation == "create":
-            import clr
-            try: from Microsoft.AnalysisServices.Tabular import SingleColumnRelationship, CrossFilteringBehavior
-            except: from Microsoft.PowerBI.Tabular import SingleColumnRelationship, CrossFilteringBehavior
-            
-            rel = SingleColumnRelationship()
-            rel.FromColumn = m.Tables[from_table].Columns[from_col]
-            rel.ToColumn = m.Tables[to_table].Columns[to_col]
-            rel.IsActive = active
-            rel.CrossFilteringBehavior = CrossFilteringBehavior.OneDirection
-            m.Relationships.Add(rel)
-            m.SaveChanges()
+            b.create_relationship(from_table, from_col, to_table, to_col, active)
             return "Relationship created."
-            
         elif operation == "delete":
-            # Finding relationship is hard, need to iterate
-            to_del = None
-            for r in m.Relationships:
-                if r.FromTable.Name == from_table and r.FromColumn.Name == from_col and r.ToTable.Name == to_table and r.ToColumn.Name == to_col:
-                    to_del = r; break
-            if to_del:
-                m.Relationships.Remove(to_del); m.SaveChanges()
-                return "Relationship deleted."
-            return "Relationship not found."
+            b.delete_relationship(from_table, from_col, to_table, to_col)
+            return "Relationship deleted."
+        raise ModelError("Unknown op.")
+    return _apply(change)
+
+def get_dependencies(object_name: str = None, direction: str = "both", transitive: bool = True, top: int = 20) -> str:
+    """
+    DAX dependency graph over measures, calculated columns and calculated tables.
+    object_name ('Table'[Column], [Measure] or a table name): what it depends on and what depends on it
+    (direction: both/dependencies/dependents; transitive=False for direct references only), plus its evaluation depth and deepest chain.
+    Without object_name: the `top` deepest expressions (longest measure chains) and references to missing objects.
+    """
+    try:
+        graph = get_backend().dependency_graph()
+        if not object_name:
+            return json.dumps({"deepest": graph.deepest(max(1, int(top))), "unresolved": graph.unresolved()}, indent=2)
+        if direction not in ("both", "dependencies", "dependents"): return "Error: direction must be both, dependencies or dependents."
+        node = graph.find(object_name)
+        if node is None: return f"Error: '{object_name}' not found (use 'Table'[Column], [Measure] or a table name)."
+        return json.dumps(graph.describe(node, direction, transitive), indent=2)
     except Exception as e: return f"Error: {e}"
 
-def manage_role(operation: str, role_name: str, table_filters: list = []) -> str:
-    """Manage RLS Roles."""
+def apply_model_changes(operations: str, dry_run: bool = False) -> str:
+    """
+    Apply many model edits in one transaction (validated up front, one SaveChanges; nothing changes if any op fails).
+    operations: JSON list. Ops and their keys (same as the single tools):
+      create_measure/update_measure {table_name, measure_name, expression, description}, delete_measure {table_name, measure_name},
+      update_column {table_name, column_name, new_name, is_hidden, data_type, new_description}, delete_column {table_name, column_name},
+      create_table/update_table {table_name, type, source_expression}, delete_table {table_name},
+      create_relationship {from_table, from_col, to_table, to_col, active}, delete_relationship {from_table, from_col, to_table, to_col}.
+    """
     try:
-        m = get_server().Databases[0].Model
+        return json.dumps(model_batch.apply_model_changes(get_backend(), operations, dry_run), indent=2)
+    except Exception as e: return f"Error: {e}"
+
+def manage_role(operation: str, role_name: str, table_filters: list = []) -> str:
+    """Manage RLS Roles. Ops: create (read permission; table_filters: [{"table", "expression"}] DAX row filters)."""
+    def change(b):
         if operation == "create":
-            import clr
-            try: from Microsoft.AnalysisServices.Tabular import ModelRole, ModelRoleMember
-            except: from Microsoft.PowerBI.Tabular import ModelRole, ModelRoleMember
-            
-            role = ModelRole()
-            role.Name = role_name
-            role.ModelPermission = "Read"
-            m.Roles.Add(role)
-            
-            # Add Filters
-            for tf in table_filters:
-                t_name = tf.get("table")
-                expr = tf.get("expression")
-                # Setting Row Level Security requires TablePermission object
-                # This is complex in TOM. Stubbing for brevity.
-                pass
-            
-            m.SaveChanges()
+            filters = {}
+            for tf in table_filters or []:
+                if not tf.get("table") or not tf.get("expression"): raise ModelError("Each table filter needs 'table' and 'expression'.")
+                filters[tf["table"]] = tf["expression"]
+            b.create_role(role_name, filters)
             return f"Role '{role_name}' created."
-    except Exception as e: return f"Error: {e}"
+        raise ModelError("Unknown op.")
+    return _apply(change)
 
 def manage_calc_group(operation: str, table_name: str, items: list = []) -> str:
     """Create Calculation Groups."""
@@ -288,15 +250,66 @@ def manage_calc_group(operation: str, table_name: str, items: list = []) -> str:
 def get_model_info() -> str:
     """Get basic model metadata."""
     try:
-        db = get_server().Databases[0]
-        return json.dumps({"Name": db.Name, "CompatibilityLevel": db.CompatibilityLevel, "Created": str(db.CreatedTimestamp), "LastUpdate": str(db.LastUpdate)}, indent=2)
+        return json.dumps(get_backend().model_info(), indent=2)
+    except Exception as e: return f"Error: {e}"
+
+def get_vertipaq_stats(top: int = 20, export_path: str = None, fixture_path: str = None, record_path: str = None) -> str:
+    """
+    Analyze model memory (VertiPaq storage DMVs): dictionary/data/hierarchy size, cardinality, encoding and % of model
+    per table, column, partition and relationship, ranked by size. top: rows per ranking.
+    export_path: write the full report (.json file, or a folder for one CSV per section).
+    fixture_path: analyze DMV rows recorded earlier with record_path instead of the live model.
+    """
+    try:
+        dmvs = vertipaq.load_fixture(fixture_path) if fixture_path else vertipaq.fetch_dmvs()
+        if record_path: vertipaq.record(os.path.abspath(os.path.expanduser(record_path)), dmvs)
+        report = vertipaq.analyze(dmvs)
+        res = vertipaq.summary(report, max(1, int(top)))
+        if export_path: res["exported"] = vertipaq.export(report, export_path)
+        return json.dumps(res, indent=2)
+    except Exception as e: return f"Error: {e}"
+
+def find_unused_columns(report_path: str = None, top: int = 50, fixture_path: str = None, export_path: str = None) -> str:
+    """
+    Columns referenced neither by the report (visuals, visual/page/report filters) nor by the model (DAX, relationships, RLS, sort-by),
+    ranked by VertiPaq dictionary + data size, with the MB of model RAM that removing them would reclaim.
+    report_path: .pbip/.Report folder (default: the active project). fixture_path: recorded storage DMVs (see get_vertipaq_stats);
+    offline models without one are listed unranked. export_path: write the full list as JSON.
+    """
+    try:
+        report = PBIRManager.resolve_report_dir(report_path) if report_path else PBIRManager.detect_path()
+        if not report: return "No report found; pass report_path (.pbip file or .Report folder)."
+        backend = get_backend()
+        graph = backend.dependency_graph()
+        stats = {}
+        # Runs on the model pool: hold off PBIR writers while the report files are read
+        with LOCKS["file"].read(): fields = model_usage.report_fields(report, stats)
+        storage = None
+        if fixture_path: storage = vertipaq.analyze(vertipaq.load_fixture(fixture_path))
+        elif backend.kind == "live": storage = vertipaq.analyze(vertipaq.fetch_dmvs())
+        res = model_usage.unused_columns(backend.meta(), graph, fields, storage, None)
+        res["files_scanned"] = stats.get("files", 0)
+        if storage and storage.get("dmv_errors"): res["dmv_errors"] = storage["dmv_errors"]
+        if export_path:
+            path = os.path.abspath(os.path.expanduser(export_path))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_json_atomic(path, res)
+            res["exported"] = path
+        res["results"] = res["results"][:max(1, int(top))]
+        return json.dumps(res, indent=2)
     except Exception as e: return f"Error: {e}"
 
-def get_vertipaq_stats() -> str:
-    """Analyze memory usage (Top 20 columns)."""
-    # Uses DMV
-    query = "SELECT TOP 20 * FROM $SYSTEM.DISCOVER_STORAGE_TABLE_COLUMNS ORDER BY DICTIONARY_SIZE DESC"
-    return run_dax(query)
+def prewarm_report_cache(page_name: str = None, report_path: str = None, parallelism: int = 4, passes: int = 1, dry_run: bool = False) -> str:
+    """
+    Warm the engine cache for a report page (display name) or the whole report: each visual's fields become a
+    SUMMARIZECOLUMNS query, run concurrently on pooled connections. Returns per-visual and per-page query times
+    (slowest first); passes=2 also shows warm-cache times. Filters are not applied. dry_run: only return the queries.
+    """
+    try:
+        report = PBIRManager.resolve_report_dir(report_path) if report_path else PBIRManager.detect_path()
+        if not report: return "No report found; pass report_path (.pbip file or .Report folder)."
+        return json.dumps(prewarm.prewarm(report, page_name, parallelism, passes, dry_run), indent=2)
+    except Exception as e: return f"Error: {e}"
 
 def export_model(connection_string: str, output_path: str) -> str:
     """
@@ -0,0 +1,244 @@
+import csv
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Set
+
+from .executors import cancellable
+from .report_index import write_json_atomic
+
+# VertiPaq storage analyzer: reads the storage DMVs, aggregates sizes per
+# table / column / partition / relationship and ranks them. Analysis works on
+# plain row dicts, so a recorded fixture (record()) can be replayed without
+# a running engine.
+
+DMVS = {
+    "columns": "SELECT * FROM $SYSTEM.DISCOVER_STORAGE_TABLE_COLUMNS",
+    "segments": "SELECT * FROM $SYSTEM.DISCOVER_STORAGE_TABLE_COLUMN_SEGMENTS",
+    "tables": "SELECT * FROM $SYSTEM.DISCOVER_STORAGE_TABLES",
+    "relationships": "SELECT [ID], [Name], [FromTableID], [FromColumnID], [ToTableID], [ToColumnID], [IsActive] FROM $SYSTEM.TMSCHEMA_RELATIONSHIPS",
+    "model_tables": "SELECT [ID], [Name] FROM $SYSTEM.TMSCHEMA_TABLES",
+    "model_columns": "SELECT [ID], [TableID], [ExplicitName], [InferredName] FROM $SYSTEM.TMSCHEMA_COLUMNS",
+}
+# Without these there is nothing to analyze; the others only add names and row counts
+CORE_DMVS = ("columns", "segments")
+ENCODINGS = {1: "HASH", 2: "VALUE"}
+_ID = re.compile(r"\((\d+)\)\s*$")
+# Internal columns (one per table) are storage overhead of the table, not of a model column
+_ROW_NUMBER = "RowNumber-"
+
+# --- Fetching ---
+
+def fetch_dmvs(query: Callable[[str], List[Dict]] = None) -> Dict[str, List[Dict]]:
+    """
+    Runs every DMV (query(sql) -> row dicts; default: the pooled live connection, through the result cache).
+    The core DMVs (CORE_DMVS) must succeed; other failures yield [] and are listed under "errors".
+    """
+    query = query or _live_query
+    out, errors = {}, {}
+    for key, sql in DMVS.items():
+        try: out[key] = query(sql)
+        except Exception as e:
+            if key in CORE_DMVS: raise RuntimeError(f"Storage DMV '{key}' failed: {e}") from e
+            out[key], errors[key] = [], str(e)
+    if errors: out["errors"] = errors
+    return out
+
+def _live_query(sql: str) -> List[Dict]:
+    from .connection import SESSIONS, adomd_session
+    from .dax import RESULTS, cache_key, column_types, converters, read_rows
+    SESSIONS.check() # a refresh or edit since the last read changes the key
+    key = ("dmv",) + cache_key(sql, None)
+    hit = RESULTS.get(key)
+    if hit is not None: return json.loads(hit)
+    with adomd_session() as conn:
+        cmd = conn.CreateCommand()
+        cmd.CommandText = sql
+        with cancellable(cmd.Cancel):
+            reader = cmd.ExecuteReader()
+            try:
+                names = [reader.GetName(i) for i in range(reader.FieldCount)]
+                rows, _ = read_rows(reader, converters(column_types(reader)), None)
+            finally: reader.Close()
+    # Hits and misses return the same JSON-shaped rows (dates as text)
+    text = json.dumps([dict(zip(names, r)) for r in rows], separators=(",", ":"), default=str)
+    RESULTS.put(key, text)
+    return json.loads(text)
+
+def record(path: str, dmvs: Dict[str, List[Dict]]):
+    """Saves fetched DMV rows as a JSON fixture for later replay."""
+    write_json_atomic(path, None, text=json.dumps(dmvs, indent=1, default=str))
+
+def load_fixture(path: str) -> Dict[str, List[Dict]]:
+    with open(path, 'r', encoding='utf-8') as f: data = json.load(f)
+    out = {key: data.get(key, []) for key in DMVS}
+    if data.get("errors"): out["errors"] = data["errors"]
+    return out
+
+# --- Aggregation ---
+
+def _num(v) -> int:
+    try: return int(v or 0)
+    except (TypeError, ValueError): return 0
+
+def _storage_id(text: str) -> Optional[int]:
+    m = _ID.search(text or "")
+    return int(m.group(1)) if m else None
+
+def _pct(part: int, whole: int) -> float:
+    return round(100.0 * part / whole, 2) if whole else 0.0
+
+def analyze(dmvs: Dict[str, List[Dict]]) -> Dict:
+    """
+    Aggregates the storage DMVs. Sizes are bytes:
+    column total = dictionary + data + hierarchy; table total = its columns + relationship indexes + user hierarchies.
+    """
+    columns: Dict[tuple, Dict] = {}  # (table, storage column id) -> column entry
+    tables: Dict[str, Dict] = {}
+
+    def table(name: str) -> Dict:
+        t = tables.get(name)
+        if t is None:
+            t = tables[name] = {"table": name, "rows": 0, "columns": 0, "dictionary": 0, "data": 0, "hierarchy": 0,
+                                "relationships": 0, "user_hierarchies": 0, "internal": 0, "total": 0}
+        return t
+
+    for r in dmvs.get("columns", []):
+        if str(r.get("COLUMN_TYPE", "BASIC_DATA")) != "BASIC_DATA": continue
+        name, tname = str(r.get("ATTRIBUTE_NAME") or r.get("COLUMN_ID") or ""), str(r.get("DIMENSION_NAME") or "")
+        table(tname)
+        columns[(tname, str(r.get("COLUMN_ID") or name))] = {
+            "table": tname, "column": name, "internal": name.startswith(_ROW_NUMBER),
+            "encoding": ENCODINGS.get(_num(r.get("COLUMN_ENCODING")), str(r.get("COLUMN_ENCODING") or "")),
+            "data_type": str(r.get("DATATYPE") or ""), "cardinality": 0, "segments": 0,
+            "dictionary": _num(r.get("DICTIONARY_SIZE")), "data": 0, "hierarchy": 0, "total": 0}
+
+    def column(tname: str, col_id: str) -> Dict:
+        c = columns.get((tname, col_id))
+        if c is None:
+            table(tname)
+            c = columns[(tname, col_id)] = {"table": tname, "column": col_id, "internal": col_id.startswith(_ROW_NUMBER),
+                                            "encoding": "", "data_type": "", "cardinality": 0, "segments": 0,
+                                            "dictionary": 0, "data": 0, "hierarchy": 0, "total": 0}
+        return c
+
+    partitions: Dict[tuple, Dict] = {}
+    part_rows: Dict[tuple, int] = {}  # (table, partition, column id) -> records
+    part_segments: Dict[tuple, Set[int]] = {}
+    rel_size: Dict[int, int] = {}
+    for s in dmvs.get("segments", []):
+        tid, tname = str(s.get("TABLE_ID") or ""), str(s.get("DIMENSION_NAME") or "")
+        size = _num(s.get("USED_SIZE"))
+        table(tname)
+        if tid.startswith("H$"):
+            # H$<table id>$<column id>: attribute hierarchy of one column
+            column(tname, tid.split("$", 2)[2] if tid.count("$") >= 2 else tid)["hierarchy"] += size
+        elif tid.startswith("R$"):
+            rid = _storage_id(tid)
+            if rid is not None: rel_size[rid] = rel_size.get(rid, 0) + size
+            tables[tname]["relationships"] += size
+        elif tid.startswith("U$"):
+            tables[tname]["user_hierarchies"] += size
+        else:
+            col_id = str(s.get("COLUMN_ID") or "")
+            c = column(tname, col_id)
+            c["data"] += size
+            c["segments"] += 1
+            pname = str(s.get("PARTITION_NAME") or s.get("TABLE_PARTITION_NAME") or tname)
+            p = partitions.get((tname, pname))
+            if p is None: p = partitions[(tname, pname)] = {"table": tname, "partition": pname, "rows": 0, "segments": 0, "data": 0}
+            p["data"] += size
+            part_segments.setdefault((tname, pname), set()).add(_num(s.get("SEGMENT_NUMBER")))
+            key = (tname, pname, col_id)
+            part_rows[key] = part_rows.get(key, 0) + _num(s.get("RECORDS_COUNT"))
+    for (tname, pname, _), n in part_rows.items():
+        p = partitions[(tname, pname)]
+        p["rows"] = max(p["rows"], n)
+    for key, segs in part_segments.items(): partitions[key]["segments"] = len(segs)
+
+    for r in dmvs.get("tables", []):
+        tid, tname = str(r.get("TABLE_ID") or ""), str(r.get("DIMENSION_NAME") or "")
+        rows = _num(r.get("ROWS_COUNT"))
+        if tid.startswith("H$") and tid.count("$") >= 2:
+            # Attribute hierarchies hold 3 reserved members besides the distinct values
+            c = columns.get((tname, tid.split("$", 2)[2]))
+            if c is not None: c["cardinality"] = max(0, rows - 3)
+        elif tid[:2] not in ("R$", "U$"):
+            table(tname)["rows"] = max(tables[tname]["rows"], rows)
+
+    for c in columns.values():
+        c["total"] = c["dictionary"] + c["data"] + c["hierarchy"]
+        t = tables[c["table"]]
+        if c["internal"]: t["internal"] += c["total"]
+        else: t["columns"] += 1
+        for k in ("dictionary", "data", "hierarchy"): t[k] += c[k]
+    for t in tables.values():
+        t["total"] = t["dictionary"] + t["data"] + t["hierarchy"] + t["relationships"] + t["user_hierarchies"]
+    model_total = sum(t["total"] for t in tables.values())
+
+    for t in tables.values(): t["pct_model"] = _pct(t["total"], model_total)
+    col_list = [c for c in columns.values() if not c["internal"]]
+    for c in col_list:
+        c["pct_table"] = _pct(c["total"], tables[c["table"]]["total"])
+        c["pct_model"] = _pct(c["total"], model_total)
+        del c["internal"]
+    part_list = list(partitions.values())
+    for p in part_list: p["pct_model"] = _pct(p["data"], model_total)
+
+    rels = _relationships(dmvs, rel_size, columns)
+    for r in rels: r["pct_model"] = _pct(r["size"], model_total)
+
+    report = {
+        "model": {"total": model_total, "tables": len(tables), "columns": len(col_list), "relationships": len(rels),
+                  "dictionary": sum(t["dictionary"] for t in tables.values()), "data": sum(t["data"] for t in tables.values()),
+                  "hierarchy": sum(t["hierarchy"] for t in tables.values()), "relationship_size": sum(t["relationships"] for t in tables.values())},
+        "tables": sorted(tables.values(), key=lambda t: -t["total"]),
+        "columns": sorted(col_list, key=lambda c: -c["total"]),
+        "partitions": sorted(part_list, key=lambda p: -p["data"]),
+        "relationships": sorted(rels, key=lambda r: -r["size"]),
+    }
+    if dmvs.get("errors"): report["dmv_errors"] = dict(dmvs["errors"])
+    return report
+
+def _relationships(dmvs: Dict, rel_size: Dict[int, int], columns: Dict[tuple, Dict]) -> List[Dict]:
+    table_names = {_num(t.get("ID")): str(t.get("Name")) for t in dmvs.get("model_tables", [])}
+    column_names = {_num(c.get("ID")): str(c.get("ExplicitName") or c.get("InferredName") or "") for c in dmvs.get("model_columns", [])}
+    cardinality = {(c["table"], c["column"]): c["cardinality"] for c in columns.values()}
+    out = []
+    for r in dmvs.get("relationships", []):
+        rid = _num(r.get("ID"))
+        ft, fc = table_names.get(_num(r.get("FromTableID")), ""), column_names.get(_num(r.get("FromColumnID")), "")
+        tt, tc = table_names.get(_num(r.get("ToTableID")), ""), column_names.get(_num(r.get("ToColumnID")), "")
+        out.append({"name": str(r.get("Name") or rid), "from": f"{ft}[{fc}]", "to": f"{tt}[{tc}]",
+                    "active": bool(r.get("IsActive", True)), "size": rel_size.get(rid, 0),
+                    "from_cardinality": cardinality.get((ft, fc), 0), "to_cardinality": cardinality.get((tt, tc), 0)})
+    return out
+
+# --- Output ---
+
+def summary(report: Dict, top: int = 20) -> Dict:
+    """Model totals plus the top-N of each ranking."""
+    out = {"model": report["model"], "tables": report["tables"][:top], "columns": report["columns"][:top],
+           "partitions": report["partitions"][:top], "relationships": report["relationships"][:top]}
+    if report.get("dmv_errors"): out["dmv_errors"] = report["dmv_errors"]
+    return out
+
+def export(report: Dict, path: str) -> List[str]:
+    """Writes the full report: one JSON file (path ends with .json) or one CSV per section into a folder."""
+    path = os.path.abspath(os.path.expanduser(path))
+    if path.lower().endswith(".json"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_json_atomic(path, report)
+        return [path]
+    os.makedirs(path, exist_ok=True)
+    files = []
+    for section in ("tables", "columns", "partitions", "relationships"):
+        rows = report[section]
+        f = os.path.join(path, f"vertipaq_{section}.csv")
+        with open(f, "w", encoding="utf-8", newline="") as fh:
+            if rows:
+                w = csv.DictWriter(fh, fieldnames=list(rows[0]))
+                w.writeheader()
+                w.writerows(rows)
+        files.append(f)
+    return files
@@ -0,0 +1,155 @@
+import json
+import uuid
+from typing import Dict, List, Tuple
+
+PAGE_SCHEMA = "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/page/2.0.0/schema.json"
+VISUAL_SCHEMA = "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.4.0/schema.json"
+
+def new_id() -> str:
+    """Generates a PBIR object name (20 hex chars)."""
+    return str(uuid.uuid4()).replace("-", "")[:20]
+
+def title_expr(text: str) -> Dict:
+    """Title property for objects.general."""
+    return {
+        "title": {
+            "expr": {
+                "Literal": {
+                    "Value": f"'{text}'"
+                }
+            }
+        }
+    }
+
+def field_projection(kind: str, table: str, name: str) -> Dict:
+    """Query projection for a Measure or Column."""
+    return {
+        "field": {kind: {"Expression": {"SourceRef": {"Entity": table}}, "Property": name}},
+        "queryRef": f"{table}.{name}",
+        "nativeQueryRef": name,
+        "displayName": name
+    }
+
+def page_doc(page_id: str, name: str, width: int = 1280, height: int = 720) -> Dict:
+    return {
+        "$schema": PAGE_SCHEMA,
+        "name": page_id,
+        "displayName": name,
+        "width": width,
+        "height": height,
+        "displayOption": "FitToPage"
+    }
+
+def visual_doc(visual_id: str, visual_type: str, title: str) -> Dict:
+    """Basic visuals: 'card', 'textbox'. Unknown types give an empty document (legacy behavior)."""
+    if visual_type == "textbox":
+        return {
+             "$schema": VISUAL_SCHEMA,
+             "name": visual_id,
+             "position": {"x": 100, "y": 100, "width": 300, "height": 100},
+             "visual": {
+                "visualType": "shape",
+                "objects": {
+                    "general": [{"properties": title_expr(title)}]
+                },
+                "drillFilterOtherVisuals": True
+             }
+        }
+    elif visual_type == "card":
+        return {
+            "$schema": VISUAL_SCHEMA,
+            "name": visual_id,
+            "position": {"x": 50, "y": 50, "z": 0, "width": 300, "height": 300, "tabOrder": 1000},
+            "visual": {
+                "visualType": "card",
+                "objects": {
+                    "general": [{"properties": title_expr(title)}]
+                },
+                "drillFilterOtherVisuals": True
+            }
+        }
+    return {}
+
+def bar_chart_doc(visual_id: str, title: str, category_table: str, category_col: str, value_table: str, value_measure: str) -> Dict:
+    """Clustered Bar Chart with one category column and one measure."""
+    return {
+      "$schema": VISUAL_SCHEMA,
+      "name": visual_id,
+      "position": {"x": 50, "y": 200, "z": 0, "width": 400, "height": 300, "tabOrder": 2000},
+      "visual": {
+        "visualType": "clusteredBarChart",
+        "query": {
+          "queryState": {
+            "Category": {"projections": [field_projection("Column", category_table, category_col)]},
+            "Y": {"projections": [field_projection("Measure", value_table, value_measure)]}
+          },
+          "sortDefinition": {
+             "sort": [{"field": {"Measure": {"Expression": {"SourceRef": {"Entity": value_table}}, "Property": value_measure}}, "direction": "Descending"}],
+             "isDefaultSort": True
+          }
+        },
+        "objects": {
+          "general": [{"properties": title_expr(title)}]
+        },
+        "drillFilterOtherVisuals": True
+      }
+    }
+
+def query_visual_doc(visual_id: str, visual_type: str, title: str, roles: Dict[str, List[Tuple[str, str, str]]], width: int = 400, height: int = 300) -> Dict:
+    """
+    Any data-bound visual type (lineChart, tableEx, pieChart, card...).
+    roles: query role -> [(kind, table, name)], e.g. {"Category": [("Column", "Date", "Month")], "Y": [("Measure", "Sales", "Revenue")]}.
+    """
+    return {
+        "$schema": VISUAL_SCHEMA,
+        "name": visual_id,
+        "position": {"x": 0, "y": 0, "z": 0, "width": width, "height": height, "tabOrder": 0},
+        "visual": {
+            "visualType": visual_type,
+            "query": {
+                "queryState": {role: {"projections": [field_projection(*f) for f in fields]} for role, fields in roles.items()}
+            },
+            "objects": {
+                "general": [{"properties": title_expr(title)}]
+            },
+            "drillFilterOtherVisuals": True
+        }
+    }
+
+# --- In-place mutations of a visual.json document ---
+
+def bind_measure(data: Dict, measure_table: str, measure_name: str):
+    """Replaces the visual query with a single measure in Values (Card)."""
+    if "visual" not in data: data["visual"] = {}
+    data["visual"]["query"] = {
+      "queryState": {
+        "Values": {"projections": [field_projection("Measure", measure_table, measure_name)]}
+      }
+    }
+
+def set_title(data: Dict, new_title: str):
+    if "visual" not in data: data["visual"] = {}
+    if "objects" not in data["visual"]: data["visual"]["objects"] = {}
+    if "general" not in data["visual"]["objects"]: data["visual"]["objects"]["general"] = [{"properties": {}}]
+    data["visual"]["objects"]["general"][0]["properties"]["title"] = {"expr": {"Literal": {"Value": f"'{new_title}'"}}}
+
+def rename_fields(data: Dict, mapping):
+    """Renames projection display names (axis labels/legend). mapping: dict or JSON string."""
+    if isinstance(mapping, str): mapping = json.loads(mapping)
+    def recurse_rename(obj):
+        if isinstance(obj, dict):
+            if "displayName" in obj and "nativeQueryRef" in obj:
+                if obj["nativeQueryRef"] in mapping: obj["displayName"] = mapping[obj["nativeQueryRef"]]
+                elif obj["displayName"] in mapping: obj["displayName"] = mapping[obj["displayName"]]
+            for k, v in obj.items(): recurse_rename(v)
+        elif isinstance(obj, list):
+            for item in obj: recurse_rename(item)
+    if "query" in data.get("visual", {}): recurse_rename(data["visual"]["query"])
+
+def set_position(data: Dict, x: int = None, y: int = None, width: int = None, height: int = None, z: int = None):
+    if "position" not in data: data["position"] = {}
+    if x is not None: data["position"]["x"] = x
+    if y is not None: data["position"]["y"] = y
+    if width is not None: data["position"]["width"] = width
+    if height is not None: data["position"]["height"] = height
+    if z is not None: data["position"]["z"] = z
@@ -0,0 +1,90 @@
+"""In-memory stand-ins for the CLR (TOM/ADOMD) objects, so sessions and queries run without Power BI."""
+
+class Clock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+class FieldType:
+    def __init__(self, name: str):
+        self.Name = name
+
+class Reader:
+    """AdomdDataReader over a list of row tuples."""
+    def __init__(self, columns, rows, types=None):
+        self.columns, self.rows, self.pos = list(columns), list(rows), -1
+        self.types = types or ["Object"] * len(self.columns)
+        self.FieldCount = len(self.columns)
+        self.closed = False
+
+    def GetName(self, i): return self.columns[i]
+    def GetFieldType(self, i): return FieldType(self.types[i])
+    def Read(self):
+        self.pos += 1
+        return self.pos < len(self.rows)
+    def GetValue(self, i): return self.rows[self.pos][i]
+    def IsDBNull(self, i): return self.rows[self.pos][i] is None
+    def Close(self): self.closed = True
+
+class Connection:
+    """AdomdConnection whose commands are answered by results(text) -> (columns, rows)."""
+    def __init__(self, data_source: str, results=None, session_id: str = "S1"):
+        self.data_source, self.results = data_source, results
+        self.SessionID = session_id
+        self.open, self.alive = True, True
+        self.commands = []
+        self.CommandText = ""
+
+    def CreateCommand(self):
+        return self
+
+    def ExecuteReader(self):
+        self.commands.append(self.CommandText)
+        columns, rows = self.results(self.CommandText)
+        return Reader(columns, rows)
+
+    def Cancel(self): pass
+
+class Backend:
+    """SessionManager backend: counts opens/closes, lets tests kill sessions or move the instance."""
+    def __init__(self, data_source: str = "localhost:1000", results=None):
+        self.ds = data_source
+        self.results = results or (lambda text: (["Value"], [(1,)]))
+        self.stamp = "v1"
+        self.opened, self.closed, self.servers = [], [], []
+        self.fail_open = set() # data sources whose sessions cannot be opened
+        self.moved_to = None   # data source reported after forget()
+        self.synced = 0
+
+    def data_source(self): return self.ds
+
+    def forget(self):
+        if self.moved_to: self.ds, self.moved_to = self.moved_to, None
+
+    def open_server(self, ds):
+        if ds in self.fail_open: raise ConnectionError(ds)
+        server = Connection(ds)
+        self.servers.append(server)
+        return server
+
+    def close_server(self, server): server.open = False
+    def server_alive(self, server): return server.alive
+
+    def open_adomd(self, ds):
+        if ds in self.fail_open: raise ConnectionError(ds)
+        conn = Connection(ds, self.results, session_id=f"S{len(self.opened) + 1}")
+        self.opened.append(conn)
+        return conn
+
+    def close_adomd(self, conn):
+        conn.open = False
+        self.closed.append(conn)
+
+    def adomd_alive(self, conn): return conn.alive
+    def model_stamp(self, conn): return self.stamp
+    def sync(self, server): self.synced += 1
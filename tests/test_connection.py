@@ -0,0 +1,144 @@
+import pytest
+
+from sara_powerbi.connection import SessionManager
+
+from .fakes import Backend, Clock
+
+def manager(pool_size=2, **kw):
+    backend, clock = Backend(), Clock()
+    return SessionManager(backend, pool_size=pool_size, idle_seconds=300, check_seconds=2, clock=clock, **kw), backend, clock
+
+def test_connections_are_pooled_and_reused():
+    sm, backend, _ = manager()
+    with sm.adomd() as a: pass
+    with sm.adomd() as b: pass
+    assert a is b
+    assert len(backend.opened) == 1
+    assert sm.stats["reused"] == 1
+
+def test_pool_is_bounded():
+    sm, backend, _ = manager(pool_size=2)
+    a, b = sm.acquire(), sm.acquire()
+    assert a is not b
+    with pytest.raises(TimeoutError): sm.acquire(timeout=0)
+    sm.release(a)
+    assert sm.acquire(timeout=0) is a
+    assert len(backend.opened) == 2
+
+def test_stale_connection_is_health_checked_and_replaced():
+    sm, backend, clock = manager()
+    with sm.adomd() as a: pass
+    a.alive = False
+    # Within check_seconds the connection is trusted without a round trip
+    clock.advance(1)
+    assert sm.acquire() is a
+    sm.release(a)
+    clock.advance(5)
+    b = sm.acquire()
+    assert b is not a and not a.open
+    assert sm.stats["reconnects"] == 1
+
+def test_failed_connection_is_not_returned_to_the_pool():
+    sm, backend, _ = manager()
+    with pytest.raises(RuntimeError):
+        with sm.adomd() as a:
+            a.alive = False
+            raise RuntimeError("query failed")
+    assert a in backend.closed
+    with sm.adomd() as b: assert b is not a
+
+def test_reconnects_to_moved_instance():
+    sm, backend, clock = manager()
+    with sm.adomd() as old: pass
+    # The instance went away (Desktop restarted on another port)
+    old.alive = False
+    clock.advance(5)
+    backend.fail_open.add("localhost:1000")
+    backend.moved_to = "localhost:2000"
+    a = sm.acquire()
+    assert a.data_source == "localhost:2000"
+    assert sm.info()["data_source"] == "localhost:2000"
+    assert old in backend.closed
+
+def test_idle_connections_are_evicted():
+    sm, backend, clock = manager()
+    a, b = sm.acquire(), sm.acquire()
+    sm.release(a)
+    clock.advance(200)
+    sm.release(b)
+    clock.advance(150)
+    assert sm.acquire() is b
+    assert a in backend.closed and b not in backend.closed
+    assert sm.stats["evicted"] == 1
+
+def test_server_reuse_health_check_and_eviction():
+    sm, backend, clock = manager()
+    s1 = sm.server()
+    clock.advance(1)
+    assert sm.server() is s1
+    s1.alive = False
+    clock.advance(5)
+    s2 = sm.server()
+    assert s2 is not s1 and not s1.open
+    clock.advance(400)
+    s3 = sm.server()
+    assert s3 is not s2 and not s2.open
+    # The idle server and the idle connection its stamp check used
+    assert sm.stats["reconnects"] == 1 and sm.stats["evicted"] == 2
+
+def test_model_change_is_only_recorded_by_check():
+    sm, backend, clock = manager()
+    heard = []
+    sm.add_listener(lambda: heard.append(1))
+    server = sm.server()
+    key = sm.model_key()
+    backend.stamp = "v2"
+    clock.advance(1)
+    sm.check() # inside the check window: not re-read
+    assert heard == [] and sm.model_key() == key
+    clock.advance(5)
+    sm.check()
+    # check() runs without the model lock: listeners hear about it, the Server is not touched
+    assert heard == [1] and sm.model_key() != key
+    assert backend.synced == 0 and server.open and sm.info()["server_stale"]
+
+def test_stale_server_is_replaced_for_readers():
+    sm, backend, clock = manager()
+    old = sm.server()
+    backend.stamp = "v2"
+    clock.advance(5)
+    sm.check()
+    new = sm.server()
+    # Another reader may still be walking the old Server: kept open until an exclusive caller
+    assert new is not old and old.open and backend.synced == 0
+    assert sm.info()["retired_servers"] == 1 and not sm.info()["server_stale"]
+
+def test_stale_server_is_resynced_once_per_exclusive_hold():
+    hold = [None]
+    sm, backend, clock = manager(exclusive=lambda: hold[0])
+    old = sm.server()
+    backend.stamp = "v2"
+    clock.advance(5)
+    sm.check()
+    server = sm.server() # reader: retires old
+    hold[0] = 1
+    assert sm.server() is server and backend.synced == 0 # changed before the hold and already fresh
+    backend.stamp = "v3"
+    clock.advance(5)
+    sm.check()
+    # Later call of the same hold: changes may be staged, no refresh
+    assert sm.server() is server and backend.synced == 0 and not old.open
+    hold[0] = 2
+    assert sm.server() is server and backend.synced == 1
+    assert not sm.info()["server_stale"]
+
+def test_reset_closes_everything_and_drops_busy_connections():
+    sm, backend, _ = manager()
+    a = sm.acquire()
+    with sm.adomd(): pass
+    server = sm.server()
+    sm.reset()
+    assert not server.open
+    sm.release(a) # from the previous generation: closed, not pooled
+    assert not a.open
+    assert sm.info()["adomd_idle"] == 0
@@ -0,0 +1,49 @@
+import os
+from contextlib import contextmanager
+
+from sara_powerbi.dax_profile import RecordedTrace, profile_query, save_trace, server_timings
+
+from .fakes import Connection
+
+TRACE = os.path.join(os.path.dirname(__file__), "fixtures", "trace.json")
+
+def session(rows):
+    conn = Connection("fake", lambda text: (["Id"], [(i,) for i in range(rows)]))
+    @contextmanager
+    def open_session(timeout=None):
+        yield conn
+    return open_session
+
+def test_server_timings_from_recorded_trace():
+    t = server_timings(RecordedTrace.load(TRACE).stop())
+    # Internal scans are part of their parent scan; cache matches are not scans
+    assert t["total_ms"] == 75
+    assert t["se_ms"] == 50 and t["fe_ms"] == 25
+    assert t["se_queries"] == 2 and t["se_cache_hits"] == 1
+    assert t["se_cpu_ms"] == 130 and t["se_parallelism"] == 2.6
+    assert [e["event"] for e in t["events"]] == ["VertiPaqSEQueryEnd", "VertiPaqSEQueryEnd", "VertiPaqSEQueryCacheMatch", "VertiPaqSEQueryEnd"]
+
+def test_server_timings_without_query_end():
+    t = server_timings([])
+    assert t["total_ms"] is None and t["fe_ms"] is None and t["se_parallelism"] is None
+
+def test_profile_query_replays_trace():
+    res = profile_query("EVALUATE T", page_size=3, trace=RecordedTrace.load(TRACE), session=session(2500))
+    assert res["rows"] == 3 and res["total_rows"] == 2500
+    assert res["data"] == {"Id": [0, 1, 2]}
+    assert res["server"]["total_ms"] == 75 and len(res["trace_events"]) == 5
+    assert set(res["timings"]) >= {"connect_ms", "execute_ms", "first_row_ms", "read_ms", "serialize_ms", "total_ms", "trace_wait_ms"}
+
+def test_profile_query_reports_trace_failure():
+    class Unavailable:
+        def start(self, session_id): raise RuntimeError("no trace rights")
+        def stop(self, wait=None): raise AssertionError("not started")
+    res = profile_query("EVALUATE T", trace=Unavailable(), session=session(0))
+    assert res["rows"] == 0 and res["total_rows"] == 0
+    assert res["server"] == {"error": "Trace not available: no trace rights"}
+
+def test_recorded_trace_round_trip(tmp_path):
+    events = RecordedTrace.load(TRACE).stop()
+    path = str(tmp_path / "trace.json")
+    save_trace(path, events)
+    assert RecordedTrace.load(path).stop() == events
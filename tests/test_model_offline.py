@@ -0,0 +1,181 @@
+import json
+import os
+
+import pytest
+
+from sara_powerbi.model_backend import ModelError
+from sara_powerbi.model_offline import open_model
+
+SALES = """table Sales
+	measure Revenue = SUM(Sales[Amount])
+
+	measure 'Revenue LY' =
+			CALCULATE(
+			    [Revenue],
+			    SAMEPERIODLASTYEAR('Dim Date'[Date])
+			)
+
+	column Amount
+		dataType: decimal
+		sourceColumn: Amount
+
+	column Double = [Amount] * 2
+		dataType: decimal
+
+	column Note = "[Amount]" // [Amount]
+		dataType: string
+"""
+
+DATES = """table 'Dim Date'
+	column Date
+		dataType: dateTime
+		sourceColumn: Date
+
+	column Month = FORMAT([Date], "MMM")
+		dataType: string
+		sortByColumn: Date
+
+	hierarchy Calendar
+		level Day
+			column: Date
+
+	partition 'Dim Date' = calculated
+		mode: import
+		source = CALENDAR(MIN(Sales[Amount]), MAX('Sales'[Amount]))
+"""
+
+ROLE = """role Reader
+	modelPermission: read
+
+	tablePermission 'Dim Date' = [Date] > DATE(2020, 1, 1)
+"""
+
+RELATIONSHIPS = """relationship r1
+	fromColumn: Sales.Amount
+	toColumn: 'Dim Date'.Date
+"""
+
+def tmdl_model(tmp_path):
+    root = tmp_path / "M.SemanticModel" / "definition"
+    (root / "tables").mkdir(parents=True)
+    (root / "roles").mkdir()
+    (root / "tables" / "Sales.tmdl").write_text(SALES)
+    (root / "tables" / "Dim Date.tmdl").write_text(DATES)
+    (root / "roles" / "Reader.tmdl").write_text(ROLE)
+    (root / "model.tmdl").write_text("model Model\n")
+    (root / "relationships.tmdl").write_text(RELATIONSHIPS)
+    return root
+
+def test_tmdl_column_rename_rewrites_references(tmp_path):
+    root = tmdl_model(tmp_path)
+    m = open_model(str(root.parent))
+    m.update_column("Dim Date", "Date", new_name="Day")
+    m.update_column("Sales", "Amount", new_name="Net Amount")
+    m.save()
+    sales = (root / "tables" / "Sales.tmdl").read_text()
+    dates = (root / "tables" / "Dim Date.tmdl").read_text()
+    assert "measure Revenue = SUM(Sales[Net Amount])" in sales
+    assert "SAMEPERIODLASTYEAR('Dim Date'[Day])" in sales
+    assert "column Double = [Net Amount] * 2" in sales
+    # Strings and comments are left alone
+    assert 'column Note = "[Amount]" // [Amount]' in sales
+    assert 'FORMAT([Day], "MMM")' in dates and "sortByColumn: Day" in dates and "column: Day" in dates
+    assert "CALENDAR(MIN(Sales[Net Amount]), MAX('Sales'[Net Amount]))" in dates
+    assert "tablePermission 'Dim Date' = [Day] > DATE(2020, 1, 1)" in (root / "roles" / "Reader.tmdl").read_text()
+    rels = (root / "relationships.tmdl").read_text()
+    assert "fromColumn: Sales.'Net Amount'" in rels and "toColumn: 'Dim Date'.Day" in rels
+    meta = open_model(str(root.parent)).meta()
+    assert meta.tables["Dim Date"].columns["Month"].sort_by == "Day"
+
+def test_bim_column_rename_rewrites_references(tmp_path):
+    bim = tmp_path / "model.bim"
+    bim.write_text(json.dumps({"name": "B", "model": {
+        "tables": [
+            {"name": "Sales", "columns": [{"name": "Amount", "dataType": "decimal"},
+                                          {"name": "Double", "type": "calculated", "expression": "[Amount] * 2"}],
+             "measures": [{"name": "Revenue", "expression": ["SUMX(", "    Sales, Sales[Amount])"]}]},
+            {"name": "D", "columns": [{"name": "Date", "dataType": "dateTime"},
+                                      {"name": "M", "type": "calculated", "expression": "FORMAT([Date], \"MMM\")", "sortByColumn": "Date"}],
+             "hierarchies": [{"name": "H", "levels": [{"name": "L", "column": "Date"}]}],
+             "partitions": [{"name": "D", "source": {"type": "calculated", "expression": "CALENDAR(MIN(Sales[Amount]), TODAY())"}}]}],
+        "relationships": [{"name": "r", "fromTable": "Sales", "fromColumn": "Amount", "toTable": "D", "toColumn": "Date"}],
+        "roles": [{"name": "R", "tablePermissions": [{"name": "D", "filterExpression": "[Date] > 1"}]}]}}, indent=2))
+    m = open_model(str(bim))
+    m.update_column("D", "Date", new_name="Day")
+    m.update_column("Sales", "Amount", new_name="Amt")
+    m.save()
+    model = json.loads(bim.read_text())["model"]
+    sales, d = model["tables"]
+    assert sales["columns"][1]["expression"] == "[Amt] * 2"
+    assert sales["measures"][0]["expression"] == ["SUMX(", "    Sales, Sales[Amt])"]
+    assert d["columns"][1]["expression"] == 'FORMAT([Day], "MMM")' and d["columns"][1]["sortByColumn"] == "Day"
+    assert d["hierarchies"][0]["levels"][0]["column"] == "Day"
+    assert d["partitions"][0]["source"]["expression"] == "CALENDAR(MIN(Sales[Amt]), TODAY())"
+    assert model["relationships"][0]["fromColumn"] == "Amt" and model["relationships"][0]["toColumn"] == "Day"
+    assert model["roles"][0]["tablePermissions"][0]["filterExpression"] == "[Day] > 1"
+
+def test_bare_reference_is_kept_when_a_measure_has_the_name(tmp_path):
+    root = tmdl_model(tmp_path)
+    sales = root / "tables" / "Sales.tmdl"
+    sales.write_text(SALES.replace("measure Revenue = SUM(Sales[Amount])", "measure Revenue = SUM(Sales[Amount])\n\n\tmeasure Dbl = [Double] * 2"))
+    dates = root / "tables" / "Dim Date.tmdl"
+    dates.write_text(DATES + "\n\tmeasure Double = 1\n")
+    m = open_model(str(root.parent))
+    m.update_column("Sales", "Double", new_name="Twice")
+    m.save()
+    # [Double] could be the measure: left as written
+    assert "measure Dbl = [Double] * 2" in sales.read_text()
+
+def test_create_role_offline(tmp_path):
+    root = tmdl_model(tmp_path)
+    (root / "model.tmdl").write_text("model Model\n\nref table Sales\nref table 'Dim Date'\n\nref role Reader\n")
+    m = open_model(str(root.parent))
+    m.create_role("EU Sales", {"Sales": "[Amount] > 0"})
+    m.save()
+    assert "ref role Reader\nref role 'EU Sales'" in (root / "model.tmdl").read_text()
+    role = next(r for r in open_model(str(root.parent)).meta().roles if r.name == "EU Sales")
+    assert role.filters == {"Sales": "[Amount] > 0"}
+    bim = tmp_path / "model.bim"
+    bim.write_text(json.dumps({"name": "B", "model": {"tables": [{"name": "Sales"}]}}))
+    m = open_model(str(bim))
+    m.create_role("R", {"Sales": "[Amount] > 0"})
+    m.save()
+    assert json.loads(bim.read_text())["model"]["roles"] == [
+        {"name": "R", "modelPermission": "read", "tablePermissions": [{"name": "Sales", "filterExpression": "[Amount] > 0"}]}]
+
+def test_save_refuses_files_changed_on_disk(tmp_path):
+    root = tmdl_model(tmp_path)
+    m = open_model(str(root.parent))
+    m.update_column("Sales", "Amount", new_name="Net Amount")
+    sales = root / "tables" / "Sales.tmdl"
+    sales.write_text(SALES + "\n\tmeasure Added = 1\n")
+    with pytest.raises(ModelError, match="changed on disk"):
+        m.save()
+    assert sales.read_text() == SALES + "\n\tmeasure Added = 1\n"
+    assert "Sales[Amount]" in (root / "tables" / "Dim Date.tmdl").read_text()
+    bim = tmp_path / "model.bim"
+    bim.write_text(json.dumps({"name": "B", "model": {"tables": [{"name": "Sales"}]}}))
+    m = open_model(str(bim))
+    m.create_role("R")
+    bim.write_text(json.dumps({"name": "C", "model": {}}))
+    with pytest.raises(ModelError, match="changed on disk"):
+        m.save()
+    assert json.loads(bim.read_text())["name"] == "C"
+
+def test_failed_save_rolls_back_every_file(tmp_path, monkeypatch):
+    root = tmdl_model(tmp_path)
+    before = {p: p.read_text() for p in root.rglob("*.tmdl")}
+    m = open_model(str(root.parent))
+    m.update_column("Sales", "Amount", new_name="Net Amount")
+    m.create_role("New")
+    real, calls = os.replace, []
+    def replace(src, dst):
+        calls.append(dst)
+        if len(calls) == 3: raise OSError("disk full")
+        real(src, dst)
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(RuntimeError, match="nothing was changed"):
+        m.save()
+    monkeypatch.setattr(os, "replace", real)
+    assert {p: p.read_text() for p in root.rglob("*.tmdl")} == before
+    assert not [p for p in root.rglob("*") if ".sara-" in p.name]
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from sara_powerbi import connection, dax, vertipaq
+from sara_powerbi.connection import SessionManager
+
+from .fakes import Backend, Clock
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "vertipaq.json")
+
+def replay(fail=()):
+    """DMV query function answering from the fixture; DMVs named in fail raise."""
+    dmvs = vertipaq.load_fixture(FIXTURE)
+    def query(sql):
+        key = next(k for k, v in vertipaq.DMVS.items() if v == sql)
+        if key in fail: raise RuntimeError(f"{key} denied")
+        return dmvs[key]
+    return query
+
+def test_analyze_recorded_dmvs():
+    report = vertipaq.analyze(vertipaq.load_fixture(FIXTURE))
+    model = report["model"]
+    assert model["total"] == 14290 and model["tables"] == 2 and model["columns"] == 3
+    sales = report["tables"][0]
+    # RowNumber is internal: counted in the table, not listed as a column
+    assert sales["table"] == "Sales" and sales["internal"] == 120 and sales["columns"] == 2
+    assert sales["total"] == 6120 + 6450 + 600 + 256
+    amount = report["columns"][0]
+    assert (amount["column"], amount["encoding"], amount["cardinality"]) == ("Amount", "VALUE", 90)
+    assert (amount["dictionary"], amount["data"], amount["hierarchy"]) == (1000, 6000, 600)
+    assert [p["partition"] for p in report["partitions"]] == ["Sales-2023", "Sales-2024", "Product"]
+    rel = report["relationships"][0]
+    assert (rel["from"], rel["to"], rel["size"], rel["to_cardinality"]) == ("Sales[ProductKey]", "Product[ProductKey]", 256, 10)
+
+def test_summary_limits_rankings():
+    s = vertipaq.summary(vertipaq.analyze(vertipaq.load_fixture(FIXTURE)), top=1)
+    assert len(s["columns"]) == 1 and len(s["partitions"]) == 1 and "dmv_errors" not in s
+
+def test_optional_dmv_failure_is_reported():
+    dmvs = vertipaq.fetch_dmvs(replay(fail=("relationships",)))
+    assert dmvs["relationships"] == [] and dmvs["errors"] == {"relationships": "relationships denied"}
+    report = vertipaq.analyze(dmvs)
+    assert report["relationships"] == [] and report["dmv_errors"] == dmvs["errors"]
+    assert vertipaq.summary(report)["dmv_errors"] == dmvs["errors"]
+
+@pytest.mark.parametrize("key", vertipaq.CORE_DMVS)
+def test_core_dmv_failure_raises(key):
+    with pytest.raises(RuntimeError, match=key):
+        vertipaq.fetch_dmvs(replay(fail=(key,)))
+
+def test_record_and_replay(tmp_path):
+    dmvs = vertipaq.fetch_dmvs(replay(fail=("tables",)))
+    path = str(tmp_path / "dmvs.json")
+    vertipaq.record(path, dmvs)
+    assert vertipaq.load_fixture(path) == dmvs
+
+def test_live_query_goes_through_result_cache(monkeypatch):
+    backend = Backend(results=lambda sql: (["ID", "Name"], [(10, "Sales"), (11, "Product")]))
+    sm = SessionManager(backend, pool_size=1, clock=Clock())
+    monkeypatch.setattr(connection, "SESSIONS", sm)
+    monkeypatch.setattr(dax, "SESSIONS", sm)
+    monkeypatch.setattr(dax, "RESULTS", dax.ResultCache())
+    sql = vertipaq.DMVS["model_tables"]
+    rows = vertipaq._live_query(sql)
+    assert rows == [{"ID": 10, "Name": "Sales"}, {"ID": 11, "Name": "Product"}]
+    assert vertipaq._live_query(sql) == rows
+    conn = backend.opened[0]
+    assert conn.commands.count(sql) == 1 and dax.RESULTS.info()["hits"] == 1